@@ -1,9 +1,18 @@
+import asyncio
 import logging
+from typing import Optional
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
+import threading
 from dotenv import load_dotenv
+from fastapi import Request
+from app.utils.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool, instrument_pool
+from app.utils.db_routing import (
+    REPLICA_PROBE_SECONDS, REPLICA_STICKY_COOKIE, ReplicaSet, RoutingSession, wrote_recently,
+)
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -20,30 +29,221 @@ logger.info(f"Connecting to database: {DATABASE_URL}")
 
 # 修改连接字符串格式
 # 使用 mysql-connector-python 而不是 pymysql
-if DATABASE_URL.startswith('mysql+pymysql'):
-    DATABASE_URL = DATABASE_URL.replace('mysql+pymysql', 'mysql+mysqlconnector')
-    logger.info(f"Updated connection string to: {DATABASE_URL}")
-
-try:
-    # 创建引擎时不使用额外参数
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False  # 设置为True可以查看SQL语句
-    )
-    # 测试连接
-    with engine.connect() as conn:
-        logger.info("Database connection successful")
-except Exception as e:
-    logger.error(f"Database connection error: {e}")
-    raise
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _normalize_url(url: str) -> str:
+    if url.startswith('mysql+pymysql'):
+        url = url.replace('mysql+pymysql', 'mysql+mysqlconnector')
+        logger.info(f"Updated connection string to: {url}")
+    return url
+
+DATABASE_URL = _normalize_url(DATABASE_URL)
+
+# 只读从库，多个地址用逗号分隔
+DATABASE_REPLICA_URLS = [
+    _normalize_url(url.strip())
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+
+# 连接池配置，默认 pool_size + max_overflow 与 anyio 默认线程池大小（40）一致
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# 小于 MySQL wait_timeout，避免使用已被服务端关闭的连接
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+def _pool_options(url: str, poolclass=InstrumentedQueuePool) -> dict:
+    # 内存 SQLite 只能使用单连接池
+    if url.startswith("sqlite") and (":memory:" in url or url.split("?")[0].rstrip("/").endswith(":")):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+# 异步引擎，供异步路由和认证依赖使用；同步引擎保留给脚本和未迁移的路由
+def _async_url(url: str) -> str:
+    for sync_prefix, async_prefix in (
+        ("mysql+mysqlconnector", "mysql+aiomysql"),
+        ("mysql+pymysql", "mysql+aiomysql"),
+        ("mysql://", "mysql+aiomysql://"),
+        ("sqlite+pysqlite", "sqlite+aiosqlite"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# 引擎在第一次使用时才创建，导入模块不会连接数据库
+_engine = None
+_replica_set = None
+_async_engine = None
+_async_replica_set = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """返回同步主库引擎，首次调用时创建（同时创建从库引擎）"""
+    global _engine, _replica_set
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(
+                    DATABASE_URL,
+                    echo=False,  # 设置为True可以查看SQL语句
+                    **_pool_options(DATABASE_URL)
+                )
+                instrument_pool(engine)
+                replica_engines = [
+                    create_engine(url, echo=False, **_pool_options(url))
+                    for url in DATABASE_REPLICA_URLS
+                ]
+                for replica_engine in replica_engines:
+                    instrument_pool(replica_engine)
+                _replica_set = ReplicaSet(replica_engines)
+                SessionLocal.configure(bind=engine, replica_set=_replica_set)
+                _engine = engine
+    return _engine
+
+def get_replica_set() -> ReplicaSet:
+    get_engine()
+    return _replica_set
+
+def get_async_engine():
+    """返回异步主库引擎，首次调用时创建（同时创建从库引擎）"""
+    global _async_engine, _async_replica_set
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                async_engine = create_async_engine(
+                    ASYNC_DATABASE_URL,
+                    echo=False,
+                    **_pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool)
+                )
+                instrument_pool(async_engine.sync_engine)
+                async_replica_engines = []
+                for url in DATABASE_REPLICA_URLS:
+                    async_url = _async_url(url)
+                    async_replica_engines.append(create_async_engine(
+                        async_url,
+                        echo=False,
+                        **_pool_options(async_url, InstrumentedAsyncQueuePool)
+                    ))
+                    instrument_pool(async_replica_engines[-1].sync_engine)
+                _async_replica_set = ReplicaSet([replica.sync_engine for replica in async_replica_engines])
+                AsyncSessionLocal.configure(bind=async_engine, replica_set=_async_replica_set)
+                _async_engine = async_engine
+    return _async_engine
+
+def get_async_replica_set() -> ReplicaSet:
+    get_async_engine()
+    return _async_replica_set
+
+class _LazySessionmaker(sessionmaker):
+    """创建会话前确保引擎已初始化"""
+
+    def __call__(self, **local_kw):
+        get_engine()
+        return super().__call__(**local_kw)
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    """创建异步会话前确保引擎已初始化"""
+
+    def __call__(self, **local_kw):
+        get_async_engine()
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False
+)
+
+AsyncSessionLocal = _LazyAsyncSessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+def _dispose_after_fork():
+    # fork 出的子进程不能复用父进程的连接，丢弃继承来的连接池（不关闭父进程的连接）
+    for engine in [_engine, *(_replica_set.engines if _replica_set else [])]:
+        if engine is not None:
+            engine.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+    for engine in (_async_replica_set.engines if _async_replica_set else []):
+        engine.dispose(close=False)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+def __getattr__(name):
+    # 兼容 from app.database import engine 等旧用法
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "replica_set":
+        return get_replica_set()
+    if name == "async_replica_set":
+        return get_async_replica_set()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 Base = declarative_base()
 
-def get_db():
+def _is_read_only(request: Request) -> bool:
+    # 只读请求可以路由到从库；客户端刚写入过（任何 worker 上）时读主库
+    if request.method not in ("GET", "HEAD"):
+        return False
+    return not wrote_recently(request.cookies.get(REPLICA_STICKY_COOKIE))
+
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["read_only"] = _is_read_only(request)
+    db.info["request_state"] = request.state
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info["read_only"] = _is_read_only(request)
+        db.info["request_state"] = request.state
+        yield db
+
+def probe_replicas():
+    """探测从库健康状态，异步从库与同步从库指向相同地址，直接复用探测结果"""
+    healthy = get_replica_set().probe()
+    if _async_replica_set is not None:
+        _async_replica_set.apply_health(healthy)
+
+async def _probe_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(REPLICA_PROBE_SECONDS)
+        try:
+            await loop.run_in_executor(None, probe_replicas)
+        except Exception as e:
+            logger.error(f"从库探测失败: {e}")
+
+_probe_task: Optional[asyncio.Task] = None
+
+def start_replica_probe_loop():
+    """配置了从库时定期探测，从库恢复后无需等待冷却期即可重新使用"""
+    global _probe_task
+    if DATABASE_REPLICA_URLS and REPLICA_PROBE_SECONDS > 0:
+        _probe_task = asyncio.get_running_loop().create_task(_probe_loop())
+
+def stop_replica_probe_loop():
+    global _probe_task
+    if _probe_task is not None:
+        _probe_task.cancel()
+        _probe_task = None
@@ -1,49 +1,50 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError, ResponseValidationError
-from app.routers import user, task, story, task_plan
-from app.database import engine
+from app.routers import user, task, story, task_plan, admin, leaderboard
+from app.utils.migrations import ensure_schema
 from app.models import user as user_model, task as task_model, task_completion as task_completion_model
-from app.models import story as story_model, task_plan as task_plan_model
+from app.models import story as story_model, task_plan as task_plan_model, daily_stats as daily_stats_model
+from app.models import collection_version as collection_version_model
 from app.utils.exception_handlers import (
     http_exception_handler,
     validation_exception_handler,
     general_exception_handler
 )
 from app.middleware.response_middleware import ResponseMiddleware
+from app.middleware.sql_middleware import SQLInstrumentationMiddleware
+from app.middleware.access_log import AccessLogBodyMiddleware, AccessLogMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.replica_sticky import ReplicaStickyMiddleware
+from app.database import start_replica_probe_loop, stop_replica_probe_loop
+from app.utils.logging_config import setup_logging
+from app.utils.passwords import shutdown_password_pool
+from app.utils.leaderboard import start_reconcile_loop, stop_reconcile_loop
 import logging
 import traceback
 from fastapi import status
 import socket
-from app.utils.ip import get_client_ip
+import asyncio
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# 配置日志：通过队列异步写出 JSON 日志
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # 从环境变量获取端口，默认为8001
 PORT = int(os.getenv("API_PORT", 8001))
 
-# 创建数据库表（如果不存在）
-user_model.Base.metadata.create_all(bind=engine)
-task_model.Base.metadata.create_all(bind=engine)
-task_completion_model.Base.metadata.create_all(bind=engine)
-story_model.Base.metadata.create_all(bind=engine)
-task_plan_model.Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="用户管理与任务API",
     description="用于管理用户和任务的API",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
 # 配置CORS
@@ -63,13 +64,31 @@ app.add_exception_handler(Exception, general_exception_handler)
 # 添加响应中间件
 app.add_middleware(ResponseMiddleware)
 
+# 统计每个请求的 SQL 语句数与耗时
+app.add_middleware(SQLInstrumentationMiddleware)
+
+# 写入后用 Cookie 标记客户端，之后一段时间内的读请求在所有 worker 上都走主库
+app.add_middleware(ReplicaStickyMiddleware)
+
+# 采样记录响应体，放在压缩层内侧，记录的是压缩前的内容
+app.add_middleware(AccessLogBodyMiddleware)
+
+# 按路由开启的响应压缩
+app.add_middleware(CompressionMiddleware)
+
+# 每个请求一行结构化访问日志，放在最外层以统计完整耗时
+app.add_middleware(AccessLogMiddleware)
+
 # 包含路由
 app.include_router(user.router)
 app.include_router(task.router)
 app.include_router(story.router)
 app.include_router(task_plan.router)
+app.include_router(admin.router)
+app.include_router(leaderboard.router)
 
-# 获取本机 IP 地址
+# 获取本机 IP 地址（结果缓存，只探测一次）
+@lru_cache(maxsize=1)
 def get_local_ip():
     try:
         # 创建一个临时 socket 连接来获取本机 IP
@@ -83,44 +102,32 @@ def get_local_ip():
         logger.error(f"获取本地 IP 地址时出错: {e}")
         return "127.0.0.1"  # 默认返回 localhost
 
-# 在应用启动时显示 IP 地址
-@app.on_event("startup")
-async def startup_event():
+def log_access_urls():
+    """输出访问地址，需要探测网络，不放在启动关键路径上"""
     local_ip = get_local_ip()
-    logger.info(f"服务器启动成功！")
     logger.info(f"本地 IP 地址: {local_ip}")
-    logger.info(f"监听端口: {PORT}")
     logger.info(f"API 文档可通过以下地址访问:")
     logger.info(f"Swagger UI: http://{local_ip}:{PORT}/docs")
     logger.info(f"ReDoc: http://{local_ip}:{PORT}/redoc")
-    
-    # # 尝试检测网络连接
-    # try:
-    #     import socket
-    #     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    #     s.bind((local_ip, PORT))
-    #     s.close()
-    #     logger.info(f"端口 {PORT} 可用并已成功绑定")
-    # except Exception as e:
-    #     logger.error(f"端口绑定测试失败: {e}")
-
-# 修改会话中间件，记录客户端 IP
-@app.middleware("http")
-async def session_middleware(request: Request, call_next):
-    """会话管理中间件"""
-    # 获取客户端真实 IP
-    client_ip = get_client_ip(request)
-    
-    # 记录请求信息
-    logger.info(f"请求来自 IP: {client_ip} | 路径: {request.url.path} | 方法: {request.method}")
-    
-    # 处理请求
-    response = await call_next(request)
-    
-    # 记录响应状态
-    logger.info(f"响应状态: {response.status_code} | 客户端 IP: {client_ip}")
-    
-    return response
+
+@app.on_event("startup")
+async def startup_event():
+    # 执行未应用的数据库迁移，已是最新版本时只有一次查询
+    await asyncio.get_running_loop().run_in_executor(None, ensure_schema)
+    logger.info(f"服务器启动成功！")
+    logger.info(f"监听端口: {PORT}")
+    # 在后台线程中探测本机 IP 并显示访问地址
+    asyncio.get_running_loop().run_in_executor(None, log_access_urls)
+    # 在后台加载金币排行榜并定期对账
+    start_reconcile_loop()
+    # 定期探测从库健康状态
+    start_replica_probe_loop()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    stop_reconcile_loop()
+    stop_replica_probe_loop()
+    shutdown_password_pool()
 
 # 全局异常处理器
 @app.exception_handler(HTTPException)
@@ -134,6 +141,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "msg": exc.detail,
             "data": None
         },
+        headers=getattr(exc, "headers", None),
     )
 
 @app.exception_handler(Exception)
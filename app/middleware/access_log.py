@@ -0,0 +1,108 @@
+import logging
+import os
+import random
+import re
+import time
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.ip import get_client_ip
+from app.utils.logging_config import ACCESS_LOGGER_NAME
+
+logger = logging.getLogger(ACCESS_LOGGER_NAME)
+
+# 访问日志的采样比例（0~1），状态码 >= 400 的请求总是记录；访问日志不受 LOG_RATE_LIMIT_PER_SEC 限流
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1"))
+# 记录请求/响应体的采样比例（0~1），默认关闭
+LOG_BODY_SAMPLE_RATE = float(os.getenv("LOG_BODY_SAMPLE_RATE", "0"))
+# 每个请求/响应体最多记录的字节数
+LOG_BODY_MAX_BYTES = int(os.getenv("LOG_BODY_MAX_BYTES", "2048"))
+
+# AccessLogMiddleware 决定记录响应体时，在 scope 中放入该键对应的缓冲区
+_RESPONSE_BODY_KEY = "app.access_log.response_body"
+
+# 记录请求体时隐藏敏感字段
+_SENSITIVE = re.compile(rb'("(?:password|access_token)"\s*:\s*)"[^"]*"|((?:^|&)password=)[^&]*')
+
+
+def _redact(body: bytes) -> str:
+    body = _SENSITIVE.sub(lambda m: (m.group(1) + b'"***"') if m.group(1) else m.group(2) + b"***", body)
+    return body.decode("utf-8", errors="replace")
+
+
+class AccessLogMiddleware:
+    """每个请求输出一行结构化访问日志：路由、状态码、耗时、客户端 IP、用户 ID
+
+    放在最外层以统计完整耗时；响应体由压缩层内侧的 AccessLogBodyMiddleware 记录，保存的是压缩前的内容。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        sample_body = LOG_BODY_SAMPLE_RATE > 0 and random.random() < LOG_BODY_SAMPLE_RATE
+        request_body = bytearray()
+        response_body = bytearray()
+        if sample_body:
+            scope[_RESPONSE_BODY_KEY] = response_body
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and len(request_body) < LOG_BODY_MAX_BYTES:
+                request_body.extend(message.get("body", b"")[:LOG_BODY_MAX_BYTES - len(request_body)])
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper if sample_body else receive, send_wrapper)
+        finally:
+            if status_code >= 400 or ACCESS_LOG_SAMPLE_RATE >= 1 or random.random() < ACCESS_LOG_SAMPLE_RATE:
+                self._log(scope, start, status_code, request_body if sample_body else None, response_body)
+
+    def _log(self, scope: Scope, start: float, status_code: int, request_body, response_body: bytearray):
+        route = scope.get("route")
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status_code,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "ip": get_client_ip(Request(scope)),
+            "user_id": scope.get("state", {}).get("user_id"),
+        }
+        if request_body is not None:
+            fields["request_body"] = _redact(bytes(request_body))
+            fields["response_body"] = _redact(bytes(response_body))
+        logger.info("access", extra={"fields": fields})
+
+
+class AccessLogBodyMiddleware:
+    """为采样到的请求记录响应体，注册在 CompressionMiddleware 内侧，拿到的是未压缩的内容"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        response_body = scope.get(_RESPONSE_BODY_KEY)
+        if response_body is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.body" and len(response_body) < LOG_BODY_MAX_BYTES:
+                response_body.extend(message.get("body", b"")[:LOG_BODY_MAX_BYTES - len(response_body)])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
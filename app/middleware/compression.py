@@ -0,0 +1,70 @@
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.compression import (
+    COMPRESSION_MIN_SIZE, COMPRESSION_THREAD_MIN_SIZE, compression_cache, negotiate_encoding,
+)
+
+
+class CompressionMiddleware:
+    """对用 @compressible 标记的路由按 Accept-Encoding 压缩响应（gzip / deflate）
+
+    不小于 thread_min_size 的响应体放到线程池中压缩，事件循环上只压缩小响应。
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 thread_min_size: int = COMPRESSION_THREAD_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_min_size = thread_min_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compress = False
+        chunks = []
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, compress
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                headers = Headers(raw=message["headers"])
+                compress = (
+                    getattr(getattr(route, "endpoint", None), "compress_response", False)
+                    and "content-encoding" not in headers
+                    and message["status"] not in (204, 304)
+                )
+                if compress:
+                    start_message = message
+                    return
+            elif message["type"] == "http.response.body" and compress:
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                body = b"".join(chunks)
+                headers = MutableHeaders(scope=start_message)
+                headers.add_vary_header("Accept-Encoding")
+                if len(body) >= self.minimum_size:
+                    if len(body) >= self.thread_min_size:
+                        body = await anyio.to_thread.run_sync(compression_cache.compress, body, encoding)
+                    else:
+                        body = compression_cache.compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
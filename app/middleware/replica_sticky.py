@@ -0,0 +1,39 @@
+import math
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import DATABASE_REPLICA_URLS
+from app.utils.db_routing import REPLICA_STICKY_COOKIE, REPLICA_STICKY_SECONDS
+
+
+class ReplicaStickyMiddleware:
+    """请求中提交过写入时，用短期 Cookie 记录写入时间
+
+    每个 worker 都读取这个 Cookie，在 REPLICA_STICKY_SECONDS 内把该客户端的读请求发往主库，
+    不依赖进程内的状态。未配置从库时不做任何事。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.max_age = max(1, math.ceil(REPLICA_STICKY_SECONDS))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not DATABASE_REPLICA_URLS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                # 路由依赖中的 request.state 与 scope["state"] 是同一个字典
+                last_write = scope.get("state", {}).get("last_write")
+                if last_write is not None:
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Set-Cookie",
+                        f"{REPLICA_STICKY_COOKIE}={last_write:.3f}; Max-Age={self.max_age}; Path=/; "
+                        "HttpOnly; SameSite=Lax",
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,65 +1,74 @@
-import json
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.schemas.response import ResponseModel
-import logging
-from pydantic import BaseModel
+from typing import Dict, Optional
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class ResponseMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # 记录请求路径
-        logger.info(f"Processing request: {request.method} {request.url.path}")
-        
-        response = await call_next(request)
-        
-        # 记录响应类型
-        logger.info(f"Response type: {type(response)}")
-        
-        # 如果是 JSONResponse 且不是错误响应
-        if isinstance(response, JSONResponse) and response.status_code < 400:
-            try:
-                # 获取原始响应数据
-                response_body = response.body.decode()
-                logger.info(f"Response body: {response_body}")
-                
-                response_content = json.loads(response_body)
-                logger.info(f"Response content: {response_content}")
-                
-                # 检查是否已经是标准格式
-                if isinstance(response_content, dict) and all(key in response_content for key in ["code", "msg", "data"]):
-                    logger.info("Response already in standard format")
-                    
-                    # 确保 coins 字段是整数
-                    if "data" in response_content and isinstance(response_content["data"], dict) and "coins" in response_content["data"]:
-                        if response_content["data"]["coins"] is None:
-                            response_content["data"]["coins"] = 0
-                    
-                    return response
-                
-                # 创建新的响应
-                new_content = {
-                    "code": response.status_code,
-                    "msg": "",
-                    "data": response_content
-                }
-                logger.info(f"New content: {new_content}")
-                
-                # 创建新的 JSONResponse
-                new_response = JSONResponse(
-                    content=new_content,
-                    status_code=response.status_code,
-                    headers=dict(response.headers)
-                )
-                
-                return new_response
-            except Exception as e:
-                logger.error(f"Error processing response: {e}")
-                return response
-        
-        logger.info("Response not processed by middleware")
-        return response 
\ No newline at end of file
+from app.schemas.response import StandardResponse, ErrorResponseModel
+
+# id(路由) -> 是否需要包装成标准格式，路由对象在应用生命周期内不变
+_envelope_cache: Dict[int, bool] = {}
+
+
+def _route_needs_envelope(route) -> bool:
+    """根据路由声明的 response_model 判断返回值是否已经是标准格式"""
+    if not isinstance(route, APIRoute):
+        return False
+    needs = _envelope_cache.get(id(route))
+    if needs is None:
+        model = route.response_model
+        needs = not (isinstance(model, type) and issubclass(model, (StandardResponse, ErrorResponseModel)))
+        _envelope_cache[id(route)] = needs
+    return needs
+
+
+def _should_wrap(scope: Scope, message: Message) -> bool:
+    status = message["status"]
+    if status >= 400 or status in (204, 304):
+        return False
+    if not _route_needs_envelope(scope.get("route")):
+        return False
+    content_type = MutableHeaders(scope=message).get("content-type", "")
+    return content_type.startswith("application/json")
+
+
+class ResponseMiddleware:
+    """把未使用标准格式的 JSON 响应包装成 {"code", "msg", "data"}
+
+    是否包装由匹配到的路由决定，已声明 ResponseModel 的路由、非 JSON 响应
+    和流式响应都原样透传，不解析响应体。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        wrap = False
+        chunks = []
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, wrap
+            if message["type"] == "http.response.start":
+                wrap = _should_wrap(scope, message)
+                if wrap:
+                    start_message = message
+                    return
+            elif message["type"] == "http.response.body" and wrap:
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                status = start_message["status"]
+                body = b'{"code":%d,"msg":"","data":%s}' % (status, b"".join(chunks) or b"null")
+                headers = MutableHeaders(scope=start_message)
+                headers["content-length"] = str(len(body))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
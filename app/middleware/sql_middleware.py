@@ -0,0 +1,31 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils import sql_instrumentation
+
+
+class SQLInstrumentationMiddleware:
+    """统计每个请求的 SQL 语句数和数据库耗时，写入 Server-Timing 响应头"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        sql_instrumentation.install()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not sql_instrumentation.SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        token = sql_instrumentation.start_request(scope.get("path", ""))
+        stats = sql_instrumentation.current_stats()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sql_instrumentation.finish_request(token)
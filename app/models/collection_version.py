@@ -0,0 +1,10 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, String
+from app.database import Base
+
+class CollectionVersion(Base):
+    """每个用户每个集合（表名）的单调版本号，集合中新增或删除行时加一，用于列表的 ETag"""
+    __tablename__ = "collection_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    collection = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,13 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, Integer
+from app.database import Base
+
+class UserDailyStats(Base):
+    """按用户、按天汇总的任务完成统计，完成或取消完成任务时增量更新"""
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    completions = Column(Integer, nullable=False, default=0)
+    coins = Column(BigInteger, nullable=False, default=0)
+    # 取消完成时因余额不足没能扣回的金币，已计入 coins；完成记录删除后回填时靠它保留这部分
+    kept_coins = Column(BigInteger, nullable=False, default=0, server_default="0")
@@ -1,6 +1,6 @@
-from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, BigInteger, ForeignKey, Enum
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, BigInteger, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 import enum
 from app.database import Base
 
@@ -30,6 +30,10 @@ class Story(Base):
 
 class StoryChapter(Base):
     __tablename__ = "story_chapters"
+    __table_args__ = (
+        # 按故事取章节并按顺序排序
+        Index("ix_story_chapters_story_id_order_num", "story_id", "order_num"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     story_id = Column(Integer, ForeignKey("stories.id", ondelete="CASCADE"), nullable=False)
@@ -46,6 +50,9 @@ class StoryChapter(Base):
 
 class StoryChoice(Base):
     __tablename__ = "story_choices"
+    __table_args__ = (
+        Index("ix_story_choices_chapter_id", "chapter_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     chapter_id = Column(Integer, ForeignKey("story_chapters.id", ondelete="CASCADE"), nullable=False)
@@ -59,6 +66,10 @@ class StoryChoice(Base):
 
 class UserStory(Base):
     __tablename__ = "user_stories"
+    __table_args__ = (
+        # 按用户游标分页
+        Index("ix_user_stories_user_id_id", "user_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -67,6 +78,8 @@ class UserStory(Base):
     is_completed = Column(Boolean, default=False)
     unlocked_at = Column(DateTime(timezone=True), server_default=func.now())
     last_interaction = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # 每次更新自增，用于生成 ETag
+    row_version = Column(Integer, nullable=False, default=0, server_default="0", onupdate=literal_column("row_version") + 1)
     
     # 关系
     user = relationship("User")
@@ -1,7 +1,8 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, BigInteger, ForeignKey, Enum
+from sqlalchemy import Boolean, Column, Integer, SmallInteger, String, DateTime, BigInteger, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 import enum
+from datetime import datetime
 from app.database import Base
 
 class RepeatType(str, enum.Enum):
@@ -10,8 +11,25 @@ class RepeatType(str, enum.Enum):
     WEEKLY = "weekly"
     MONTHLY = "monthly"
 
+def _anchor_time(context) -> datetime:
+    """重复任务以创建当天（本地时间）为锚点；插入时 created_at 通常由数据库生成，此时取本地当前时间
+
+    迁移回填已有任务时会把数据库生成的 created_at 换算为本地时间，两者使用同一时区。
+    """
+    created_at = context.get_current_parameters().get("created_at") if context is not None else None
+    return created_at or datetime.now()
+
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # 按用户查询任务列表、按完成状态过滤
+        Index("ix_tasks_user_id_is_completed", "user_id", "is_completed"),
+        # 按用户游标分页
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+        # 按日期查询到期任务：重复任务按锚点匹配，一次性任务按截止日期
+        Index("ix_tasks_user_id_recurrence", "user_id", "repeat_type", "repeat_weekday", "repeat_monthday"),
+        Index("ix_tasks_user_id_due_date", "user_id", "due_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
@@ -23,7 +41,12 @@ class Task(Base):
     due_date = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 每次更新自增，用于生成 ETag
+    row_version = Column(Integer, nullable=False, default=0, server_default="0", onupdate=literal_column("row_version") + 1)
     task_plan_id = Column(Integer, ForeignKey("task_plans.id", ondelete="SET NULL"), nullable=True)
+    # 重复任务的锚点：每周任务在 repeat_weekday（0 为周一）到期，每月任务在 repeat_monthday 到期
+    repeat_weekday = Column(SmallInteger, nullable=True, default=lambda context: _anchor_time(context).weekday())
+    repeat_monthday = Column(SmallInteger, nullable=True, default=lambda context: _anchor_time(context).day)
     
     # 关系
     user = relationship("User", back_populates="tasks")
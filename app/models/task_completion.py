@@ -1,15 +1,22 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
 class TaskCompletion(Base):
     __tablename__ = "task_completions"
+    __table_args__ = (
+        # 用户的完成记录；取消完成时查找任务最近一次完成记录
+        Index("ix_task_completions_user_id_completed_at", "user_id", "completed_at"),
+        Index("ix_task_completions_task_id_completed_at", "task_id", "completed_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     completed_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 本次完成实际发放的金币；取消完成时按它扣回，统计回填也以它为准（旧记录为空时按任务奖励）
+    coins_earned = Column(BigInteger, nullable=True)
     
     # 关系
     task = relationship("Task", back_populates="completions")
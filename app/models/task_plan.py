@@ -1,6 +1,6 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, BigInteger, ForeignKey, Enum, Text
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, BigInteger, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 import enum
 from app.models.task import RepeatType
 from app.database import Base
@@ -12,6 +12,12 @@ class TaskPlanStatus(str, enum.Enum):
 
 class TaskPlan(Base):
     __tablename__ = "task_plans"
+    __table_args__ = (
+        # 定时生成任务时扫描活跃计划
+        Index("ix_task_plans_status_last_generated", "status", "last_generated"),
+        # 按用户游标分页
+        Index("ix_task_plans_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
@@ -25,6 +31,8 @@ class TaskPlan(Base):
     last_generated = Column(DateTime(timezone=True), nullable=True)  # 上次生成任务的时间
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 每次更新自增，用于生成 ETag
+    row_version = Column(Integer, nullable=False, default=0, server_default="0", onupdate=literal_column("row_version") + 1)
     
     # 关系
     user = relationship("User", back_populates="task_plans")
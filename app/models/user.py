@@ -1,5 +1,5 @@
 from sqlalchemy import Boolean, Column, Integer, String, DateTime, BigInteger
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -14,6 +14,8 @@ class User(Base):
     coins = Column(BigInteger, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 每次更新自增，用于生成 ETag
+    row_version = Column(Integer, nullable=False, default=0, server_default="0", onupdate=literal_column("row_version") + 1)
     
     # 关系
     tasks = relationship("Task", back_populates="user", cascade="all, delete-orphan")
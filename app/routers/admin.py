@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.database import get_engine, get_async_engine, get_replica_set, get_async_replica_set
+from app.utils.security import get_current_active_user
+from app.utils.pool_metrics import pool_status
+from app.utils.compression import compression_cache
+from app.utils.story_cache import story_cache
+from app.utils.leaderboard import leaderboard
+from app.schemas.response import ResponseModel
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("/db-pool", response_model=ResponseModel)
+def read_db_pool_status(current_user = Depends(get_current_active_user)):
+    """获取数据库连接池状态（仅管理员）"""
+    # 检查权限
+    if current_user.id != 1:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    status = pool_status(get_engine())
+    status["async_pool"] = pool_status(get_async_engine().sync_engine)
+    status["replicas"] = get_replica_set().status()
+    status["async_replicas"] = get_async_replica_set().status()
+    return ResponseModel(data=status)
+
+@router.get("/compression", response_model=ResponseModel)
+def read_compression_stats(current_user = Depends(get_current_active_user)):
+    """获取响应压缩统计：节省的字节数、压缩耗时与缓存命中情况（仅管理员）"""
+    # 检查权限
+    if current_user.id != 1:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return ResponseModel(data=compression_cache.stats())
+
+@router.get("/story-cache", response_model=ResponseModel)
+def read_story_cache_stats(current_user = Depends(get_current_active_user)):
+    """获取故事目录缓存统计（仅管理员）"""
+    # 检查权限
+    if current_user.id != 1:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return ResponseModel(data=story_cache.stats())
+
+@router.get("/leaderboard", response_model=ResponseModel)
+def read_leaderboard_stats(current_user = Depends(get_current_active_user)):
+    """获取排行榜索引状态：用户数、对账次数与上次对账修正的用户数（仅管理员）"""
+    # 检查权限
+    if current_user.id != 1:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    return ResponseModel(data=leaderboard.stats())
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database import get_db
+from app.models.user import User
+from app.schemas.user import LeaderboardEntry
+from app.schemas.response import ResponseModel
+from app.utils.security import get_current_active_user
+from app.utils.leaderboard import leaderboard
+
+router = APIRouter(
+    prefix="/leaderboard",
+    tags=["leaderboard"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("", response_model=ResponseModel[List[LeaderboardEntry]])
+def read_leaderboard(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """金币排行榜，按金币降序，金币相同的用户名次相同
+    
+    排名来自内存中的有序索引，数据库只按主键查询本页用户的用户名。
+    """
+    leaderboard.ensure_loaded()
+    entries = leaderboard.top(offset, limit)
+    if not entries:
+        return ResponseModel(data=[])
+    
+    names = dict(db.execute(
+        select(User.id, User.username).where(User.id.in_([entry["user_id"] for entry in entries]))
+    ).all())
+    # 其他 worker 刚删除的用户在下次对账前仍可能留在本进程的索引中
+    return ResponseModel(data=[
+        {**entry, "username": names[entry["user_id"]]} for entry in entries if entry["user_id"] in names
+    ])
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.story import Story, StoryChapter, StoryChoice, UserStory, UserStoryResponse, StoryType as ModelStoryType
 from app.models.user import User
 from app.schemas.story import (
@@ -11,6 +13,7 @@ from app.schemas.story import (
     StoryCreate,
     StoryUpdate,
     StoryChapter as StoryChapterSchema,
+    StoryChapterInDB,
     StoryChapterCreate,
     StoryChapterUpdate,
     StoryChoice as StoryChoiceSchema,
@@ -21,11 +24,21 @@ from app.schemas.story import (
     UserStoryUpdate,
     UserStoryResponse as UserStoryResponseSchema,
     UserStoryResponseCreate,
+    StoryInDB,
     StoryType
 )
-from app.utils.security import get_current_active_user
-from app.schemas.response import ResponseModel
+from app.utils.security import get_current_active_user, get_current_active_user_async
+from app.schemas.response import ResponseModel, PageResponse
+from app.utils.response import envelope_response, page_response
+from app.utils.pagination import keyset_paginate, split_page
+from app.utils.queries import USER_STORY_ORDER, user_stories, story_chapters
 from app.utils.response import error_response
+from app.utils.principal_cache import invalidate_user_cache
+from app.utils.coins import change_coins
+from app.utils.compression import compressible
+from app.utils.story_cache import story_cache, cached_json_response
+from app.utils.etag import make_etag, etag_matches, not_modified, with_etag, collection_version
+from app.utils.fieldsets import parse_csv_param
 
 router = APIRouter(
     prefix="/stories",
@@ -33,6 +46,49 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# 预加载方案，与各响应模型实际输出的嵌套字段对应，避免序列化时逐条延迟加载。
+# 写成函数是因为构造加载选项会触发 mapper 配置，不能在模型全部导入之前执行。
+def story_load():
+    """StorySchema: chapters -> choices"""
+    return (selectinload(Story.chapters).selectinload(StoryChapter.choices),)
+
+
+def chapter_load():
+    """StoryChapterSchema: choices"""
+    return (selectinload(StoryChapter.choices),)
+
+
+def user_story_load():
+    """UserStorySchema: story（不含章节）、current_chapter -> choices、responses"""
+    return (
+        joinedload(UserStory.story),
+        joinedload(UserStory.current_chapter).selectinload(StoryChapter.choices),
+        selectinload(UserStory.responses),
+    )
+
+
+# 故事列表 fields / include 参数可选的值
+STORY_FIELDS = tuple(StoryInDB.model_fields)
+STORY_INCLUDES = ("chapters", "chapters.choices")
+
+
+def _sparse_story(story: Story, fields: List[str], include: List[str]) -> Dict[str, Any]:
+    """按 fields / include 输出故事，只访问已加载的属性"""
+    data = {field: getattr(story, field) for field in fields}
+    if "chapters.choices" in include:
+        data["chapters"] = [StoryChapterSchema.model_validate(chapter, from_attributes=True) for chapter in story.chapters]
+    elif "chapters" in include:
+        data["chapters"] = [StoryChapterInDB.model_validate(chapter, from_attributes=True) for chapter in story.chapters]
+    return data
+
+
+def _load_user_story(db: Session, user_id: int, story_id: int) -> Optional[UserStory]:
+    """按 UserStorySchema 需要的关系一次性加载用户故事，提交后重新读取也使用它"""
+    return db.query(UserStory).options(*user_story_load()).filter(
+        UserStory.user_id == user_id,
+        UserStory.story_id == story_id
+    ).populate_existing().first()
+
 # 管理员路由 - 创建和管理故事
 @router.post("/", response_model=ResponseModel[StorySchema])
 def create_story(
@@ -50,35 +106,111 @@ def create_story(
     )
     db.add(db_story)
     db.commit()
+    story_cache.bump()
     db.refresh(db_story)
     return ResponseModel(data=db_story)
 
-@router.get("/", response_model=ResponseModel[List[StorySchema]])
-def read_stories(
+@router.get("/", response_model=PageResponse[List[StorySchema]])
+@compressible
+async def read_stories(
     skip: int = 0, 
     limit: int = 100, 
     active_only: bool = False,
-    db: Session = Depends(get_db), 
-    current_user = Depends(get_current_active_user)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="返回的故事字段，逗号分隔，如 id,title,story_type,unlock_cost"),
+    include: Optional[str] = Query(None, description="嵌套返回的关系：chapters 或 chapters.choices"),
+    db: AsyncSession = Depends(get_async_db), 
+    current_user = Depends(get_current_active_user_async)
 ):
-    """获取所有故事"""
-    query = db.query(Story)
+    """获取所有故事
+
+    fields 和 include 都不传时返回完整的故事、章节和选项；
+    只传 fields 时不加载章节，目录页只需要基本信息时使用。
+    """
+    field_list = parse_csv_param(fields, STORY_FIELDS, "fields")
+    include_list = parse_csv_param(include, STORY_INCLUDES, "include")
+    if include_list is None:
+        include_list = [] if field_list is not None else ["chapters.choices"]
+    
+    cache_key = ("stories", skip, limit, active_only, cursor, fields, tuple(include_list))
+    cached = story_cache.get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached)
+    version = story_cache.version
+    
+    # 异步会话不支持延迟加载，需要输出的关系都要预先加载
+    query = select(Story)
+    if field_list is not None:
+        query = query.options(load_only(*(getattr(Story, field) for field in field_list)))
+    if "chapters.choices" in include_list:
+        query = query.options(*story_load())
+    elif "chapters" in include_list:
+        query = query.options(selectinload(Story.chapters))
     if active_only:
-        query = query.filter(Story.is_active == True)
-    stories = query.offset(skip).limit(limit).all()
-    return ResponseModel(data=stories)
+        query = query.where(Story.is_active == True)
+    order_by = (Story.id,)
+    result = await db.execute(keyset_paginate(query, order_by, cursor, skip, limit))
+    stories, next_cursor = split_page(result.scalars().all(), order_by, limit)
+    if field_list is None and "chapters.choices" in include_list:
+        response = page_response(stories, List[StorySchema], next_cursor)
+    else:
+        data = [_sparse_story(story, field_list or list(STORY_FIELDS), include_list) for story in stories]
+        response = page_response(data, List[Dict[str, Any]], next_cursor)
+    story_cache.set(cache_key, response.body, version)
+    return response
+
+# 需要声明在 /{story_id} 之前，否则 "my" 会被当作 story_id 解析
+@router.get("/my", response_model=PageResponse)
+async def read_my_stories(
+    request: Request,
+    skip: int = 0, 
+    limit: int = 100, 
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db), 
+    current_user = Depends(get_current_active_user_async)
+):
+    """获取用户解锁的所有故事"""
+    version = await collection_version(db, UserStory, user_id=current_user.id)
+    etag = make_etag("stories/my", current_user.id, skip, limit, cursor, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    # 简单查询，不使用 joinedload
+    result = await db.execute(keyset_paginate(user_stories(current_user.id), USER_STORY_ORDER, cursor, skip, limit))
+    my_stories, next_cursor = split_page(result.scalars().all(), USER_STORY_ORDER, limit)
+    
+    # 返回最简单的响应
+    simple_result = []
+    for us in my_stories:
+        simple_result.append({
+            "id": us.id,
+            "story_id": us.story_id,
+            "current_chapter_id": us.current_chapter_id,
+            "is_completed": us.is_completed
+        })
+    
+    return with_etag(page_response(simple_result, List[Dict[str, Any]], next_cursor), etag)
 
 @router.get("/{story_id}", response_model=ResponseModel[StorySchema])
+@compressible
 def read_story(
     story_id: int, 
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
     """获取特定故事"""
-    story = db.query(Story).filter(Story.id == story_id).first()
+    cache_key = ("story", story_id)
+    cached = story_cache.get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached)
+    version = story_cache.version
+    
+    story = db.query(Story).options(*story_load()).filter(Story.id == story_id).first()
     if story is None:
         raise HTTPException(status_code=404, detail="Story not found")
-    return ResponseModel(data=story)
+    response = envelope_response(story, StorySchema)
+    story_cache.set(cache_key, response.body, version)
+    return response
 
 @router.put("/{story_id}", response_model=ResponseModel[StorySchema])
 def update_story(
@@ -101,7 +233,8 @@ def update_story(
         setattr(db_story, key, value)
     
     db.commit()
-    db.refresh(db_story)
+    story_cache.bump()
+    db_story = db.query(Story).options(*story_load()).filter(Story.id == story_id).populate_existing().one()
     return ResponseModel(data=db_story)
 
 @router.delete("/{story_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -121,6 +254,7 @@ def delete_story(
     
     db.delete(db_story)
     db.commit()
+    story_cache.bump()
     return None
 
 # 章节管理
@@ -148,38 +282,55 @@ def create_chapter(
     )
     db.add(db_chapter)
     db.commit()
+    story_cache.bump()
     db.refresh(db_chapter)
     return ResponseModel(data=db_chapter)
 
 @router.get("/chapters/{story_id}", response_model=ResponseModel[List[StoryChapterSchema]])
+@compressible
 def read_story_chapters(
     story_id: int, 
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
     """获取故事的所有章节"""
+    cache_key = ("chapters", story_id)
+    cached = story_cache.get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached)
+    version = story_cache.version
+    
     # 检查故事是否存在
     story = db.query(Story).filter(Story.id == story_id).first()
     if story is None:
         raise HTTPException(status_code=404, detail="Story not found")
     
-    chapters = db.query(StoryChapter).filter(
-        StoryChapter.story_id == story_id
-    ).order_by(StoryChapter.order_num).all()
+    chapters = db.execute(story_chapters(story_id).options(*chapter_load())).scalars().all()
     
-    return ResponseModel(data=chapters)
+    response = envelope_response(chapters, List[StoryChapterSchema])
+    story_cache.set(cache_key, response.body, version)
+    return response
 
 @router.get("/chapters/{chapter_id}", response_model=ResponseModel[StoryChapterSchema])
+@compressible
 def read_chapter(
     chapter_id: int, 
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
     """获取特定章节"""
-    chapter = db.query(StoryChapter).filter(StoryChapter.id == chapter_id).first()
+    cache_key = ("chapter", chapter_id)
+    cached = story_cache.get(cache_key)
+    if cached is not None:
+        return cached_json_response(cached)
+    version = story_cache.version
+    
+    chapter = db.query(StoryChapter).options(*chapter_load()).filter(StoryChapter.id == chapter_id).first()
     if chapter is None:
         raise HTTPException(status_code=404, detail="Chapter not found")
-    return ResponseModel(data=chapter)
+    response = envelope_response(chapter, StoryChapterSchema)
+    story_cache.set(cache_key, response.body, version)
+    return response
 
 @router.put("/chapters/{chapter_id}", response_model=ResponseModel[StoryChapterSchema])
 def update_chapter(
@@ -202,7 +353,10 @@ def update_chapter(
         setattr(db_chapter, key, value)
     
     db.commit()
-    db.refresh(db_chapter)
+    story_cache.bump()
+    db_chapter = db.query(StoryChapter).options(*chapter_load()).filter(
+        StoryChapter.id == chapter_id
+    ).populate_existing().one()
     return ResponseModel(data=db_chapter)
 
 @router.delete("/chapters/{chapter_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -222,6 +376,7 @@ def delete_chapter(
     
     db.delete(db_chapter)
     db.commit()
+    story_cache.bump()
     return None
 
 # 选择管理
@@ -254,6 +409,7 @@ def create_choice(
     )
     db.add(db_choice)
     db.commit()
+    story_cache.bump()
     db.refresh(db_choice)
     return ResponseModel(data=db_choice)
 
@@ -271,26 +427,21 @@ def unlock_story(
         raise HTTPException(status_code=404, detail="Story not found or not active")
     
     # 检查用户是否已经解锁了这个故事
-    existing_user_story = db.query(UserStory).filter(
-        UserStory.user_id == current_user.id,
-        UserStory.story_id == story_id
-    ).first()
+    existing_user_story = _load_user_story(db, current_user.id, story_id)
     
     if existing_user_story:
         return ResponseModel(data=existing_user_story)
     
-    # 检查用户是否有足够的coins
-    if current_user.coins < story.unlock_cost:
-        raise HTTPException(status_code=400, detail="Not enough coins to unlock this story")
-    
-    # 扣除用户的coins
-    current_user.coins -= story.unlock_cost
-    
     # 获取故事的第一个章节
     first_chapter = db.query(StoryChapter).filter(
         StoryChapter.story_id == story_id
     ).order_by(StoryChapter.order_num).first()
     
+    # 扣除用户的coins，余额不足时不做修改；current_user 来自缓存快照，余额以数据库为准
+    if change_coins(db, current_user.id, -story.unlock_cost) is None:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Not enough coins to unlock this story")
+    
     # 创建用户故事记录
     user_story = UserStory(
         user_id=current_user.id,
@@ -299,49 +450,22 @@ def unlock_story(
     )
     
     db.add(user_story)
+    username = current_user.username
     db.commit()
-    db.refresh(user_story)
+    invalidate_user_cache(username)
+    user_story = _load_user_story(db, current_user.id, story_id)
     
     return ResponseModel(data=user_story)
 
-@router.get("/my")
-def read_my_stories(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db), 
-    current_user = Depends(get_current_active_user)
-):
-    """获取用户解锁的所有故事"""
-    print(f'获取用户 {current_user.username} 的所有解锁故事')
-
-    # 简单查询，不使用 joinedload
-    user_stories = db.query(UserStory).filter(
-        UserStory.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    
-    # 返回最简单的响应
-    simple_result = []
-    for us in user_stories:
-        simple_result.append({
-            "id": us.id,
-            "story_id": us.story_id,
-            "current_chapter_id": us.current_chapter_id,
-            "is_completed": us.is_completed
-        })
-    
-    return ResponseModel(data=simple_result)
-
 @router.get("/my/{story_id}", response_model=ResponseModel[UserStorySchema])
+@compressible
 def read_my_story(
     story_id: int, 
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
     """获取用户特定的解锁故事"""
-    user_story = db.query(UserStory).filter(
-        UserStory.user_id == current_user.id,
-        UserStory.story_id == story_id
-    ).first()
+    user_story = _load_user_story(db, current_user.id, story_id)
     
     if user_story is None:
         raise error_response(404, "Story not unlocked")
@@ -399,7 +523,7 @@ def respond_to_story(
                 user_story.is_completed = True
     
     db.commit()
-    db.refresh(user_story)
+    user_story = _load_user_story(db, current_user.id, story_id)
     
     return ResponseModel(data=user_story)
 
@@ -422,7 +546,7 @@ def get_current_chapter(
     if user_story.current_chapter_id is None:
         raise HTTPException(status_code=404, detail="No current chapter")
     
-    chapter = db.query(StoryChapter).filter(
+    chapter = db.query(StoryChapter).options(*chapter_load()).filter(
         StoryChapter.id == user_story.current_chapter_id
     ).first()
     
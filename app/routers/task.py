@@ -1,20 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Query
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any, Union
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.task import Task as TaskModel, RepeatType
 from app.models.task_completion import TaskCompletion as TaskCompletionModel
-from app.models.user import User
+from app.models.daily_stats import UserDailyStats
 from app.schemas.task import (
     Task as TaskSchema,
     TaskCreate,
     TaskUpdate,
+    TaskBulkUpdate,
+    TaskDueCalendar,
+    TaskStats,
     TaskCompletion as TaskCompletionSchema
 )
-from app.utils.security import get_current_active_user
-from app.schemas.response import ResponseModel
+from app.utils.security import get_current_active_user, get_current_active_user_async
+from app.schemas.bulk import BulkItems, BulkIds
+from app.schemas.response import ResponseModel, PageResponse
+from app.utils.response import page_response
+from app.utils.pagination import keyset_paginate, split_page
+from app.utils.etag import make_etag, etag_matches, not_modified, with_etag, collection_version, bump_collection_version
+from app.utils.principal_cache import invalidate_user_cache
+from app.utils.coins import change_coins, change_coins_applied
+from app.utils.recurrence import date_range, due_calendar
+from app.utils.queries import (
+    TASK_ORDER, COMPLETION_ORDER, user_tasks, due_tasks, user_completions, latest_completion,
+)
+from app.utils.daily_stats import add_daily_stats, build_stats
+from app.utils.bulk import (
+    check_bulk_size, unique_ids, validate_items, owned_ids, insert_rows, apply_updates, item_result, bulk_data
+)
 from pydantic import BaseModel
 
 router = APIRouter(
@@ -34,7 +53,7 @@ class TaskCompletionResponse(BaseModel):
         from_attributes = True
 
 @router.post("/", response_model=ResponseModel[TaskSchema])
-def create_task(task: TaskCreate, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+async def create_task(task: TaskCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_active_user_async)):
     """创建新任务"""
     db_task = TaskModel(
         title=task.title,
@@ -45,44 +64,283 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db), current_user =
         due_date=task.due_date
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await db.commit()
+    await db.refresh(db_task)
     return ResponseModel(data=db_task)
 
-@router.get("/", response_model=ResponseModel[List[TaskSchema]])
-def read_tasks(
+@router.get("/", response_model=PageResponse[List[TaskSchema]])
+async def read_tasks(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
     completed: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db), 
+    current_user = Depends(get_current_active_user_async)
+):
+    """获取当前用户的所有任务，按 id 排序，传入上一页的 next_cursor 获取下一页"""
+    version = await collection_version(db, TaskModel, user_id=current_user.id)
+    etag = make_etag("tasks", current_user.id, skip, limit, completed, cursor, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    result = await db.execute(keyset_paginate(user_tasks(current_user.id, completed), TASK_ORDER, cursor, skip, limit))
+    tasks, next_cursor = split_page(result.scalars().all(), TASK_ORDER, limit)
+    return with_etag(page_response(tasks, List[TaskSchema], next_cursor), etag)
+
+# 需要声明在 /{task_id} 之前，否则 "completions" 会被当作 task_id 解析
+@router.get("/completions", response_model=PageResponse[List[TaskCompletionSchema]])
+def read_all_task_completions(
+    skip: int = 0, 
+    limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
-    """获取当前用户的所有任务"""
-    query = db.query(TaskModel).filter(TaskModel.user_id == current_user.id)
+    """获取当前用户的所有任务完成记录，按完成时间排序"""
+    query = keyset_paginate(user_completions(current_user.id), COMPLETION_ORDER, cursor, skip, limit)
+    completions, next_cursor = split_page(db.execute(query).scalars().all(), COMPLETION_ORDER, limit)
+    
+    return page_response(completions, List[TaskCompletionSchema], next_cursor)
+
+# 余额首次达到该值时自动解锁一个故事
+STORY_UNLOCK_COINS = 1000
+
+def _unlock_next_story(db: Session, user_id: int):
+    """解锁一个用户尚未解锁的故事，返回该故事；没有可解锁的故事时返回 None"""
+    from app.models.story import Story, StoryChapter, UserStory
+    story = db.query(Story).filter(
+        ~Story.id.in_(
+            db.query(UserStory.story_id).filter(UserStory.user_id == user_id)
+        ),
+        Story.is_active == True
+    ).first()
+    if story is None:
+        return None
+    
+    first_chapter = db.query(StoryChapter).filter(
+        StoryChapter.story_id == story.id
+    ).order_by(StoryChapter.order_num).first()
+    
+    db.add(UserStory(
+        user_id=user_id,
+        story_id=story.id,
+        current_chapter_id=first_chapter.id if first_chapter else None
+    ))
+    return story
+
+def _story_summary(story) -> Dict[str, Any]:
+    return {"id": story.id, "title": story.title, "description": story.description}
+
+# 需要声明在 /{task_id} 之前
+@router.post("/complete:batch", response_model=ResponseModel[Dict[str, Any]])
+def complete_tasks_batch(
+    body: BulkIds,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """批量完成任务，用于客户端离线后同步
     
-    if completed is not None:
-        query = query.filter(TaskModel.is_completed == completed)
+    所有任务在同一个事务中完成：一次查询加载任务、一次批量插入完成记录、一次修改余额，
+    故事解锁只按最终余额判断一次。results 按请求顺序（重复的 id 只保留第一次）返回每个任务的处理结果，
+    status 为 completed / already_completed / not_found。
+    """
+    task_ids = unique_ids(body.ids)
+    check_bulk_size(len(task_ids))
     
-    tasks = query.offset(skip).limit(limit).all()
-    return ResponseModel(data=tasks)
+    # 锁定这些任务行，避免与并发的完成/取消完成请求交错
+    tasks = {
+        task.id: task
+        for task in db.query(TaskModel).filter(
+            TaskModel.id.in_(task_ids),
+            TaskModel.user_id == current_user.id
+        ).with_for_update()
+    }
+    pending = [task_id for task_id in task_ids if task_id in tasks and not tasks[task_id].is_completed]
+    
+    completed = set()
+    if pending:
+        stmt = (
+            update(TaskModel)
+            .where(TaskModel.id.in_(pending), TaskModel.is_completed == False)
+            .values(is_completed=True)
+            .execution_options(synchronize_session=False)
+        )
+        if db.get_bind().dialect.update_returning:
+            completed = set(db.execute(stmt.returning(TaskModel.id)).scalars())
+        elif db.execute(stmt).rowcount == len(pending):
+            completed = set(pending)
+        else:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Tasks were modified concurrently, please retry")
+    
+    completed_ids = [task_id for task_id in pending if task_id in completed]
+    completed_at = datetime.now()
+    if completed_ids:
+        db.execute(
+            insert(TaskCompletionModel),
+            [
+                {
+                    "task_id": task_id, "user_id": current_user.id, "completed_at": completed_at,
+                    "coins_earned": tasks[task_id].coins_reward,
+                }
+                for task_id in completed_ids
+            ]
+        )
+    
+    coins_earned = sum(tasks[task_id].coins_reward for task_id in completed_ids)
+    total_coins = change_coins(db, current_user.id, coins_earned)
+    if total_coins is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
+    if completed_ids:
+        add_daily_stats(db, current_user.id, completed_at.date(), len(completed_ids), coins_earned)
+    
+    unlocked_story = None
+    if total_coins - coins_earned < STORY_UNLOCK_COINS <= total_coins:
+        unlocked_story = _unlock_next_story(db, current_user.id)
+    
+    results = []
+    for index, task_id in enumerate(task_ids):
+        if task_id not in tasks:
+            results.append(item_result(index, task_id, "not_found", coins_earned=0))
+        elif task_id in completed:
+            results.append(item_result(index, task_id, "completed", coins_earned=tasks[task_id].coins_reward))
+        else:
+            results.append(item_result(index, task_id, "already_completed", coins_earned=0))
+    
+    username = current_user.username
+    db.commit()
+    if completed_ids:
+        invalidate_user_cache(username)
+    
+    msg = f"完成 {len(completed_ids)} 个任务，获得 {coins_earned} 金币"
+    if unlocked_story:
+        msg += f"，并解锁了故事《{unlocked_story.title}》"
+    return ResponseModel(
+        data={
+            "results": results,
+            "completed": len(completed_ids),
+            "coins_earned": coins_earned,
+            "total_coins": total_coins,
+            "unlocked_story": _story_summary(unlocked_story) if unlocked_story else None
+        },
+        msg=msg
+    )
+
+@router.post("/create:batch", response_model=ResponseModel[Dict[str, Any]])
+def create_tasks_batch(
+    body: BulkItems,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """批量创建任务，条目格式同 POST /tasks/
+    
+    校验通过的条目在同一个事务中用一条多行 INSERT 写入，只返回新任务的 id；
+    未通过校验的条目在 results 中返回错误信息，不影响其他条目。
+    """
+    check_bulk_size(len(body.items))
+    valid, results = validate_items(body.items, TaskCreate)
+    ids = insert_rows(db, TaskModel, [{**task.dict(), "user_id": current_user.id} for _, task in valid])
+    db.commit()
+    
+    results += [item_result(index, task_id, "created") for (index, _), task_id in zip(valid, ids)]
+    return ResponseModel(data=bulk_data(results), msg=f"创建了 {len(ids)} 个任务")
+
+@router.post("/update:batch", response_model=ResponseModel[Dict[str, Any]])
+def update_tasks_batch(
+    body: BulkItems,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """批量更新任务，每个条目包含 id 和要修改的字段，格式同 PUT /tasks/{task_id}"""
+    check_bulk_size(len(body.items))
+    valid, results = validate_items(body.items, TaskBulkUpdate)
+    results += apply_updates(db, TaskModel, valid, current_user.id)
+    db.commit()
+    
+    data = bulk_data(results)
+    return ResponseModel(data=data, msg=f"更新了 {data['succeeded']} 个任务")
+
+@router.post("/delete:batch", response_model=ResponseModel[Dict[str, Any]])
+def delete_tasks_batch(
+    body: BulkIds,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """批量删除任务及其完成记录"""
+    task_ids = unique_ids(body.ids)
+    check_bulk_size(len(task_ids))
+    owned = owned_ids(db, TaskModel, task_ids, current_user.id)
+    if owned:
+        # 批量 DELETE 不经过 ORM 的级联，先删除完成记录
+        db.execute(delete(TaskCompletionModel).where(TaskCompletionModel.task_id.in_(owned)))
+        db.execute(delete(TaskModel).where(TaskModel.id.in_(owned)))
+        bump_collection_version(db, TaskModel, [current_user.id])
+    db.commit()
+    
+    results = [
+        item_result(index, task_id, "deleted" if task_id in owned else "not_found")
+        for index, task_id in enumerate(task_ids)
+    ]
+    return ResponseModel(data=bulk_data(results), msg=f"删除了 {len(owned)} 个任务")
+
+# 需要声明在 /{task_id} 之前
+@router.get("/stats", response_model=ResponseModel[TaskStats])
+async def read_task_stats(
+    days: int = Query(30, ge=1, le=366),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_active_user_async)
+):
+    """任务完成统计：最近 days 天每天的完成数和金币、按周汇总、当前和最长连续完成天数
+    
+    数据来自按天汇总的 user_daily_stats，每个用户每个有完成记录的日子一行，
+    不需要扫描完成记录。
+    """
+    result = await db.execute(
+        select(UserDailyStats.day, UserDailyStats.completions, UserDailyStats.coins)
+        .where(UserDailyStats.user_id == current_user.id)
+        .order_by(UserDailyStats.day)
+    )
+    return ResponseModel(data=build_stats(result.all(), datetime.now().date(), days))
+
+# 需要声明在 /{task_id} 之前，否则 "due" 会被当作 task_id 解析
+@router.get("/due", response_model=ResponseModel[TaskDueCalendar])
+async def read_tasks_due(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_active_user_async)
+):
+    """获取日期区间内每天到期的未完成任务
+    
+    一次查询取出区间内任意一天到期的任务，再按天展开；
+    tasks 中每个任务只出现一次，days 按日期列出当天到期的任务 id。
+    """
+    days = date_range(from_date, to_date)
+    result = await db.execute(due_tasks(current_user.id, days))
+    tasks = result.scalars().all()
+    return ResponseModel(data={"tasks": tasks, "days": due_calendar(tasks, days)})
 
 @router.get("/{task_id}", response_model=ResponseModel[TaskSchema])
-def read_task(task_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+async def read_task(task_id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(get_current_active_user_async)):
     """获取特定任务的详情"""
-    task = db.query(TaskModel).filter(TaskModel.id == task_id, TaskModel.user_id == current_user.id).first()
+    result = await db.execute(select(TaskModel).where(TaskModel.id == task_id, TaskModel.user_id == current_user.id))
+    task = result.scalars().first()
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     return ResponseModel(data=task)
 
 @router.put("/{task_id}", response_model=ResponseModel[TaskSchema])
-def update_task(
+async def update_task(
     task_id: int, 
     task: TaskUpdate, 
-    db: Session = Depends(get_db), 
-    current_user = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db), 
+    current_user = Depends(get_current_active_user_async)
 ):
     """更新任务"""
-    db_task = db.query(TaskModel).filter(TaskModel.id == task_id, TaskModel.user_id == current_user.id).first()
+    result = await db.execute(select(TaskModel).where(TaskModel.id == task_id, TaskModel.user_id == current_user.id))
+    db_task = result.scalars().first()
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -90,8 +348,8 @@ def update_task(
     for key, value in task.dict(exclude_unset=True).items():
         setattr(db_task, key, value)
     
-    db.commit()
-    db.refresh(db_task)
+    await db.commit()
+    await db.refresh(db_task)
     
     return ResponseModel(data=db_task)
 
@@ -121,50 +379,45 @@ def complete_task(
     if db_task.is_completed:
         raise HTTPException(status_code=400, detail="Task is already completed")
     
-    # 标记任务为已完成
-    db_task.is_completed = True
+    # 标记任务为已完成；条件更新保证并发的重复请求只有一个能成功，不会重复发放奖励
+    marked = db.execute(
+        update(TaskModel)
+        .where(TaskModel.id == db_task.id, TaskModel.is_completed == False)
+        .values(is_completed=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if marked == 0:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Task is already completed")
     
-    # 创建完成记录
+    # 创建完成记录；显式写入完成时间，与按天汇总的统计使用同一天
+    completed_at = datetime.now()
+    # 奖励用户 coins
+    coins_reward = db_task.coins_reward
+    total_coins = change_coins(db, current_user.id, coins_reward)
+    if total_coins is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
+    original_coins = total_coins - coins_reward  # 记录原始金币数量
+    # 完成记录保存本次实际发放的金币，取消完成时按它扣回
     completion = TaskCompletionModel(
         task_id=db_task.id,
-        user_id=current_user.id
+        user_id=current_user.id,
+        completed_at=completed_at,
+        coins_earned=coins_reward
     )
     db.add(completion)
-    
-    # 奖励用户 coins
-    user = db.query(User).filter(User.id == current_user.id).first()
-    original_coins = user.coins  # 记录原始金币数量
-    user.coins += db_task.coins_reward
+    add_daily_stats(db, current_user.id, completed_at.date(), 1, coins_reward)
     
     # 检查是否有可解锁的故事
     unlocked_story = None
-    if original_coins < 1000 and user.coins >= 1000:
-        # 查找一个用户尚未解锁的故事
-        from app.models.story import Story, UserStory
-        story = db.query(Story).filter(
-            ~Story.id.in_(
-                db.query(UserStory.story_id).filter(UserStory.user_id == current_user.id)
-            ),
-            Story.is_active == True
-        ).first()
-        
-        if story:
-            # 解锁故事
-            from app.models.story import StoryChapter
-            first_chapter = db.query(StoryChapter).filter(
-                StoryChapter.story_id == story.id
-            ).order_by(StoryChapter.order_num).first()
-            
-            user_story = UserStory(
-                user_id=current_user.id,
-                story_id=story.id,
-                current_chapter_id=first_chapter.id if first_chapter else None
-            )
-            db.add(user_story)
-            unlocked_story = story
+    if original_coins < STORY_UNLOCK_COINS <= total_coins:
+        unlocked_story = _unlock_next_story(db, current_user.id)
     
     # 提交所有更改
+    username = current_user.username
     db.commit()
+    invalidate_user_cache(username)
     db.refresh(db_task)
     
     # 返回响应
@@ -172,13 +425,9 @@ def complete_task(
         return ResponseModel(
             data={
                 "task": db_task,
-                "unlocked_story": {
-                    "id": unlocked_story.id,
-                    "title": unlocked_story.title,
-                    "description": unlocked_story.description
-                },
+                "unlocked_story": _story_summary(unlocked_story),
                 "coins_earned": db_task.coins_reward,
-                "total_coins": user.coins
+                "total_coins": total_coins
             },
             msg=f"任务完成！获得 {db_task.coins_reward} 金币，并解锁了故事《{unlocked_story.title}》"
         )
@@ -202,35 +451,45 @@ def uncomplete_task(
     if not db_task.is_completed:
         raise HTTPException(status_code=400, detail="Task is not completed")
     
+    # 标记任务为未完成；与完成任务一样使用条件更新，避免重复扣除
+    marked = db.execute(
+        update(TaskModel)
+        .where(TaskModel.id == db_task.id, TaskModel.is_completed == True)
+        .values(is_completed=False)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if marked == 0:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Task is not completed")
+    
     # 查找最近的完成记录
-    completion = db.query(TaskCompletionModel).filter(
-        TaskCompletionModel.task_id == db_task.id,
-        TaskCompletionModel.user_id == current_user.id
-    ).order_by(TaskCompletionModel.completed_at.desc()).first()
+    completion = db.execute(latest_completion(current_user.id, db_task.id)).scalars().first()
     
     if completion:
         # 删除完成记录
         db.delete(completion)
         
-        # 扣除用户获得的 coins
-        user = db.query(User).filter(User.id == current_user.id).first()
-        user.coins -= db_task.coins_reward
-        if user.coins < 0:
-            user.coins = 0
-    
-    # 标记任务为未完成
-    db_task.is_completed = False
+        # 扣回这次完成实际发放的 coins（旧记录按任务奖励），最多扣到 0
+        earned = completion.coins_earned if completion.coins_earned is not None else db_task.coins_reward
+        result = change_coins_applied(db, current_user.id, -earned, floor_at_zero=True)
+        if result is not None and completion.completed_at is not None:
+            # 统计只减去实际扣回的金币，没能扣回的部分记为 kept_coins
+            _, applied = result
+            add_daily_stats(db, current_user.id, completion.completed_at.date(), -1, applied, kept_coins=earned + applied)
     
+    username = current_user.username
     db.commit()
+    invalidate_user_cache(username)
     db.refresh(db_task)
     
     return ResponseModel(data=db_task)
 
-@router.get("/{task_id}/completions", response_model=ResponseModel[List[TaskCompletionSchema]])
+@router.get("/{task_id}/completions", response_model=PageResponse[List[TaskCompletionSchema]])
 def read_task_completions_by_task(
     task_id: int,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_active_user)
 ):
@@ -245,77 +504,17 @@ def read_task_completions_by_task(
         raise HTTPException(status_code=404, detail="Task not found")
     
     # 获取任务的完成记录
-    completions = db.query(TaskCompletionModel).filter(
-        TaskCompletionModel.task_id == task_id,
-        TaskCompletionModel.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    query = keyset_paginate(user_completions(current_user.id, task_id), COMPLETION_ORDER, cursor, skip, limit)
+    completions, next_cursor = split_page(db.execute(query).scalars().all(), COMPLETION_ORDER, limit)
     
-    return ResponseModel(data=completions)
+    return page_response(completions, List[TaskCompletionSchema], next_cursor)
 
-@router.get("/completions", response_model=ResponseModel[List[TaskCompletionSchema]])
-def read_all_task_completions(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db), 
-    current_user = Depends(get_current_active_user)
-):
-    """获取当前用户的所有任务完成记录"""
-    print(current_user)
-    completions = db.query(TaskCompletionModel).filter(
-        TaskCompletionModel.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    
-    return ResponseModel(data=completions)
 
 @router.get("/due/today", response_model=ResponseModel[List[TaskSchema]])
-def read_tasks_due_today(
-    db: Session = Depends(get_db), 
-    current_user = Depends(get_current_active_user)
+async def read_tasks_due_today(
+    db: AsyncSession = Depends(get_async_db), 
+    current_user = Depends(get_current_active_user_async)
 ):
-    """获取今天到期的任务"""
-    today = datetime.now().date()
-    tomorrow = today + timedelta(days=1)
-    
-    # 获取今天到期的非重复任务
-    non_repeat_tasks = db.query(TaskModel).filter(
-        TaskModel.user_id == current_user.id,
-        TaskModel.repeat_type == RepeatType.NONE,
-        TaskModel.due_date >= today,
-        TaskModel.due_date < tomorrow,
-        TaskModel.is_completed == False
-    ).all()
-    
-    # 获取每日重复任务
-    daily_tasks = db.query(TaskModel).filter(
-        TaskModel.user_id == current_user.id,
-        TaskModel.repeat_type == RepeatType.DAILY,
-        TaskModel.is_completed == False
-    ).all()
-    
-    # 获取每周重复任务（如果今天是任务创建的同一星期几）
-    weekly_tasks = []
-    weekly_tasks_query = db.query(TaskModel).filter(
-        TaskModel.user_id == current_user.id,
-        TaskModel.repeat_type == RepeatType.WEEKLY,
-        TaskModel.is_completed == False
-    ).all()
-    
-    for task in weekly_tasks_query:
-        if task.created_at.weekday() == today.weekday():
-            weekly_tasks.append(task)
-    
-    # 获取每月重复任务（如果今天是任务创建的同一日期）
-    monthly_tasks = []
-    monthly_tasks_query = db.query(TaskModel).filter(
-        TaskModel.user_id == current_user.id,
-        TaskModel.repeat_type == RepeatType.MONTHLY,
-        TaskModel.is_completed == False
-    ).all()
-    
-    for task in monthly_tasks_query:
-        if task.created_at.day == today.day:
-            monthly_tasks.append(task)
-    
-    # 合并所有任务
-    all_tasks = non_repeat_tasks + daily_tasks + weekly_tasks + monthly_tasks
-    return ResponseModel(data=all_tasks)
+    """获取今天到期的任务：今天截止的一次性任务、每日任务，以及锚点落在今天的每周和每月任务"""
+    result = await db.execute(due_tasks(current_user.id, [datetime.now().date()]))
+    return ResponseModel(data=result.scalars().all())
\ No newline at end of file
@@ -1,20 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session, class_mapper
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session, class_mapper, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.task_plan import TaskPlan as TaskPlanModel, TaskPlanStatus
 from app.models.task import Task as TaskModel, RepeatType
 from app.schemas.task_plan import (
     TaskPlan as TaskPlanSchema,
     TaskPlanCreate,
     TaskPlanUpdate,
+    TaskPlanBulkUpdate,
     TaskPlanWithInitialTask
 )
-from app.utils.security import get_current_active_user
-from app.schemas.response import ResponseModel
+from app.utils.security import get_current_active_user, get_current_active_user_async
+from app.schemas.bulk import BulkItems, BulkIds
+from app.schemas.response import ResponseModel, PageResponse
+from app.utils.response import page_response
+from app.utils.pagination import keyset_paginate, split_page
+from app.utils.queries import TASK_PLAN_ORDER, user_task_plans
+from app.utils.etag import make_etag, etag_matches, not_modified, with_etag, collection_version, bump_collection_version
+from app.utils.bulk import (
+    check_bulk_size, unique_ids, validate_items, owned_ids, insert_rows, apply_updates, item_result, bulk_data
+)
 
 router = APIRouter(
     prefix="/task-plans",
@@ -83,19 +94,111 @@ def create_task_plan(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"创建任务计划失败: {str(e)}")
 
-@router.get("/", response_model=ResponseModel[List[TaskPlanSchema]])
-def read_task_plans(
+@router.get("/", response_model=PageResponse[List[TaskPlanSchema]])
+async def read_task_plans(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db), 
-    current_user = Depends(get_current_active_user)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db), 
+    current_user = Depends(get_current_active_user_async)
 ):
     """获取当前用户的所有任务计划"""
-    task_plans = db.query(TaskPlanModel).filter(
-        TaskPlanModel.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    # 响应中包含计划生成的任务，两者任一变化都要更新 ETag
+    plans_version = await collection_version(db, TaskPlanModel, user_id=current_user.id)
+    tasks_version = await collection_version(
+        db, TaskModel, TaskModel.task_plan_id.isnot(None), user_id=current_user.id
+    )
+    etag = make_etag("task-plans", current_user.id, skip, limit, cursor, plans_version, tasks_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    query = user_task_plans(current_user.id).options(selectinload(TaskPlanModel.tasks))
+    result = await db.execute(keyset_paginate(query, TASK_PLAN_ORDER, cursor, skip, limit))
+    task_plans, next_cursor = split_page(result.scalars().all(), TASK_PLAN_ORDER, limit)
     
-    return ResponseModel(data=task_plans)
+    return with_etag(page_response(task_plans, List[TaskPlanSchema], next_cursor), etag)
+
+@router.post("/create:batch", response_model=ResponseModel[Dict[str, Any]])
+def create_task_plans_batch(
+    body: BulkItems,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """批量创建任务计划，条目格式同 POST /task-plans/，每个计划同时生成第一个任务
+    
+    计划和初始任务各用一条多行 INSERT 写入，在同一个事务中提交；
+    results 中返回计划 id 和初始任务 id，未通过校验的条目返回错误信息。
+    """
+    check_bulk_size(len(body.items))
+    valid, results = validate_items(body.items, TaskPlanCreate)
+    now = datetime.now()
+    plans = [plan for _, plan in valid]
+    plan_ids = insert_rows(
+        db, TaskPlanModel, [{**plan.dict(), "user_id": current_user.id, "last_generated": now} for plan in plans]
+    )
+    task_ids = insert_rows(db, TaskModel, [
+        {
+            "title": plan.title,
+            "description": plan.description,
+            "user_id": current_user.id,
+            "repeat_type": plan.repeat_type,
+            "coins_reward": plan.coins_reward,
+            "task_plan_id": plan_id,
+            "due_date": initial_due_date(plan.repeat_type, plan.end_date, now),
+        }
+        for plan, plan_id in zip(plans, plan_ids)
+    ])
+    db.commit()
+    
+    results += [
+        item_result(index, plan_id, "created", initial_task_id=task_id)
+        for (index, _), plan_id, task_id in zip(valid, plan_ids, task_ids)
+    ]
+    return ResponseModel(data=bulk_data(results), msg=f"创建了 {len(plan_ids)} 个任务计划")
+
+@router.post("/update:batch", response_model=ResponseModel[Dict[str, Any]])
+def update_task_plans_batch(
+    body: BulkItems,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """批量更新任务计划，每个条目包含 id 和要修改的字段，格式同 PUT /task-plans/{plan_id}"""
+    check_bulk_size(len(body.items))
+    valid, results = validate_items(body.items, TaskPlanBulkUpdate)
+    results += apply_updates(db, TaskPlanModel, valid, current_user.id)
+    db.commit()
+    
+    data = bulk_data(results)
+    return ResponseModel(data=data, msg=f"更新了 {data['succeeded']} 个任务计划")
+
+@router.post("/delete:batch", response_model=ResponseModel[Dict[str, Any]])
+def delete_task_plans_batch(
+    body: BulkIds,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """批量删除任务计划，计划生成的任务保留，与计划解除关联"""
+    plan_ids = unique_ids(body.ids)
+    check_bulk_size(len(plan_ids))
+    owned = owned_ids(db, TaskPlanModel, plan_ids, current_user.id)
+    if owned:
+        # 与删除单个计划时 ORM 的处理一致：先把任务的 task_plan_id 置空
+        db.execute(
+            update(TaskModel)
+            .where(TaskModel.task_plan_id.in_(owned))
+            .values(task_plan_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(delete(TaskPlanModel).where(TaskPlanModel.id.in_(owned)))
+        bump_collection_version(db, TaskPlanModel, [current_user.id])
+    db.commit()
+    
+    results = [
+        item_result(index, plan_id, "deleted" if plan_id in owned else "not_found")
+        for index, plan_id in enumerate(plan_ids)
+    ]
+    return ResponseModel(data=bulk_data(results), msg=f"删除了 {len(owned)} 个任务计划")
 
 @router.get("/{plan_id}", response_model=ResponseModel[TaskPlanSchema])
 def read_task_plan(
@@ -306,6 +409,22 @@ def generate_tasks_from_plan(plan_id: int, db: Session):
     # 返回新创建的任务，以便调用者可以使用
     return new_task
 
+def initial_due_date(repeat_type, end_date: Optional[datetime], now: datetime) -> Optional[datetime]:
+    """计划第一个任务的截止日期"""
+    if repeat_type == RepeatType.NONE:
+        # 对于非重复任务，使用计划的结束日期作为截止日期
+        return end_date if end_date else (now + timedelta(days=7))
+    elif repeat_type == RepeatType.DAILY:
+        # 每日任务，截止日期为明天
+        return now + timedelta(days=1)
+    elif repeat_type == RepeatType.WEEKLY:
+        # 每周任务，截止日期为一周后
+        return now + timedelta(days=7)
+    elif repeat_type == RepeatType.MONTHLY:
+        # 每月任务，截止日期为30天后
+        return now + timedelta(days=30)
+    return None
+
 def create_initial_task_from_plan(plan_id: int, db: Session):
     """为新创建的任务计划创建第一个任务"""
     logger.info(f"Creating initial task for plan {plan_id}")
@@ -329,18 +448,7 @@ def create_initial_task_from_plan(plan_id: int, db: Session):
     )
     
     # 设置截止日期，基于重复类型和开始日期
-    if task_plan.repeat_type == RepeatType.NONE:
-        # 对于非重复任务，使用计划的结束日期作为截止日期
-        new_task.due_date = task_plan.end_date if task_plan.end_date else (now + timedelta(days=7))
-    elif task_plan.repeat_type == RepeatType.DAILY:
-        # 每日任务，截止日期为明天
-        new_task.due_date = now + timedelta(days=1)
-    elif task_plan.repeat_type == RepeatType.WEEKLY:
-        # 每周任务，截止日期为一周后
-        new_task.due_date = now + timedelta(days=7)
-    elif task_plan.repeat_type == RepeatType.MONTHLY:
-        # 每月任务，截止日期为30天后
-        new_task.due_date = now + timedelta(days=30)
+    new_task.due_date = initial_due_date(task_plan.repeat_type, task_plan.end_date, now)
     
     db.add(new_task)
     
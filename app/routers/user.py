@@ -1,21 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import timedelta
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.user import User
-from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, Token
+from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, Token, UserRank
 from app.utils.security import (
     get_password_hash, 
     authenticate_user, 
     create_access_token, 
     get_current_active_user,
+    get_current_active_user_async,
     ACCESS_TOKEN_EXPIRE_MINUTES,
-    logout_user
+    logout_user,
+    oauth2_scheme
 )
-from app.schemas.response import ResponseModel
+from app.schemas.response import ResponseModel, PageResponse
+from app.utils.response import envelope_response, page_response
+from app.utils.pagination import keyset_paginate, split_page
+from app.utils.principal_cache import invalidate_user_cache, principal_cache, snapshot_user
+from app.utils.passwords import hash_password_async
+from app.utils.coins import change_coins
+from app.utils.etag import make_etag, etag_matches, not_modified, with_etag
+from app.utils.export import EXPORT_FORMATS, EXPORT_RESOURCES, stream_ndjson, stream_csv
+from app.utils.fieldsets import parse_csv_param
+from app.utils.leaderboard import leaderboard
 
 router = APIRouter(
     prefix="/users",
@@ -24,16 +39,16 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=ResponseModel[UserSchema])
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if db_user:
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User.id).where(User.username == user.username))
+    if result.first():
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    db_email = db.query(User).filter(User.email == user.email).first()
-    if db_email:
+    result = await db.execute(select(User.id).where(User.email == user.email))
+    if result.first():
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -41,13 +56,13 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         coins=user.coins
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return {"code": 200, "msg": "", "data": db_user}
 
 @router.post("/token", response_model=ResponseModel)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,8 +70,9 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+    # 记录会话可能写共享的会话存储文件，不在事件循环中执行
+    access_token = await run_in_threadpool(
+        create_access_token, data={"sub": user.username}, expires_delta=access_token_expires
     )
     
     # 返回标准格式的响应
@@ -66,13 +82,80 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     )
 
 @router.get("/me", response_model=ResponseModel[UserSchema])
-def read_users_me(current_user = Depends(get_current_active_user)):
-    return ResponseModel(data=current_user)
+async def read_users_me(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_active_user_async)
+):
+    # 认证用的用户快照是进程内缓存，其他 worker 的写入不会使它失效；
+    # 这里按主键重新读取一次，响应体和 ETag 都以数据库中的当前行为准
+    result = await db.execute(
+        select(User).where(User.id == current_user.id).execution_options(populate_existing=True)
+    )
+    user = result.scalars().first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    # 顺便刷新本进程的快照
+    principal_cache.set(user.username, snapshot_user(user))
+    
+    etag = make_etag("users/me", user.id, user.row_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return with_etag(envelope_response(user, UserSchema), etag)
+
+@router.get("/me/rank", response_model=ResponseModel[UserRank])
+def read_my_rank(db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    """当前用户在金币排行榜中的名次"""
+    leaderboard.ensure_loaded()
+    rank = leaderboard.rank(current_user.id)
+    if rank is None:
+        # 由其他 worker 注册、尚未对账进本进程索引的用户，按数据库中的余额计算名次
+        coins = db.execute(select(User.coins).where(User.id == current_user.id)).scalar_one_or_none() or 0
+        rank = {"rank": leaderboard.rank_of_coins(coins), "coins": coins, "total": len(leaderboard) + 1}
+    return ResponseModel(data={
+        "user_id": current_user.id,
+        "rank": rank["rank"],
+        "coins": rank["coins"],
+        "total_users": rank["total"]
+    })
 
-@router.get("/", response_model=ResponseModel[List[UserSchema]])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
-    users = db.query(User).offset(skip).limit(limit).all()
-    return ResponseModel(data=users)
+@router.get("/me/export")
+async def export_my_history(
+    format: str = "ndjson",
+    resources: Optional[str] = None,
+    current_user = Depends(get_current_active_user_async)
+):
+    """流式导出当前用户的全部任务、完成记录和故事回应
+
+    format 为 ndjson（默认，可同时导出多种数据）或 csv（一次只能导出一种数据）；
+    resources 为逗号分隔的 tasks、completions、story_responses，默认全部。
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    resource_list = parse_csv_param(resources, EXPORT_RESOURCES, "resources") or list(EXPORT_RESOURCES)
+    
+    if format == "csv":
+        if len(resource_list) != 1:
+            raise HTTPException(status_code=400, detail="CSV export requires exactly one resource")
+        body = stream_csv(current_user.id, current_user.username, resource_list[0])
+        filename = f"user-{current_user.id}-{resource_list[0]}.csv"
+    else:
+        body = stream_ndjson(current_user.id, current_user.username, resource_list)
+        filename = f"user-{current_user.id}-history.ndjson"
+    
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/", response_model=PageResponse[List[UserSchema]])
+def read_users(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
+    order_by = (User.id,)
+    users, next_cursor = split_page(keyset_paginate(db.query(User), order_by, cursor, skip, limit).all(), order_by, limit)
+    return page_response(users, List[UserSchema], next_cursor)
 
 @router.get("/{user_id}", response_model=ResponseModel[UserSchema])
 def read_user(user_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_active_user)):
@@ -96,11 +179,13 @@ def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_db), c
     if "password" in update_data:
         update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
     
+    old_username = db_user.username
     for key, value in update_data.items():
         setattr(db_user, key, value)
     
     db.commit()
     db.refresh(db_user)
+    invalidate_user_cache(old_username, db_user.username)
     return ResponseModel(data=db_user)
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -113,8 +198,10 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user = Depe
     if db_user.id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    username = db_user.username
     db.delete(db_user)
     db.commit()
+    invalidate_user_cache(username)
     return None
 
 @router.put("/{user_id}/coins", response_model=ResponseModel[UserSchema])
@@ -136,8 +223,10 @@ def update_user_coins(
     amount = coins_data.get("amount", 0)
     db_user.coins = amount
     
+    username = db_user.username
     db.commit()
     db.refresh(db_user)
+    invalidate_user_cache(username)
     return ResponseModel(data=db_user)
 
 @router.post("/{user_id}/coins/add", response_model=ResponseModel[UserSchema])
@@ -160,10 +249,12 @@ def add_user_coins(
     if amount < 0:
         raise HTTPException(status_code=400, detail="Amount cannot be negative")
     
-    db_user.coins += amount
+    change_coins(db, user_id, amount)
     
+    username = db_user.username
     db.commit()
     db.refresh(db_user)
+    invalidate_user_cache(username)
     return ResponseModel(data=db_user)
 
 @router.post("/{user_id}/coins/deduct", response_model=ResponseModel[UserSchema])
@@ -186,13 +277,15 @@ def deduct_user_coins(
     if amount < 0:
         raise HTTPException(status_code=400, detail="Amount cannot be negative")
     
-    if db_user.coins < amount:
+    # 余额检查和扣除在同一条条件 UPDATE 中完成
+    if change_coins(db, user_id, -amount) is None:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Insufficient coins")
     
-    db_user.coins -= amount
-    
+    username = db_user.username
     db.commit()
     db.refresh(db_user)
+    invalidate_user_cache(username)
     return ResponseModel(data=db_user)
 
 @router.put("/me", response_model=ResponseModel[UserSchema])
@@ -208,18 +301,20 @@ def update_current_user(
     if "coins" in update_data and update_data["coins"] is None:
         update_data["coins"] = 0
     
+    old_username = current_user.username
     for key, value in update_data.items():
         setattr(current_user, key, value)
     
     db.commit()
     db.refresh(current_user)
+    invalidate_user_cache(old_username, current_user.username)
     
     return ResponseModel(data=current_user)
 
 @router.post("/logout", response_model=ResponseModel)
-def logout(current_user = Depends(get_current_active_user)):
+def logout(token: str = Depends(oauth2_scheme), current_user = Depends(get_current_active_user)):
     """用户登出"""
-    success = logout_user(current_user.username)
+    success = logout_user(current_user.username, token)
     if success:
         return ResponseModel(data=None, msg="Successfully logged out")
     else:
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Any, List
+
+class BulkItems(BaseModel):
+    # 条目在接口中逐条校验，以便按条目返回错误
+    items: List[Any] = Field(..., min_length=1)
+
+class BulkIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
@@ -1,10 +1,9 @@
 from typing import Generic, TypeVar, Optional, Any
 from pydantic import BaseModel, Field
-from pydantic.generics import GenericModel
 
 T = TypeVar('T')
 
-class StandardResponse(GenericModel, Generic[T]):
+class StandardResponse(BaseModel, Generic[T]):
     code: int = Field(200, description="状态码")
     msg: str = Field("", description="消息")
     data: Optional[T] = Field(None, description="数据")
@@ -21,6 +20,10 @@ class StandardResponse(GenericModel, Generic[T]):
 # 为了向后兼容，保留 ResponseModel 类
 ResponseModel = StandardResponse
 
+class PageResponse(StandardResponse[T], Generic[T]):
+    """列表接口的标准响应，附带下一页游标"""
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为 null")
+
 class ErrorResponseModel(BaseModel):
     """错误响应模型"""
     code: int
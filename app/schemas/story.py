@@ -17,7 +17,7 @@ class StoryChoiceBase(BaseModel):
     next_chapter_id: Optional[int] = None
 
 class StoryChoiceCreate(StoryChoiceBase):
-    pass
+    chapter_id: int
 
 class StoryChoiceUpdate(StoryChoiceBase):
     text: Optional[str] = None
@@ -144,11 +144,10 @@ class UserStory(BaseModel):
     is_completed: bool = False
     unlocked_at: Optional[datetime] = None
     last_interaction: Optional[datetime] = None
-    responses: List[Any] = []
-    story: Optional[Any] = None
-    current_chapter: Optional[Any] = None
+    responses: List[UserStoryResponse] = []
+    # 故事只返回基本信息，章节内容通过 current_chapter 获取
+    story: Optional[StoryInDB] = None
+    current_chapter: Optional[StoryChapter] = None
 
     class Config:
-        from_attributes = True
-        arbitrary_types_allowed = True
-        extra = "allow" 
\ No newline at end of file
+        from_attributes = True 
\ No newline at end of file
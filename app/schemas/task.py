@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
 class RepeatType(str, Enum):
@@ -36,6 +36,9 @@ class TaskUpdate(BaseModel):
     class Config:
         from_attributes = True
 
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
 class TaskInDB(TaskBase):
     id: int
     user_id: int
@@ -49,6 +52,32 @@ class TaskInDB(TaskBase):
 class Task(TaskInDB):
     pass
 
+class TaskDueDay(BaseModel):
+    date: date
+    task_ids: List[int]
+
+class TaskDueCalendar(BaseModel):
+    tasks: List[Task]
+    days: List[TaskDueDay]
+
+class TaskStatsDay(BaseModel):
+    date: date
+    completions: int
+    coins: int
+
+class TaskStatsWeek(BaseModel):
+    week_start: date
+    completions: int
+    coins: int
+
+class TaskStats(BaseModel):
+    daily: List[TaskStatsDay]
+    weekly: List[TaskStatsWeek]
+    current_streak: int
+    longest_streak: int
+    total_completions: int
+    total_coins: int
+
 class TaskCompletionBase(BaseModel):
     task_id: int
 
@@ -59,6 +88,7 @@ class TaskCompletionInDB(TaskCompletionBase):
     id: int
     user_id: int
     completed_at: datetime
+    coins_earned: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -48,6 +48,9 @@ class TaskPlanUpdate(BaseModel):
             raise ValueError('End date must be after start date')
         return v
 
+class TaskPlanBulkUpdate(TaskPlanUpdate):
+    id: int
+
 class TaskPlanInDB(TaskPlanBase):
     id: int
     user_id: int
@@ -76,4 +76,16 @@ class Token(BaseModel):
     token_type: str
 
 class TokenData(BaseModel):
-    username: Optional[str] = None 
\ No newline at end of file
+    username: Optional[str] = None 
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    coins: int
+
+class UserRank(BaseModel):
+    user_id: int
+    rank: int
+    coins: int
+    total_users: int
@@ -0,0 +1,107 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.utils.etag import bump_collection_version
+
+# 批量接口单次请求最多处理的条目数
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "200"))
+
+# 批量接口中表示失败的条目状态
+FAILED_STATUSES = ("invalid", "not_found")
+
+
+def check_bulk_size(count: int) -> None:
+    """条目数超过上限时返回 400"""
+    if count > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items, at most {BULK_MAX_ITEMS} per request")
+
+
+def unique_ids(ids: Iterable[int]) -> List[int]:
+    """去掉重复的 id，保留首次出现的顺序"""
+    return list(dict.fromkeys(ids))
+
+
+def item_result(index: int, item_id: Optional[int], status: str, **extra) -> Dict[str, Any]:
+    return {"index": index, "id": item_id, "status": status, **extra}
+
+
+def validate_items(items: List[Any], schema: Type[BaseModel]) -> Tuple[List[Tuple[int, BaseModel]], List[Dict[str, Any]]]:
+    """逐条校验，返回 (通过校验的 (序号, 对象) 列表, 未通过校验的条目结果)
+
+    整个请求体交给 FastAPI 校验时，任何一条出错都只能得到一个 422，
+    这里逐条校验，错误信息对应到具体条目。
+    """
+    valid, failed = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            errors = [{"loc": ".".join(str(part) for part in error["loc"]), "msg": error["msg"]} for error in e.errors()]
+            item_id = item.get("id") if isinstance(item, dict) else None
+            failed.append(item_result(index, item_id, "invalid", errors=errors))
+    return valid, failed
+
+
+def owned_ids(db: Session, model, ids: Iterable[int], user_id: int) -> Set[int]:
+    """一次查询返回其中属于该用户的 id"""
+    ids = list(ids)
+    if not ids:
+        return set()
+    return set(db.execute(select(model.id).where(model.id.in_(ids), model.user_id == user_id)).scalars())
+
+
+def insert_rows(db: Session, model, rows: List[Dict[str, Any]]) -> List[int]:
+    """批量插入，按 rows 的顺序返回新行的 id
+
+    支持 INSERT ... RETURNING 的数据库合并为多行 VALUES 语句执行；
+    MySQL 不支持 RETURNING，退回到 ORM flush（仍在同一事务中，不逐行 refresh）。
+    """
+    if not rows:
+        return []
+    if db.get_bind().dialect.insert_executemany_returning:
+        stmt = model.__table__.insert().returning(model.id, sort_by_parameter_order=True)
+        ids = list(db.execute(stmt, rows).scalars())
+        # 批量 INSERT 不经过 ORM flush，显式更新集合版本号
+        bump_collection_version(db, model, (row.get("user_id") for row in rows))
+        return ids
+    objects = [model(**row) for row in rows]
+    db.add_all(objects)
+    db.flush()
+    return [obj.id for obj in objects]
+
+
+def apply_updates(db: Session, model, valid: List[Tuple[int, BaseModel]], user_id: int) -> List[Dict[str, Any]]:
+    """按主键批量更新属于该用户的行，返回每个条目的结果
+
+    条目对象需要包含 id 字段，只更新请求中出现的字段。
+    """
+    owned = owned_ids(db, model, (obj.id for _, obj in valid), user_id)
+    results, rows, seen = [], [], set()
+    for index, obj in valid:
+        if obj.id in seen:
+            results.append(item_result(index, obj.id, "invalid", errors=[{"loc": "id", "msg": "Duplicate id"}]))
+            continue
+        seen.add(obj.id)
+        if obj.id not in owned:
+            results.append(item_result(index, obj.id, "not_found"))
+            continue
+        values = obj.dict(exclude_unset=True, exclude={"id"})
+        if values:
+            rows.append({"id": obj.id, **values})
+        results.append(item_result(index, obj.id, "updated" if values else "unchanged"))
+    if rows:
+        # ORM 按主键批量更新：相同字段组合的行合并为一次 executemany
+        db.execute(update(model), rows)
+    return results
+
+
+def bulk_data(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """按请求顺序整理结果，附带成功与失败的数量"""
+    results = sorted(results, key=lambda result: result["index"])
+    failed = sum(1 for result in results if result["status"] in FAILED_STATUSES)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
@@ -0,0 +1,68 @@
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.utils.leaderboard import record_coins
+
+
+def change_coins(db: Session, user_id: int, delta: int, floor_at_zero: bool = False) -> Optional[int]:
+    """在当前事务中原子地修改用户余额，返回修改后的余额
+
+    使用一条条件 UPDATE（coins = coins + delta WHERE coins + delta >= 0），
+    不先把余额读到 Python 里再写回，并发请求不会互相覆盖。
+    余额不足或用户不存在时不做修改并返回 None；floor_at_zero=True 时余额最多扣到 0。
+    UPDATE 持有行锁直到提交，调用方应尽快提交事务。
+    """
+    result = change_coins_applied(db, user_id, delta, floor_at_zero)
+    return result[0] if result is not None else None
+
+
+def change_coins_applied(db: Session, user_id: int, delta: int, floor_at_zero: bool = False) -> Optional[Tuple[int, int]]:
+    """同 change_coins，返回 (修改后的余额, 实际生效的变化量)
+
+    floor_at_zero=True 且余额不足时实际扣除的少于 |delta|，按天汇总等需要记录真实变化量的地方使用。
+    """
+    if delta == 0:
+        coins = db.execute(select(User.coins).where(User.id == user_id)).scalar_one_or_none()
+        return (coins, 0) if coins is not None else None
+    result = _update_coins(db, user_id, delta, floor_at_zero)
+    if result is not None:
+        # 提交后同步到排行榜
+        record_coins(db, user_id, result[0])
+    return result
+
+
+def _update_coins(db: Session, user_id: int, delta: int, floor_at_zero: bool) -> Optional[Tuple[int, int]]:
+    stmt = (
+        update(User)
+        .where(User.id == user_id, User.coins + delta >= 0)
+        .values(coins=User.coins + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        coins = db.execute(stmt.returning(User.coins)).scalar_one_or_none()
+    elif db.execute(stmt).rowcount == 0:
+        coins = None
+    else:
+        # MySQL 不支持 UPDATE ... RETURNING；本事务持有行锁，随后读到的就是本次更新的结果
+        coins = db.execute(select(User.coins).where(User.id == user_id)).scalar_one()
+    if coins is not None:
+        return coins, delta
+    if not floor_at_zero:
+        return None
+
+    # 余额不足以扣除 delta：锁定该行读出当前余额，最多扣到 0
+    # （SQLite 上面的 UPDATE 已经取得写锁，FOR UPDATE 不需要也不会输出）
+    current = db.execute(select(User.coins).where(User.id == user_id).with_for_update()).scalar_one_or_none()
+    if current is None:
+        return None
+    applied = max(delta, -current)
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(coins=current + applied)
+        .execution_options(synchronize_session=False)
+    )
+    return current + applied, applied
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# 小于该大小（字节）的响应不压缩
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+# 不小于该大小（字节）的响应在线程池中压缩，避免阻塞事件循环
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", str(32 * 1024)))
+# 压缩结果缓存的内存上限（字节），0 表示不缓存
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+SUPPORTED_ENCODINGS = ("gzip", "deflate")
+
+
+def compressible(endpoint):
+    """标记路由允许压缩响应，放在 @router.get(...) 下方"""
+    endpoint.compress_response = True
+    return endpoint
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """从 Accept-Encoding 中选出支持的编码，q 值相同时优先 gzip"""
+    best, best_q = None, 0.0
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == "*":
+            name = "gzip"
+        if name in SUPPORTED_ENCODINGS and q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # mtime 固定为 0，相同内容得到相同字节
+        return gzip.compress(body, compresslevel=COMPRESSION_LEVEL, mtime=0)
+    return zlib.compress(body, COMPRESSION_LEVEL)
+
+
+class CompressionCache:
+    """按响应体摘要缓存压缩结果的 LRU，章节等不变的内容不必重复压缩"""
+
+    def __init__(self, max_bytes: int = COMPRESSION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if compressed is None:
+            start = time.thread_time()
+            compressed = _compress(body, encoding)
+            elapsed = time.thread_time() - start
+            with self._lock:
+                self.misses += 1
+                self.cpu_seconds += elapsed
+                self._store(key, compressed)
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        return compressed
+
+    def _store(self, key: tuple, compressed: bytes):
+        if len(compressed) > self.max_bytes or key in self._entries:
+            return
+        self._entries[key] = compressed
+        self._size += len(compressed)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "cpu_ms": round(self.cpu_seconds * 1000, 3),
+                "cache_entries": len(self._entries),
+                "cache_bytes": self._size,
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_evictions": self.evictions,
+            }
+
+
+compression_cache = CompressionCache()
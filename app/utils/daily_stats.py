@@ -0,0 +1,173 @@
+"""按天汇总的任务完成统计
+
+完成、取消完成任务时在同一事务中增量更新 user_daily_stats，/tasks/stats 只读汇总表。
+汇总记录的是完成行为本身：删除任务不会回溯修改历史统计。
+
+用法:
+    python -m app.utils.daily_stats backfill [每批用户数]   # 从已有完成记录重建汇总
+"""
+import logging
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import Date, case, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.database import get_engine
+from app.models.daily_stats import UserDailyStats
+from app.models.task import Task
+from app.models.task_completion import TaskCompletion
+from app.models.user import User
+from app.utils.upsert import upsert
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_SIZE = 500
+
+
+def add_daily_stats(db: Session, user_id: int, day: date, completions: int, coins: int, kept_coins: int = 0) -> None:
+    """在当前事务中累加某天的统计；减少时最多减到 0，不存在的行不会被创建
+
+    coins 应当是实际发放或扣回的金币（change_coins_applied 返回的变化量）；
+    取消完成时没能扣回的部分通过 kept_coins 记录，回填统计时保留。
+    """
+    if completions < 0 or coins < 0:
+        db.execute(
+            update(UserDailyStats)
+            .where(UserDailyStats.user_id == user_id, UserDailyStats.day == day)
+            .values(
+                completions=case((UserDailyStats.completions + completions < 0, 0), else_=UserDailyStats.completions + completions),
+                coins=case((UserDailyStats.coins + coins < 0, 0), else_=UserDailyStats.coins + coins),
+                kept_coins=UserDailyStats.kept_coins + kept_coins,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return
+
+    insert, on_conflict = upsert(db.get_bind().dialect.name, [UserDailyStats.user_id, UserDailyStats.day])
+    stmt = insert(UserDailyStats).values(user_id=user_id, day=day, completions=completions, coins=coins)
+    db.execute(on_conflict(stmt, lambda new: {
+        "completions": UserDailyStats.completions + new.completions,
+        "coins": UserDailyStats.coins + new.coins,
+    }))
+
+
+def _streaks(active_days: Sequence[date], today: date):
+    """(当前连续天数, 最长连续天数)；今天还没有完成记录时，截至昨天的连续天数仍算作当前连续"""
+    longest = run = 0
+    previous = None
+    for day in active_days:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if previous is not None and (today - previous).days <= 1 else 0
+    return current, longest
+
+
+def build_stats(rows: Sequence[Any], today: date, days: int) -> Dict[str, Any]:
+    """由某个用户的全部汇总行（按日期升序）计算统计结果"""
+    start = today - timedelta(days=days - 1)
+    by_day = {row.day: row for row in rows}
+
+    daily = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = by_day.get(day)
+        daily.append({"date": day, "completions": row.completions if row else 0, "coins": row.coins if row else 0})
+
+    weekly: List[Dict[str, Any]] = []
+    for item in daily:
+        week_start = item["date"] - timedelta(days=item["date"].weekday())
+        if not weekly or weekly[-1]["week_start"] != week_start:
+            weekly.append({"week_start": week_start, "completions": 0, "coins": 0})
+        weekly[-1]["completions"] += item["completions"]
+        weekly[-1]["coins"] += item["coins"]
+
+    current, longest = _streaks([row.day for row in rows if row.completions > 0], today)
+    return {
+        "daily": daily,
+        "weekly": weekly,
+        "current_streak": current,
+        "longest_streak": longest,
+        "total_completions": sum(row.completions for row in rows),
+        "total_coins": sum(row.coins for row in rows),
+    }
+
+
+def _backfill_users(conn, user_ids: List[int]) -> int:
+    """重建一批用户的汇总，返回写入的行数
+
+    金币按完成记录上实际发放的 coins_earned 汇总（旧记录为空时按任务奖励），
+    再加上取消完成时没能扣回、已随完成记录删除的 kept_coins。
+    """
+    # 只用表对象构造查询，作为独立脚本运行时不需要加载全部 ORM 映射
+    completions, tasks, stats = TaskCompletion.__table__, Task.__table__, UserDailyStats.__table__
+    completed_on = func.date(completions.c.completed_at, type_=Date)
+    earned = func.coalesce(completions.c.coins_earned, tasks.c.coins_reward, 0)
+    rows = conn.execute(
+        select(
+            completions.c.user_id,
+            completed_on.label("day"),
+            func.count().label("completions"),
+            func.coalesce(func.sum(earned), 0).label("coins"),
+        )
+        .outerjoin(tasks, completions.c.task_id == tasks.c.id)
+        .where(completions.c.user_id.in_(user_ids), completions.c.completed_at.isnot(None))
+        .group_by(completions.c.user_id, completed_on)
+    ).all()
+    kept = {
+        (row.user_id, row.day): row.kept_coins
+        for row in conn.execute(
+            select(stats.c.user_id, stats.c.day, stats.c.kept_coins)
+            .where(stats.c.user_id.in_(user_ids), stats.c.kept_coins != 0)
+        )
+    }
+    values = {}
+    for row in rows:
+        key = (row.user_id, row.day)
+        values[key] = {**row._mapping, "coins": row.coins + kept.get(key, 0), "kept_coins": kept.get(key, 0)}
+    for (user_id, day), kept_coins in kept.items():
+        values.setdefault((user_id, day), {
+            "user_id": user_id, "day": day, "completions": 0, "coins": kept_coins, "kept_coins": kept_coins,
+        })
+    conn.execute(delete(stats).where(stats.c.user_id.in_(user_ids)))
+    if values:
+        conn.execute(stats.insert(), list(values.values()))
+    return len(values)
+
+
+def backfill(engine=None, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """从已有完成记录重建全部用户的汇总，每批用户一个事务，返回写入的行数
+
+    可以重复执行；执行期间新产生的完成记录可能被覆盖，低峰期运行或完成后再执行一次。
+    """
+    engine = engine or get_engine()
+    users = User.__table__
+    total = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            user_ids = list(conn.execute(
+                select(users.c.id).where(users.c.id > last_id).order_by(users.c.id).limit(chunk_size)
+            ).scalars())
+            if not user_ids:
+                break
+            total += _backfill_users(conn, user_ids)
+        last_id = user_ids[-1]
+        logger.info(f"已重建用户 {user_ids[0]}-{last_id} 的统计，累计 {total} 行")
+    return total
+
+
+def main(argv: List[str]) -> int:
+    if argv and argv[0] == "backfill":
+        chunk_size = int(argv[1]) if len(argv) > 1 else BACKFILL_CHUNK_SIZE
+        print(f"写入了 {backfill(chunk_size=chunk_size)} 行统计")
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,209 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+# 用户写入后，在该时间窗口内的读请求都走主库（读己之写）
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# 从库连接失败后暂停使用的时间（秒）
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# 从库健康探测间隔（秒），0 表示不探测
+REPLICA_PROBE_SECONDS = float(os.getenv("REPLICA_PROBE_SECONDS", "10"))
+# 记录客户端最近一次写入时间的 Cookie，所有 worker 都据此把读请求发往主库
+REPLICA_STICKY_COOKIE = os.getenv("REPLICA_STICKY_COOKIE", "last_write")
+
+
+class ReplicaSet:
+    """从库集合：轮询选择，连接失败的从库在冷却期内被跳过"""
+
+    def __init__(self, engines: List[Engine], retry_seconds: float = REPLICA_RETRY_SECONDS):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._cycle = itertools.cycle(range(len(engines))) if engines else None
+        self._down_until: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        for index, engine in enumerate(engines):
+            self._watch(index, engine)
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def _watch(self, index: int, engine: Engine):
+        @event.listens_for(engine, "handle_error")
+        def _on_error(context):
+            # 只有连接层面的错误才认为从库不可用
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(index)
+
+    def __contains__(self, engine) -> bool:
+        return any(engine is replica for replica in self.engines)
+
+    def mark_engine_down(self, engine: Engine):
+        for index, replica in enumerate(self.engines):
+            if replica is engine:
+                self.mark_down(index)
+
+    def mark_down(self, index: int):
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_seconds
+        logger.warning(f"从库 {self.engines[index].url.render_as_string(hide_password=True)} 不可用，"
+                       f"{self.retry_seconds} 秒内不再使用")
+
+    def mark_up(self, index: int):
+        with self._lock:
+            was_down = self._down_until.pop(index, None) is not None
+        if was_down:
+            logger.info(f"从库 {self.engines[index].url.render_as_string(hide_password=True)} 已恢复")
+
+    def probe(self) -> List[bool]:
+        """对每个从库执行 SELECT 1，更新健康状态并返回各从库是否可用
+
+        只能用于同步引擎；异步从库集合与同步集合按相同顺序创建，用 apply_health 同步结果。
+        """
+        healthy = []
+        for index, engine in enumerate(self.engines):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception as e:
+                logger.debug(f"从库探测失败: {e}")
+                healthy.append(False)
+            else:
+                healthy.append(True)
+        self.apply_health(healthy)
+        return healthy
+
+    def apply_health(self, healthy: List[bool]):
+        for index, ok in enumerate(healthy[:len(self.engines)]):
+            if ok:
+                self.mark_up(index)
+            else:
+                self.mark_down(index)
+
+    def choose(self) -> Optional[Engine]:
+        """按轮询选出一个健康的从库，全部不可用时返回 None"""
+        if not self.engines:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                index = next(self._cycle)
+                if self._down_until.get(index, 0) <= now:
+                    self._down_until.pop(index, None)
+                    return self.engines[index]
+        return None
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "url": engine.url.render_as_string(hide_password=True),
+                "healthy": self._down_until.get(index, 0) <= now,
+            }
+            for index, engine in enumerate(self.engines)
+        ]
+
+
+class _StickyPrincipals:
+    """记录最近发生写入的用户"""
+
+    def __init__(self, window: float = REPLICA_STICKY_SECONDS):
+        self.window = window
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, principal: str):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) > 10000:
+                self._until = {key: until for key, until in self._until.items() if until > now}
+            self._until[principal] = now + self.window
+
+    def is_sticky(self, principal: str) -> bool:
+        until = self._until.get(principal)
+        return until is not None and until > time.monotonic()
+
+
+sticky_principals = _StickyPrincipals()
+
+
+def wrote_recently(last_write: Optional[str], window: float = REPLICA_STICKY_SECONDS) -> bool:
+    """根据 REPLICA_STICKY_COOKIE 中的写入时间判断是否仍在读己之写窗口内"""
+    if not last_write:
+        return False
+    try:
+        return time.time() - float(last_write) < window
+    except ValueError:
+        return False
+
+
+class RoutingSession(Session):
+    """读写分离会话
+
+    只读请求（session.info["read_only"]）中的 SELECT 发往从库；写入、flush、
+    SELECT ... FOR UPDATE 以及刚写入过的用户的请求都发往主库。
+    """
+
+    def __init__(self, *args, replica_set: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_set = replica_set
+
+    def _use_replica(self, clause) -> bool:
+        if not self.replica_set or self._flushing:
+            return False
+        if not self.info.get("read_only") or self.info.get("wrote"):
+            return False
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            return False
+        principal = self.info.get("principal")
+        return not (principal and sticky_principals.is_sticky(principal))
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._use_replica(clause):
+            replica = self.replica_set.choose()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        if not self.replica_set or engine not in self.replica_set:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except DBAPIError:
+            # 从库连接失败时标记为不可用，本次查询回退到主库
+            self.replica_set.mark_engine_down(engine)
+            return super()._connection_for_bind(self.bind, execution_options, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _on_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _after_commit(session):
+    if session.info.pop("wrote", False):
+        principal = session.info.get("principal")
+        if principal:
+            sticky_principals.mark(principal)
+        # 写入时间交给 ReplicaStickyMiddleware 写入 Cookie，其他 worker 也能看到
+        state = session.info.get("request_state")
+        if state is not None:
+            state.last_write = time.time()
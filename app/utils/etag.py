@@ -0,0 +1,99 @@
+import hashlib
+from typing import Any, Iterable, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.collection_version import CollectionVersion
+from app.utils.upsert import upsert
+
+# 带 ETag 的响应只允许客户端缓存，每次使用前都要重新验证
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """由版本信息（而不是响应体）计算强 ETag"""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 中是否包含该 ETag（按 RFC 7232 使用弱比较）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
+    return response
+
+
+# 列表接口使用 ETag 的表，新增或删除行时递增 collection_versions 中的版本号
+VERSIONED_COLLECTIONS = frozenset({"tasks", "task_plans", "user_stories"})
+
+
+def bump_collection_version(db: Session, model, user_ids: Iterable[int]):
+    """在当前事务中把这些用户的该集合版本号加一
+
+    ORM 的新增和删除由 after_flush 自动处理；批量 INSERT / DELETE 语句不经过 ORM，需要显式调用。
+    """
+    collection = model.__tablename__
+    user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+    if collection not in VERSIONED_COLLECTIONS or not user_ids:
+        return
+    insert, on_conflict = upsert(db.get_bind().dialect.name, [CollectionVersion.user_id, CollectionVersion.collection])
+    stmt = insert(CollectionVersion).values([
+        {"user_id": user_id, "collection": collection, "version": 1} for user_id in user_ids
+    ])
+    db.connection().execute(on_conflict(stmt, lambda new: {"version": CollectionVersion.version + 1}))
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_collections(session: Session, flush_context):
+    changed = {}
+    for obj in (*session.new, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in VERSIONED_COLLECTIONS:
+            changed.setdefault(type(obj), set()).add(obj.user_id)
+    for model, user_ids in changed.items():
+        bump_collection_version(session, model, user_ids)
+
+
+async def collection_version(db: AsyncSession, model, *criteria, user_id: int) -> Tuple[int, int, int, int]:
+    """一条查询得到集合的版本：(版本号, 行数, 最大 id, row_version 之和)
+
+    版本号在新增、删除时单调递增，删除后复用同一个 id 再插入（如 SQLite 的 rowid 复用）也能区分；
+    更新使 row_version 之和增大。数据库级联删除不经过 ORM，此时由行数的减少体现。
+    """
+    changes = (
+        select(CollectionVersion.version)
+        .where(CollectionVersion.user_id == user_id, CollectionVersion.collection == model.__tablename__)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            func.coalesce(changes, 0),
+            func.count(model.id),
+            func.coalesce(func.max(model.id), 0),
+            func.coalesce(func.sum(model.row_version), 0),
+        ).where(model.user_id == user_id, *criteria)
+    )
+    changes, count, max_id, version_sum = result.one()
+    return int(changes), int(count), int(max_id), int(version_sum)
@@ -10,7 +10,8 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "code": exc.status_code,
             "msg": exc.detail,
             "data": None
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -0,0 +1,94 @@
+import csv
+import enum
+import io
+import os
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import orjson
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models.story import UserStory, UserStoryResponse
+from app.models.task import Task
+from app.models.task_completion import TaskCompletion
+
+# 服务端游标每批读取的行数，也是每次向客户端写出的行数
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _tasks(user_id: int):
+    return select(
+        Task.id, Task.title, Task.description, Task.repeat_type, Task.coins_reward, Task.is_completed,
+        Task.due_date, Task.task_plan_id, Task.created_at, Task.updated_at,
+    ).where(Task.user_id == user_id).order_by(Task.id)
+
+
+def _completions(user_id: int):
+    return select(
+        TaskCompletion.id, TaskCompletion.task_id, TaskCompletion.completed_at,
+    ).where(TaskCompletion.user_id == user_id).order_by(TaskCompletion.id)
+
+
+def _story_responses(user_id: int):
+    return select(
+        UserStoryResponse.id, UserStory.story_id, UserStoryResponse.chapter_id, UserStoryResponse.choice_id,
+        UserStoryResponse.custom_response, UserStoryResponse.created_at,
+    ).join(UserStory, UserStoryResponse.user_story_id == UserStory.id).where(
+        UserStory.user_id == user_id
+    ).order_by(UserStoryResponse.id)
+
+
+# 可导出的数据：名称 -> 构造查询的函数；只查询列而不是 ORM 对象，行不会进入 identity map
+EXPORT_RESOURCES: Dict[str, Callable[[int], object]] = {
+    "tasks": _tasks,
+    "completions": _completions,
+    "story_responses": _story_responses,
+}
+
+
+async def _batches(user_id: int, principal: Optional[str], resource: str) -> AsyncIterator[list]:
+    """用服务端游标分批读取，内存占用与总行数无关"""
+    # 响应流式输出时请求的依赖已经返回，这里使用独立的会话
+    async with AsyncSessionLocal() as db:
+        db.info["read_only"] = True
+        db.info["principal"] = principal
+        stmt = EXPORT_RESOURCES[resource](user_id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
+
+
+async def stream_ndjson(user_id: int, principal: Optional[str], resources: List[str]) -> AsyncIterator[bytes]:
+    """每行一个 JSON 对象，type 字段标明数据类型"""
+    for resource in resources:
+        async for rows in _batches(user_id, principal, resource):
+            yield b"".join(orjson.dumps({"type": resource, **row._mapping}) + b"\n" for row in rows)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def stream_csv(user_id: int, principal: Optional[str], resource: str) -> AsyncIterator[bytes]:
+    """单一数据类型的 CSV，第一行为列名"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in EXPORT_RESOURCES[resource](user_id).selected_columns])
+    yield buffer.getvalue().encode("utf-8")
+    async for rows in _batches(user_id, principal, resource):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,25 @@
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException
+
+
+def parse_csv_param(value: Optional[str], allowed: Iterable[str], name: str) -> Optional[List[str]]:
+    """解析 fields / include 这类逗号分隔的查询参数
+
+    未传参数时返回 None，出现不支持的值时返回 400。
+    """
+    if value is None:
+        return None
+    allowed = set(allowed)
+    items = []
+    for item in value.split(","):
+        item = item.strip()
+        if item and item not in items:
+            items.append(item)
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported {name}: {', '.join(unknown)}; allowed: {', '.join(sorted(allowed))}",
+        )
+    return items
@@ -0,0 +1,308 @@
+"""金币排行榜：进程内的有序索引
+
+所有用户按 (金币降序, id 升序) 保存在分块有序列表中，块长度用树状数组维护前缀和，
+查询名次、取第 k 名都是 O(log n)，不需要每次在 users 表上排序或 COUNT(*)。
+
+索引通过会话钩子更新：change_coins 和 ORM 对 User.coins 的修改记录到会话中，
+事务提交后才写入索引，回滚则丢弃。多 worker 部署时每个进程只能看到自己处理的写入，
+其他进程的修改由定期对账（LEADERBOARD_RECONCILE_SECONDS）从数据库同步。
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, attributes
+
+from app.database import get_engine
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 从数据库对账的间隔（秒），0 表示只在启动时加载一次
+LEADERBOARD_RECONCILE_SECONDS = float(os.getenv("LEADERBOARD_RECONCILE_SECONDS", "60"))
+
+# 每块的目标长度；块内插入删除是一次内存移动，块数决定树状数组的大小
+_BLOCK_SIZE = 512
+
+Key = Tuple[int, int]
+
+
+class _RankedList:
+    """分块有序列表，支持按值求位置和按位置取值"""
+
+    def __init__(self, keys: Iterable[Key] = ()):
+        keys = sorted(keys)
+        self._blocks: List[List[Key]] = [keys[i:i + _BLOCK_SIZE] for i in range(0, len(keys), _BLOCK_SIZE)]
+        self._maxes: List[Key] = [block[-1] for block in self._blocks]
+        self._reindex()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reindex(self):
+        """重建块长度的树状数组，只在块分裂或删除时调用"""
+        self._size = sum(len(block) for block in self._blocks)
+        self._tree = [0] * (len(self._blocks) + 1)
+        for i, block in enumerate(self._blocks, 1):
+            self._tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= len(self._blocks):
+                self._tree[parent] += self._tree[i]
+
+    def _add(self, block_index: int, delta: int):
+        self._size += delta
+        i = block_index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, block_index: int) -> int:
+        """前 block_index 个块的元素总数"""
+        total, i = 0, block_index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, key: Key):
+        if not self._blocks:
+            self._blocks, self._maxes = [[key]], [key]
+            self._reindex()
+            return
+        i = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[i]
+        insort(block, key)
+        self._maxes[i] = block[-1]
+        if len(block) > 2 * _BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:_BLOCK_SIZE], block[_BLOCK_SIZE:]]
+            self._maxes[i:i + 1] = [self._blocks[i][-1], self._blocks[i + 1][-1]]
+            self._reindex()
+        else:
+            self._add(i, 1)
+
+    def remove(self, key: Key):
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        del block[bisect_left(block, key)]
+        if block:
+            self._maxes[i] = block[-1]
+            self._add(i, -1)
+        else:
+            del self._blocks[i], self._maxes[i]
+            self._reindex()
+
+    def index(self, key: Key) -> int:
+        """小于 key 的元素个数"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return self._size
+        return self._prefix(i) + bisect_left(self._blocks[i], key)
+
+    def slice(self, start: int, count: int) -> List[Key]:
+        """从位置 start 开始的 count 个元素"""
+        if start >= self._size or count <= 0:
+            return []
+        # 在树状数组上二分，找到包含位置 start 的块
+        block_index, remaining, step = 0, start, 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            nxt = block_index + step
+            if nxt < len(self._tree) and self._tree[nxt] <= remaining:
+                block_index = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        result: List[Key] = []
+        for block in self._blocks[block_index:]:
+            result.extend(block[remaining:remaining + count - len(result)])
+            remaining = 0
+            if len(result) >= count:
+                break
+        return result
+
+
+class CoinsLeaderboard:
+    """用户金币排行；名次按金币降序，金币相同的用户名次相同"""
+
+    def __init__(self):
+        self._coins: Dict[int, int] = {}
+        self._ranked = _RankedList()
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.RLock()
+        self._loaded = False
+        # 重建期间到达的更新，重建完成后重放，避免被数据库中较旧的快照覆盖
+        self._replay: Optional[List[Tuple[int, Optional[int]]]] = None
+        self.last_reconcile: Optional[float] = None
+        self.last_drift = 0
+        self.reconciles = 0
+
+    def _set(self, user_id: int, coins: Optional[int]):
+        old = self._coins.pop(user_id, None)
+        if old is not None:
+            self._ranked.remove((-old, user_id))
+        if coins is not None:
+            self._coins[user_id] = coins
+            self._ranked.add((-coins, user_id))
+
+    def apply(self, changes: Dict[int, Optional[int]]):
+        """写入已提交的余额，None 表示用户已删除"""
+        with self._lock:
+            for user_id, coins in changes.items():
+                self._set(user_id, coins)
+                if self._replay is not None:
+                    self._replay.append((user_id, coins))
+
+    def rank(self, user_id: int) -> Optional[Dict[str, int]]:
+        with self._lock:
+            coins = self._coins.get(user_id)
+            if coins is None:
+                return None
+            return {"rank": self._ranked.index((-coins, 0)) + 1, "coins": coins, "total": len(self._ranked)}
+
+    def rank_of_coins(self, coins: int) -> int:
+        """持有 coins 金币的用户的名次（不要求该用户已在索引中）"""
+        with self._lock:
+            return self._ranked.index((-coins, 0)) + 1
+
+    def top(self, offset: int, limit: int) -> List[Dict[str, int]]:
+        with self._lock:
+            keys = self._ranked.slice(offset, limit)
+            return [
+                {"rank": self._ranked.index((coins, 0)) + 1, "user_id": user_id, "coins": -coins}
+                for coins, user_id in keys
+            ]
+
+    def __len__(self) -> int:
+        return len(self._ranked)
+
+    def rebuild(self, load: Callable[[], Iterable[Tuple[int, int]]]) -> int:
+        """用 load() 返回的 (id, coins) 替换整个索引，返回与原索引不一致的用户数
+
+        从开始读取到替换完成之间提交的更新会在替换后重放，不会被读到的旧快照覆盖。
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._replay = []
+            try:
+                coins = {user_id: value or 0 for user_id, value in load()}
+                ranked = _RankedList((-value, user_id) for user_id, value in coins.items())
+            except BaseException:
+                with self._lock:
+                    self._replay = None
+                raise
+            with self._lock:
+                drift = 0
+                if self._loaded:
+                    drift = len(coins.keys() ^ self._coins.keys()) + sum(
+                        1 for user_id, value in coins.items() if self._coins.get(user_id, value) != value
+                    )
+                self._coins, self._ranked = coins, ranked
+                for user_id, value in self._replay:
+                    self._set(user_id, value)
+                self._replay = None
+                self._loaded = True
+                self.last_reconcile = time.time()
+                self.last_drift = drift
+                self.reconciles += 1
+            return drift
+
+    def reconcile(self, engine=None) -> int:
+        """从数据库重新加载全部余额"""
+        engine = engine or get_engine()
+        users = User.__table__
+
+        def load():
+            with engine.connect() as conn:
+                return conn.execute(select(users.c.id, users.c.coins)).all()
+
+        drift = self.rebuild(load)
+        if drift:
+            logger.info(f"排行榜对账修正了 {drift} 个用户")
+        return drift
+
+    def ensure_loaded(self):
+        """首次使用时加载；启动时的后台加载尚未完成时在这里同步加载"""
+        if not self._loaded:
+            with self._rebuild_lock:
+                if not self._loaded:
+                    self.reconcile()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "users": len(self._ranked),
+                "reconciles": self.reconciles,
+                "last_reconcile": self.last_reconcile,
+                "last_drift": self.last_drift,
+                "reconcile_interval": LEADERBOARD_RECONCILE_SECONDS,
+            }
+
+
+leaderboard = CoinsLeaderboard()
+
+_PENDING_KEY = "leaderboard_pending"
+
+
+def record_coins(session: Session, user_id: int, coins: Optional[int]):
+    """记录本事务中用户的新余额，提交后写入排行榜"""
+    session.info.setdefault(_PENDING_KEY, {})[user_id] = coins
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_orm_changes(session: Session, flush_context):
+    # 注册用户、直接设置余额、删除用户等通过 ORM 完成的修改
+    for obj in session.new:
+        if isinstance(obj, User):
+            record_coins(session, obj.id, obj.__dict__.get("coins") or 0)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            added = attributes.get_history(obj, "coins").added
+            if added and isinstance(added[0], int):
+                record_coins(session, obj.id, added[0])
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            record_coins(session, obj.id, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        leaderboard.apply(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+async def _reconcile_loop():
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, leaderboard.reconcile)
+        except Exception as e:
+            logger.error(f"排行榜对账失败: {e}")
+        if LEADERBOARD_RECONCILE_SECONDS <= 0:
+            return
+        await asyncio.sleep(LEADERBOARD_RECONCILE_SECONDS)
+
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+def start_reconcile_loop():
+    """启动时在后台加载排行榜，之后定期与数据库对账"""
+    global _reconcile_task
+    _reconcile_task = asyncio.get_running_loop().create_task(_reconcile_loop())
+
+
+def stop_reconcile_loop():
+    global _reconcile_task
+    if _reconcile_task is not None:
+        _reconcile_task.cancel()
+        _reconcile_task = None
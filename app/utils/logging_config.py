@@ -0,0 +1,127 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 日志文件，不设置时输出到标准错误
+LOG_FILE = os.getenv("LOG_FILE", "")
+# 日志队列容量，队列满时丢弃新日志而不是阻塞请求
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# 每个 logger 每秒允许输出的 WARNING 以下日志条数及突发上限，0 表示不限制
+LOG_RATE_LIMIT_PER_SEC = float(os.getenv("LOG_RATE_LIMIT_PER_SEC", "50"))
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "200"))
+
+ACCESS_LOGGER_NAME = "app.access"
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，record.fields 中的字段会合并进去"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """按 logger 名称做令牌桶限流，WARNING 及以上级别不受限制
+
+    exempt 中的 logger 不限流：访问日志每个请求一行，由 ACCESS_LOG_SAMPLE_RATE 显式采样。
+    """
+
+    def __init__(self, rate: float = LOG_RATE_LIMIT_PER_SEC, burst: int = LOG_RATE_LIMIT_BURST,
+                 exempt: Tuple[str, ...] = (ACCESS_LOGGER_NAME,)):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.exempt = frozenset(exempt)
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING or record.name in self.exempt:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                # [剩余令牌, 上次补充时间, 已丢弃条数]
+                bucket = self._buckets[record.name] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+        if dropped:
+            record.msg = f"[限流丢弃 {dropped} 条] {record.msg}"
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """队列满时丢弃日志，不阻塞调用方"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging():
+    """日志通过队列交给后台线程写出，请求处理路径上只做入队"""
+    global _listener
+    if _listener is not None:
+        return
+
+    if LOG_FILE:
+        output = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    else:
+        output = logging.StreamHandler()
+    output.setFormatter(JSONFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    # uvicorn 自带的访问日志与这里的访问日志重复
+    logging.getLogger("uvicorn.access").propagate = False
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """停止后台线程并写出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,407 @@
+"""版本化数据库迁移
+
+迁移按版本号顺序执行，已执行的版本记录在 schema_migrations 表中。
+每个迁移都应当可以重复执行（多个 worker 同时启动时可能并发执行同一迁移）。
+
+用法:
+    python -m app.utils.migrations upgrade   # 执行未应用的迁移
+    python -m app.utils.migrations status    # 查看迁移状态
+    python -m app.utils.migrations explain   # 检查热点查询是否使用了索引
+"""
+import logging
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
+
+from app.database import Base, get_engine
+# 导入全部模型，保证 Base.metadata 包含所有表
+from app.models.user import User
+from app.models.task import Task
+from app.models.task_completion import TaskCompletion
+from app.models.story import StoryChapter, StoryChoice, UserStory
+from app.models.task_plan import TaskPlan
+from app.models.daily_stats import UserDailyStats
+from app.models.collection_version import CollectionVersion
+from app.utils.pagination import encode_cursor, keyset_paginate
+from app.utils.queries import (
+    COMPLETION_ORDER, TASK_ORDER, TASK_PLAN_ORDER, USER_STORY_ORDER, active_task_plans, due_tasks,
+    latest_completion, story_chapters, user_completions, user_stories, user_task_plans, user_tasks,
+)
+from app.utils.recurrence import date_range
+
+logger = logging.getLogger(__name__)
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+class Migration:
+    def __init__(self, version: int, name: str, upgrade: Callable):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """注册一个迁移，upgrade 函数接收一个处于事务中的连接"""
+    def decorator(upgrade: Callable):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"重复的迁移版本: {version}")
+        MIGRATIONS.append(Migration(version, name, upgrade))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return upgrade
+    return decorator
+
+
+def _create_indexes(conn, table, *names: str):
+    """创建模型中声明的索引，已存在的跳过"""
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def _add_column(conn, table: str, column: str, ddl: str) -> bool:
+    """列不存在时添加，返回是否添加了列"""
+    if column in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+@migration(1, "initial_schema")
+def _initial_schema(conn):
+    Base.metadata.create_all(bind=conn)
+    # 早期启动检查使用的版本表，已由 schema_migrations 取代
+    conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+
+
+@migration(2, "repeat_type_uppercase")
+def _repeat_type_uppercase(conn):
+    # Enum 列保存的是枚举名（大写），修正历史上写入的小写值
+    for table in ("tasks", "task_plans"):
+        for value in ("none", "daily", "weekly", "monthly"):
+            conn.execute(
+                text(f"UPDATE {table} SET repeat_type = :upper WHERE repeat_type = :lower"),
+                {"upper": value.upper(), "lower": value},
+            )
+
+
+@migration(3, "fix_null_coins")
+def _fix_null_coins(conn):
+    # 很早创建的库中 users 表没有 coins 列
+    _add_column(conn, "users", "coins", "BIGINT NOT NULL DEFAULT 0")
+    conn.execute(text("UPDATE users SET coins = 0 WHERE coins IS NULL"))
+    conn.execute(text("UPDATE tasks SET coins_reward = 0 WHERE coins_reward IS NULL"))
+    if conn.dialect.name == "mysql":
+        conn.execute(text("ALTER TABLE users MODIFY COLUMN coins BIGINT NOT NULL DEFAULT 0"))
+        conn.execute(text("ALTER TABLE tasks MODIFY COLUMN coins_reward BIGINT NOT NULL DEFAULT 0"))
+
+
+@migration(4, "hot_path_indexes")
+def _hot_path_indexes(conn):
+    _create_indexes(conn, Task.__table__, "ix_tasks_user_id_is_completed")
+    _create_indexes(
+        conn,
+        TaskCompletion.__table__,
+        "ix_task_completions_user_id_completed_at",
+        "ix_task_completions_task_id_completed_at",
+    )
+    _create_indexes(conn, StoryChapter.__table__, "ix_story_chapters_story_id_order_num")
+    _create_indexes(conn, StoryChoice.__table__, "ix_story_choices_chapter_id")
+    _create_indexes(conn, TaskPlan.__table__, "ix_task_plans_status_last_generated")
+
+
+@migration(5, "row_versions")
+def _row_versions(conn):
+    # 行版本号，更新时由 ORM 自增，用于计算 ETag
+    for table in ("users", "tasks", "task_plans", "user_stories"):
+        _add_column(conn, table, "row_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(6, "keyset_pagination_indexes")
+def _keyset_pagination_indexes(conn):
+    _create_indexes(conn, Task.__table__, "ix_tasks_user_id_id")
+    _create_indexes(conn, TaskPlan.__table__, "ix_task_plans_user_id_id")
+    _create_indexes(conn, UserStory.__table__, "ix_user_stories_user_id_id")
+
+
+def _db_utc_offset(conn) -> timedelta:
+    """数据库 CURRENT_TIMESTAMP 相对 UTC 的偏移（SQLite 为 0，MySQL 为会话时区），按 15 分钟取整"""
+    db_now = conn.execute(select(func.now())).scalar()
+    if isinstance(db_now, str):
+        db_now = datetime.fromisoformat(db_now)
+    if db_now.tzinfo is not None:
+        return db_now.utcoffset()
+    quarter = 15 * 60
+    seconds = (db_now - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+    return timedelta(seconds=round(seconds / quarter) * quarter)
+
+
+def _local_time(value: datetime, db_offset: timedelta) -> datetime:
+    """把数据库生成的时间换算为本地时间，与 Task 插入时 _anchor_time 使用的 datetime.now() 一致"""
+    if value.tzinfo is None:
+        value = (value - db_offset).replace(tzinfo=timezone.utc)
+    return value.astimezone()
+
+
+def _backfill_recurrence_anchors(conn, only_missing: bool):
+    """按批计算任务的锚点；用原生 UPDATE 避免触发 updated_at、row_version 的自动更新"""
+    tasks = Task.__table__
+    db_offset = _db_utc_offset(conn)
+    criteria = [tasks.c.created_at.isnot(None)]
+    if only_missing:
+        criteria.append(tasks.c.repeat_weekday.is_(None))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(tasks.c.id, tasks.c.created_at, tasks.c.repeat_weekday, tasks.c.repeat_monthday)
+            .where(tasks.c.id > last_id, *criteria)
+            .order_by(tasks.c.id)
+            .limit(1000)
+        ).all()
+        if not rows:
+            break
+        anchors = []
+        for row in rows:
+            created_at = _local_time(row.created_at, db_offset)
+            if (row.repeat_weekday, row.repeat_monthday) != (created_at.weekday(), created_at.day):
+                anchors.append({"id": row.id, "weekday": created_at.weekday(), "monthday": created_at.day})
+        if anchors:
+            conn.execute(
+                text("UPDATE tasks SET repeat_weekday = :weekday, repeat_monthday = :monthday WHERE id = :id"),
+                anchors,
+            )
+        last_id = rows[-1].id
+
+
+@migration(7, "recurrence_anchors")
+def _recurrence_anchors(conn):
+    # 重复任务的锚点（创建日的星期几和几号），按日期查询到期任务时直接匹配
+    _add_column(conn, "tasks", "repeat_weekday", "SMALLINT NULL")
+    _add_column(conn, "tasks", "repeat_monthday", "SMALLINT NULL")
+    _backfill_recurrence_anchors(conn, only_missing=True)
+    _create_indexes(conn, Task.__table__, "ix_tasks_user_id_recurrence", "ix_tasks_user_id_due_date")
+
+
+@migration(8, "user_daily_stats")
+def _user_daily_stats(conn):
+    # 已有数据的汇总由 python -m app.utils.daily_stats backfill 重建
+    UserDailyStats.__table__.create(conn, checkfirst=True)
+
+
+@migration(9, "collection_versions")
+def _collection_versions(conn):
+    # 没有记录的集合版本号按 0 处理，无需回填
+    CollectionVersion.__table__.create(conn, checkfirst=True)
+
+
+@migration(10, "recurrence_anchors_local_time")
+def _recurrence_anchors_local_time(conn):
+    # 早期的 0007 按数据库时间（SQLite 为 UTC）回填锚点，而新任务按本地时间计算；统一按本地时间重算
+    _backfill_recurrence_anchors(conn, only_missing=False)
+
+
+@migration(11, "completion_coins_earned")
+def _completion_coins_earned(conn):
+    _add_column(conn, "task_completions", "coins_earned", "BIGINT NULL")
+    _add_column(conn, "user_daily_stats", "kept_coins", "BIGINT NOT NULL DEFAULT 0")
+    # 已有完成记录按任务当前的奖励补齐，之后新产生的记录在完成时写入实际发放的金币
+    completions, tasks = TaskCompletion.__table__, Task.__table__
+    last_id = 0
+    while True:
+        ids = list(conn.execute(
+            select(completions.c.id)
+            .where(completions.c.id > last_id, completions.c.coins_earned.is_(None))
+            .order_by(completions.c.id)
+            .limit(1000)
+        ).scalars())
+        if not ids:
+            break
+        conn.execute(
+            completions.update()
+            .where(completions.c.id.in_(ids))
+            .values(coins_earned=select(tasks.c.coins_reward).where(tasks.c.id == completions.c.task_id).scalar_subquery())
+        )
+        last_id = ids[-1]
+
+
+def applied_versions(conn) -> List[int]:
+    schema_migrations.create(conn, checkfirst=True)
+    return list(conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine=None) -> List[int]:
+    """按顺序执行未应用的迁移，返回本次执行的版本号"""
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        applied = set(applied_versions(conn))
+    executed = []
+    for m in MIGRATIONS:
+        if m.version in applied:
+            continue
+        logger.info(f"执行迁移 {m.version:04d}_{m.name}")
+        try:
+            with engine.begin() as conn:
+                m.upgrade(conn)
+                conn.execute(insert(schema_migrations).values(version=m.version, name=m.name))
+        except IntegrityError:
+            # 其他进程已经执行并记录了该迁移
+            logger.info(f"迁移 {m.version:04d}_{m.name} 已由其他进程执行")
+            continue
+        executed.append(m.version)
+    return executed
+
+
+_schema_checked = False
+
+
+def ensure_schema():
+    """启动时检查并执行迁移；已是最新版本时只有一次查询，结果在进程内缓存"""
+    global _schema_checked
+    if _schema_checked:
+        return
+    run_migrations()
+    _schema_checked = True
+
+
+# 路由中的热点查询及其期望使用的索引；语句由路由共用的 app.utils.queries 和 keyset_paginate 构造，
+# 分页查询分别检查第一页和带游标的后续页
+_SAMPLE_DAY = date(2024, 1, 1)
+
+HOT_QUERIES = [
+    (
+        "read_tasks",
+        ("ix_tasks_user_id_is_completed", "ix_tasks_user_id_id"),
+        lambda: keyset_paginate(user_tasks(1, completed=False), TASK_ORDER, None, 0, 100),
+    ),
+    (
+        "read_tasks_page",
+        ("ix_tasks_user_id_id",),
+        lambda: keyset_paginate(user_tasks(1), TASK_ORDER, encode_cursor([100]), 0, 100),
+    ),
+    (
+        "read_tasks_due_today",
+        ("ix_tasks_user_id_recurrence", "ix_tasks_user_id_due_date", "ix_tasks_user_id_is_completed"),
+        lambda: due_tasks(1, [_SAMPLE_DAY]),
+    ),
+    (
+        "read_tasks_due",
+        ("ix_tasks_user_id_recurrence", "ix_tasks_user_id_due_date", "ix_tasks_user_id_is_completed"),
+        lambda: due_tasks(1, date_range(_SAMPLE_DAY, _SAMPLE_DAY + timedelta(days=30))),
+    ),
+    (
+        "read_all_task_completions",
+        ("ix_task_completions_user_id_completed_at",),
+        lambda: keyset_paginate(user_completions(1), COMPLETION_ORDER, None, 0, 100),
+    ),
+    (
+        "read_all_task_completions_page",
+        ("ix_task_completions_user_id_completed_at",),
+        lambda: keyset_paginate(
+            user_completions(1), COMPLETION_ORDER, encode_cursor([datetime(2024, 1, 1), 100]), 0, 100,
+        ),
+    ),
+    (
+        "read_task_completions_by_task",
+        ("ix_task_completions_task_id_completed_at", "ix_task_completions_user_id_completed_at"),
+        lambda: keyset_paginate(user_completions(1, task_id=1), COMPLETION_ORDER, None, 0, 100),
+    ),
+    (
+        "read_task_plans_page",
+        ("ix_task_plans_user_id_id",),
+        lambda: keyset_paginate(user_task_plans(1), TASK_PLAN_ORDER, encode_cursor([100]), 0, 100),
+    ),
+    (
+        "read_my_stories_page",
+        ("ix_user_stories_user_id_id",),
+        lambda: keyset_paginate(user_stories(1), USER_STORY_ORDER, encode_cursor([100]), 0, 100),
+    ),
+    (
+        "uncomplete_task",
+        ("ix_task_completions_task_id_completed_at", "ix_task_completions_user_id_completed_at"),
+        lambda: latest_completion(1, task_id=1),
+    ),
+    (
+        "read_story_chapters",
+        ("ix_story_chapters_story_id_order_num",),
+        lambda: story_chapters(1),
+    ),
+    (
+        # chapter_load() 的 selectinload 按章节 id 批量加载选项时发出的查询
+        "load_chapter_choices",
+        ("ix_story_choices_chapter_id",),
+        lambda: select(StoryChoice).where(StoryChoice.chapter_id.in_([1, 2, 3])),
+    ),
+    (
+        "generate_tasks_for_all_active_plans",
+        ("ix_task_plans_status_last_generated",),
+        active_task_plans,
+    ),
+]
+
+
+def _explain_prefix(dialect_name: str) -> str:
+    return "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+
+
+def explain_hot_queries(engine=None) -> List[dict]:
+    """对热点查询执行 EXPLAIN，检查执行计划中是否使用了期望的索引"""
+    engine = engine or get_engine()
+    results = []
+    with engine.connect() as conn:
+        prefix = _explain_prefix(conn.dialect.name)
+        for name, expected, build in HOT_QUERIES:
+            sql = str(build().compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [tuple(row) for row in conn.execute(text(prefix + sql))]
+            plan_text = " ".join(str(value) for row in plan for value in row)
+            used: Optional[str] = next((index for index in expected if index in plan_text), None)
+            results.append({"query": name, "index": used, "ok": used is not None, "plan": plan})
+    return results
+
+
+def _print_status(engine):
+    with engine.begin() as conn:
+        applied = set(applied_versions(conn))
+    for m in MIGRATIONS:
+        state = "applied" if m.version in applied else "pending"
+        print(f"{m.version:04d}_{m.name}: {state}")
+
+
+def main(argv: List[str]) -> int:
+    command = argv[0] if argv else "upgrade"
+    engine = get_engine()
+    if command == "upgrade":
+        executed = run_migrations(engine)
+        print(f"执行了 {len(executed)} 个迁移" if executed else "数据库已是最新版本")
+        return 0
+    if command == "status":
+        _print_status(engine)
+        return 0
+    if command == "explain":
+        ok = True
+        for result in explain_hot_queries(engine):
+            if result["ok"]:
+                print(f"[OK]   {result['query']}: {result['index']}")
+            else:
+                ok = False
+                print(f"[MISS] {result['query']}: {result['plan']}")
+        return 0 if ok else 1
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(sys.argv[1:]))
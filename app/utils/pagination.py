@@ -0,0 +1,110 @@
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, nulls_first, or_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# 游标分页：按 (排序键, id) 升序排列，游标记录上一页最后一行的排序键，
+# 下一页从该位置之后开始，深翻页不需要扫描被跳过的行，并发插入也不会导致重复或遗漏。
+# 可为空的排序键统一按 NULL 在前排序，游标中的 NULL 由 _after 单独处理。
+
+
+class _NullsFirst(ColumnElement):
+    """升序排列时 NULL 在前
+
+    SQLite、MySQL 升序时 NULL 本来就在前；PostgreSQL 默认在后，需要显式 NULLS FIRST。
+    MySQL 不支持 NULLS FIRST 语法，直接输出列本身。
+    """
+    inherit_cache = True
+    _traverse_internals = [("element", InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, element):
+        self.element = element
+
+
+@compiles(_NullsFirst)
+def _compile_nulls_first(element, compiler, **kw):
+    return compiler.process(nulls_first(element.element), **kw)
+
+
+@compiles(_NullsFirst, "mysql")
+@compiles(_NullsFirst, "mariadb")
+def _compile_nulls_first_mysql(element, compiler, **kw):
+    return compiler.process(element.element, **kw)
+
+
+def _nullable(column) -> bool:
+    return bool(getattr(column, "nullable", False))
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """把排序键编码为不透明的游标字符串"""
+    raw = orjson.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, order_by: Sequence[Any]) -> List[Any]:
+    """解析游标，格式错误或与排序列不匹配时返回 400"""
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(order_by):
+            raise ValueError("cursor length mismatch")
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+            for column, value in zip(order_by, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(order_by: Sequence[Any], values: Sequence[Any]):
+    """(a, b, ...) > (x, y, ...) 展开为 a > x OR (a = x AND (b > y OR ...))，便于走索引范围扫描
+
+    NULL 排在最前：游标值为 NULL 时，之后的行是同为 NULL 且后续列更大的行，以及所有非 NULL 行；
+    游标值非 NULL 时 a > x 自然排除了 NULL 行。
+    """
+    column, value = order_by[0], values[0]
+    if value is None:
+        if not _nullable(column):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if len(order_by) == 1:
+            return column.isnot(None)
+        return or_(and_(column.is_(None), _after(order_by[1:], values[1:])), column.isnot(None))
+    if len(order_by) == 1:
+        return column > value
+    return or_(column > value, and_(column == value, _after(order_by[1:], values[1:])))
+
+
+def keyset_paginate(stmt, order_by: Sequence[Any], cursor: Optional[str], skip: int, limit: int):
+    """给 select() 或 Query 加上排序和分页条件
+
+    传了 cursor 时从游标之后开始（忽略 skip），否则保留原来的 offset 分页。
+    多取一行用于判断是否还有下一页，结果交给 split_page 处理。
+    """
+    if cursor:
+        values = decode_cursor(cursor, order_by)
+        if values[0] is None:
+            stmt = stmt.where(_after(order_by, values))
+        else:
+            # 冗余的 >= 条件让数据库可以直接对首列做索引范围扫描
+            stmt = stmt.where(order_by[0] >= values[0], _after(order_by, values))
+    elif skip:
+        stmt = stmt.offset(skip)
+    return stmt.order_by(*(_NullsFirst(column) if _nullable(column) else column for column in order_by)).limit(
+        max(limit, 0) + 1
+    )
+
+
+def split_page(rows: Sequence[Any], order_by: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """截掉多取的一行，返回 (本页数据, 下一页游标)；没有下一页时游标为 None"""
+    rows = list(rows)
+    if limit <= 0 or len(rows) <= limit:
+        return rows[:max(limit, 0)], None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in order_by])
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# bcrypt 成本参数，修改后旧哈希会在用户下次登录时自动重新计算
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 专用哈希进程数，0 表示改用事件循环默认的线程池（不支持多进程的环境或用于对比）。
+# 单核部署推荐 0：进程池和 worker 抢同一个 CPU，实测登录 p99 比线程池更差，因此单核时默认为 0
+PASSWORD_HASH_WORKERS = int(os.getenv(
+    "PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1) if (os.cpu_count() or 1) > 1 else 0),
+))
+# 排队 + 执行中的哈希任务上限，超过后直接返回 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if _executor is None and PASSWORD_HASH_WORKERS > 0:
+        with _executor_lock:
+            if _executor is None:
+                # 不使用 Linux 默认的 fork：父进程里已有线程池和日志线程，
+                # fork 出的子进程可能继承被其他线程持有的锁而死锁
+                _executor = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("forkserver"),
+                )
+    return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry later",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _submit(fn, *args):
+    # 队列已满时立即拒绝，避免登录风暴拖垮其他请求
+    if not _pending.acquire(blocking=False):
+        logger.warning("密码哈希队列已满，拒绝请求")
+        raise _busy_exception()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    except BrokenProcessPool:
+        logger.error("密码哈希进程池已损坏，将在下次请求时重建")
+        _reset_executor()
+        raise _busy_exception()
+    finally:
+        _pending.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """在专用进程池中计算密码哈希"""
+    return await _submit(_hash, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """在专用进程池中校验密码
+
+    返回 (是否匹配, 新哈希)。当现有哈希的成本参数与当前配置不一致时，新哈希不为 None。
+    """
+    return await _submit(_verify_and_update, password, hashed_password)
+
+
+def shutdown_password_pool():
+    """关闭密码哈希进程池"""
+    _reset_executor()
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    """连接池运行指标：获取连接等待时间、连接创建/关闭次数等"""
+
+    def __init__(self, sample_size: int = 1024):
+        self._lock = threading.Lock()
+        self._wait_samples = deque(maxlen=sample_size)
+        self.acquire_count = 0
+        self.acquire_timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.connections_invalidated = 0
+        self.checkouts = 0
+        self.checkins = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.acquire_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._wait_samples.append(seconds)
+            if timed_out:
+                self.acquire_timeouts += 1
+
+    def _percentile(self, samples, percent: float) -> float:
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            return {
+                "acquire_count": self.acquire_count,
+                "acquire_timeouts": self.acquire_timeouts,
+                "wait_avg_ms": round(self.wait_total / self.acquire_count * 1000, 3) if self.acquire_count else 0.0,
+                "wait_p50_ms": round(self._percentile(samples, 50) * 1000, 3),
+                "wait_p99_ms": round(self._percentile(samples, 99) * 1000, 3),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "connections_invalidated": self.connections_invalidated,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """记录获取连接等待时间"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """记录获取连接等待时间的 QueuePool"""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """记录获取连接等待时间的 AsyncAdaptedQueuePool，供异步引擎使用"""
+
+
+def instrument_pool(engine):
+    """为引擎注册连接池事件，统计连接的创建、关闭与借还"""
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None)
+    if metrics is None:
+        metrics = pool.metrics = PoolMetrics()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.connections_created += 1
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_connection, connection_record):
+        metrics.connections_closed += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.connections_invalidated += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+
+def pool_status(engine) -> Dict[str, Any]:
+    """返回连接池当前状态与累计指标"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+
+# 认证用户缓存配置
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "1024"))
+
+_USER_COLUMNS = [column.key for column in User.__table__.columns]
+
+
+class PrincipalCache:
+    """按用户名缓存已认证用户的列快照（进程内 LRU + TTL）
+
+    缓存的是普通字典而不是 ORM 对象，避免跨会话复用已过期或已分离的实例。
+    """
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_MAX_SIZE, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= now:
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return snapshot
+
+    def set(self, username: str, snapshot: Dict[str, Any]):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *usernames: Optional[str]):
+        with self._lock:
+            for username in usernames:
+                if username:
+                    self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def snapshot_user(user: User) -> Dict[str, Any]:
+    """提取用户的列值快照"""
+    return {key: getattr(user, key) for key in _USER_COLUMNS}
+
+
+def _detached_user(snapshot: Dict[str, Any]) -> User:
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def attach_user(db: Session, snapshot: Dict[str, Any]) -> User:
+    """将快照还原为挂接在当前会话上的 User 实例，不产生查询"""
+    return db.merge(_detached_user(snapshot), load=False)
+
+
+async def attach_user_async(db: AsyncSession, snapshot: Dict[str, Any]) -> User:
+    """异步会话版本的 attach_user"""
+    return await db.merge(_detached_user(snapshot), load=False)
+
+
+def invalidate_user_cache(*usernames: Optional[str]):
+    """用户信息（is_active、coins 等）变更后调用，使缓存失效"""
+    principal_cache.invalidate(*usernames)
@@ -0,0 +1,72 @@
+"""路由中热点查询的构造函数
+
+路由和 migrations.explain_hot_queries 使用同一组函数，EXPLAIN 检查的就是线上执行的语句，
+修改这里的条件或排序后，`python -m app.utils.migrations explain` 能立即发现索引失效。
+分页查询只构造过滤条件，排序和游标条件由 keyset_paginate 按下面的排序键添加。
+"""
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app.models.story import StoryChapter, UserStory
+from app.models.task import Task
+from app.models.task_completion import TaskCompletion
+from app.models.task_plan import TaskPlan, TaskPlanStatus
+from app.utils.recurrence import due_within
+
+# keyset_paginate 使用的排序键
+TASK_ORDER = (Task.id,)
+COMPLETION_ORDER = (TaskCompletion.completed_at, TaskCompletion.id)
+TASK_PLAN_ORDER = (TaskPlan.id,)
+USER_STORY_ORDER = (UserStory.id,)
+
+
+def user_tasks(user_id: int, completed: Optional[bool] = None):
+    """用户的任务，可按完成状态过滤"""
+    stmt = select(Task).where(Task.user_id == user_id)
+    if completed is not None:
+        stmt = stmt.where(Task.is_completed == completed)
+    return stmt
+
+
+def due_tasks(user_id: int, days: List[date]):
+    """这些日期中至少有一天到期的未完成任务，按 id 排序"""
+    return select(Task).where(
+        Task.user_id == user_id,
+        Task.is_completed == False,
+        due_within(days),
+    ).order_by(Task.id)
+
+
+def user_completions(user_id: int, task_id: Optional[int] = None):
+    """用户的完成记录，可限定某个任务"""
+    stmt = select(TaskCompletion).where(TaskCompletion.user_id == user_id)
+    if task_id is not None:
+        stmt = stmt.where(TaskCompletion.task_id == task_id)
+    return stmt
+
+
+def latest_completion(user_id: int, task_id: int):
+    """任务最近的一条完成记录"""
+    return user_completions(user_id, task_id).order_by(TaskCompletion.completed_at.desc()).limit(1)
+
+
+def user_task_plans(user_id: int):
+    """用户的任务计划"""
+    return select(TaskPlan).where(TaskPlan.user_id == user_id)
+
+
+def active_task_plans():
+    """所有活跃的任务计划，供定时生成任务使用"""
+    return select(TaskPlan).where(TaskPlan.status == TaskPlanStatus.ACTIVE)
+
+
+def user_stories(user_id: int):
+    """用户解锁的故事"""
+    return select(UserStory).where(UserStory.user_id == user_id)
+
+
+def story_chapters(story_id: int):
+    """故事的全部章节，按顺序排列"""
+    return select(StoryChapter).where(StoryChapter.story_id == story_id).order_by(StoryChapter.order_num)
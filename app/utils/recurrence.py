@@ -0,0 +1,60 @@
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from app.models.task import Task, RepeatType
+
+# /tasks/due 单次查询的最大天数
+MAX_DUE_RANGE_DAYS = int(os.getenv("MAX_DUE_RANGE_DAYS", "62"))
+
+
+def date_range(start: date, end: date) -> List[date]:
+    """[start, end] 内的每一天，区间无效或超过上限时返回 400"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be earlier than 'from'")
+    days = (end - start).days + 1
+    if days > MAX_DUE_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range too large, at most {MAX_DUE_RANGE_DAYS} days")
+    return [start + timedelta(days=i) for i in range(days)]
+
+
+def due_within(days: List[date]):
+    """在这些日期中至少有一天到期的任务的查询条件
+
+    每周、每月任务按写入时保存的锚点列匹配，不需要把任务读出来再逐个判断。
+    """
+    return or_(
+        and_(
+            Task.repeat_type == RepeatType.NONE,
+            Task.due_date >= days[0],
+            Task.due_date < days[-1] + timedelta(days=1),
+        ),
+        Task.repeat_type == RepeatType.DAILY,
+        and_(Task.repeat_type == RepeatType.WEEKLY, Task.repeat_weekday.in_(sorted({day.weekday() for day in days}))),
+        and_(Task.repeat_type == RepeatType.MONTHLY, Task.repeat_monthday.in_(sorted({day.day for day in days}))),
+    )
+
+
+def due_calendar(tasks: List[Task], days: List[date]) -> List[Dict[str, Any]]:
+    """把 due_within 查出的任务按天展开为 [{date, task_ids}]
+
+    先按锚点把任务分组，每天只需合并对应的几组，不用对每一天逐个检查全部任务。
+    """
+    daily, weekly, monthly, once = [], defaultdict(list), defaultdict(list), defaultdict(list)
+    for task in tasks:
+        if task.repeat_type == RepeatType.DAILY:
+            daily.append(task.id)
+        elif task.repeat_type == RepeatType.WEEKLY:
+            weekly[task.repeat_weekday].append(task.id)
+        elif task.repeat_type == RepeatType.MONTHLY:
+            monthly[task.repeat_monthday].append(task.id)
+        elif task.due_date is not None:
+            once[task.due_date.date()].append(task.id)
+    return [
+        {"date": day, "task_ids": sorted(daily + weekly[day.weekday()] + monthly[day.day] + once[day])}
+        for day in days
+    ]
@@ -1,9 +1,40 @@
-from fastapi import HTTPException
-from app.schemas.response import ResponseModel
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+
+from app.schemas.response import ResponseModel, StandardResponse, PageResponse
 
 def error_response(status_code: int, detail: str):
     """创建错误响应"""
     return HTTPException(
         status_code=status_code,
         detail=detail
-    ) 
\ No newline at end of file
+    )
+
+@lru_cache(maxsize=None)
+def _envelope_adapter(data_type: Any) -> TypeAdapter:
+    return TypeAdapter(StandardResponse[data_type])
+
+def envelope_response(data: Any, data_type: Any, msg: str = "", code: int = 200) -> Response:
+    """直接生成标准格式的 JSON 响应
+
+    ORM 对象只校验一次（from_attributes），再由 pydantic-core 直接输出 JSON；
+    返回 Response 后 FastAPI 不再按 response_model 校验和序列化，适合大列表接口。
+    """
+    adapter = _envelope_adapter(data_type)
+    envelope = adapter.validate_python({"code": code, "msg": msg, "data": data}, from_attributes=True)
+    return Response(content=adapter.dump_json(envelope), media_type="application/json")
+
+@lru_cache(maxsize=None)
+def _page_adapter(data_type: Any) -> TypeAdapter:
+    return TypeAdapter(PageResponse[data_type])
+
+def page_response(data: Any, data_type: Any, next_cursor: Optional[str], msg: str = "", code: int = 200) -> Response:
+    """envelope_response 的分页版本，响应中带 next_cursor"""
+    adapter = _page_adapter(data_type)
+    envelope = adapter.validate_python(
+        {"code": code, "msg": msg, "data": data, "next_cursor": next_cursor}, from_attributes=True
+    )
+    return Response(content=adapter.dump_json(envelope), media_type="application/json")
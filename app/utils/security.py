@@ -1,14 +1,21 @@
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional
 from jose import JWTError, jwt, ExpiredSignatureError
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db
 from app.models.user import User
 from app.schemas.user import TokenData
+from app.utils.principal_cache import principal_cache, snapshot_user, attach_user, attach_user_async
+from app.utils.passwords import pwd_context, verify_password_async
+from app.utils.session_store import session_store
+from app.utils.token_cache import token_digest, claim_cache, revocation_list
 import os
+import uuid
 import logging
 from dotenv import load_dotenv
 
@@ -22,13 +29,10 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "300"))
 
-# 存储活跃会话
-active_sessions: Dict[str, datetime] = {}
 # 会话清理间隔（秒）
 SESSION_CLEANUP_INTERVAL = 3600  # 1小时清理一次
 last_cleanup_time = datetime.utcnow()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def verify_password(plain_password, hashed_password):
@@ -38,30 +42,42 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 def get_user(db: Session, username: str):
-    print(f"Getting user with username: {username}")
     return db.query(User).filter(User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
+async def get_user_async(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user_async(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await verify_password_async(password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        # bcrypt 成本参数变化后，登录时透明地重新哈希
+        user.hashed_password = new_hash
+        await db.commit()
+        logger.info(f"用户 {username} 的密码哈希已按新的成本参数更新")
     return user
 
+def session_id(digest: bytes) -> str:
+    """令牌对应的会话 ID"""
+    return digest.hex()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti 保证同一秒内多次登录得到不同的令牌，各自有独立的会话
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     
-    # 记录活跃会话
-    username = data.get("sub")
-    if username:
-        active_sessions[username] = expire
+    # 记录活跃会话，每个令牌一个会话
+    session_store.set(session_id(token_digest(encoded_jwt)), expire)
     
     return encoded_jwt
 
@@ -74,20 +90,18 @@ def cleanup_expired_sessions():
     if (now - last_cleanup_time).total_seconds() < SESSION_CLEANUP_INTERVAL:
         return
     
-    logger.info("开始清理过期会话...")
-    expired_users = []
-    for username, expire_time in active_sessions.items():
-        if now > expire_time:
-            expired_users.append(username)
-    
-    for username in expired_users:
-        logger.info(f"清理用户 {username} 的过期会话")
-        active_sessions.pop(username, None)
-    
     last_cleanup_time = now
-    logger.info(f"会话清理完成，移除了 {len(expired_users)} 个过期会话")
+    removed = session_store.purge_expired()
+    logger.info(f"会话清理完成，移除了 {removed} 个过期会话")
+
+async def _session_call(fn, *args):
+    """调用会话存储；会阻塞的后端放到线程池执行，等待 SQLite 写锁时不会卡住事件循环"""
+    if session_store.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
 
-async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def _authenticate(request: Request, token: str, db: AsyncSession) -> dict:
+    """校验令牌并返回当前用户的列快照"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -98,32 +112,43 @@ async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)
         # 获取客户端 IP
         client_ip = request.client.host if request.client else "unknown"
         
-        # 尝试解码令牌
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+        # 已登出的令牌直接拒绝
+        digest = token_digest(token)
+        if revocation_list.is_revoked(digest):
+            logger.warning(f"令牌已被吊销 | IP: {client_ip}")
             raise credentials_exception
         
-        # 检查令牌是否过期
-        exp = payload.get("exp")
-        if exp and datetime.fromtimestamp(exp) < datetime.utcnow():
-            # 令牌已过期，从活跃会话中移除
-            active_sessions.pop(username, None)
-            logger.warning(f"用户 {username} 的令牌已过期 | IP: {client_ip}")
+        # 优先使用已验证的声明缓存，未命中时才解码并校验签名和 exp
+        payload = claim_cache.get(digest)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            claim_cache.set(digest, payload)
+        username: str = payload.get("sub")
+        if username is None:
             raise credentials_exception
         
         token_data = TokenData(username=username)
         
+        # 会话存储决定令牌是否仍然有效：在任何一个 worker 上登出都会删除会话
+        current_session = session_id(digest)
+        if await _session_call(session_store.get, current_session) is None:
+            logger.warning(f"用户 {username} 的会话已过期或已登出 | IP: {client_ip}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Session has expired or been logged out",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
         # 更新会话活跃时间（如果是正常请求）
         path = request.url.path
         if not path.endswith("/token") and not path.endswith("/logout"):
-            # 延长会话过期时间
+            # 延长会话过期时间，只更新已有会话
             new_expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-            active_sessions[username] = new_expire
+            await _session_call(session_store.touch, current_session, new_expire)
             logger.debug(f"更新用户 {username} 的会话过期时间为 {new_expire} | IP: {client_ip}")
         
         # 定期清理过期会话
-        cleanup_expired_sessions()
+        await _session_call(cleanup_expired_sessions)
         
     except ExpiredSignatureError:
         # 令牌已过期
@@ -138,23 +163,69 @@ async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)
         logger.error(f"JWT错误: {str(e)} | IP: {client_ip}")
         raise credentials_exception
     
-    user = get_user(db, username=token_data.username)
-    if user is None:
-        logger.warning(f"找不到用户: {token_data.username} | IP: {client_ip}")
-        raise credentials_exception
+    # 记录当前用户，用于读写分离时的读己之写
+    db.info["principal"] = token_data.username
     
-    logger.info(f"用户 {username} 认证成功 | IP: {client_ip}")
-    return user
+    # 优先使用缓存的用户快照，避免每个请求都查询 users 表
+    snapshot = principal_cache.get(token_data.username)
+    if snapshot is None:
+        user = await get_user_async(db, username=token_data.username)
+        if user is None:
+            logger.warning(f"找不到用户: {token_data.username} | IP: {client_ip}")
+            raise credentials_exception
+        snapshot = snapshot_user(user)
+        principal_cache.set(token_data.username, snapshot)
+        # 结束只读事务，及时把连接还给连接池
+        await db.rollback()
+    
+    # 供访问日志记录用户 ID
+    request.state.user_id = snapshot["id"]
+    logger.debug(f"用户 {username} 认证成功 | IP: {client_ip}")
+    return snapshot
+
+async def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    async_db: AsyncSession = Depends(get_async_db)
+):
+    """同步路由使用的认证依赖，返回挂接在同步会话上的用户"""
+    snapshot = await _authenticate(request, token, async_db)
+    db.info["principal"] = snapshot["username"]
+    return attach_user(db, snapshot)
+
+async def get_current_user_async(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """异步路由使用的认证依赖，返回挂接在异步会话上的用户"""
+    snapshot = await _authenticate(request, token, db)
+    return await attach_user_async(db, snapshot)
+
 
 async def get_current_active_user(current_user = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def logout_user(username: str):
-    """登出用户，从活跃会话中移除"""
-    if username in active_sessions:
-        active_sessions.pop(username)
+async def get_current_active_user_async(current_user = Depends(get_current_user_async)):
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+def revoke_token(token: str):
+    """吊销令牌，令牌过期前的后续请求都会被拒绝"""
+    digest = token_digest(token)
+    claims = claim_cache.get(digest) or jwt.get_unverified_claims(token)
+    expires_at = claims.get("exp") or (datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)).timestamp()
+    revocation_list.revoke(digest, float(expires_at))
+    claim_cache.discard(digest)
+
+def logout_user(username: str, token: str):
+    """登出令牌：删除它的会话（所有 worker 可见），并加入本进程的吊销列表"""
+    revoke_token(token)
+    if session_store.delete(session_id(token_digest(token))):
         logger.info(f"用户 {username} 已登出")
         return True
     return False 
\ No newline at end of file
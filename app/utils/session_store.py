@@ -0,0 +1,285 @@
+import calendar
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 会话存储后端：memory（进程内）或 sqlite（同一节点上的所有 worker 共享）
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+# 共享存储中滑动续期的最小写入间隔（秒），避免每个请求都写一次
+SESSION_TOUCH_INTERVAL = float(os.getenv("SESSION_TOUCH_INTERVAL", "60"))
+
+
+def _to_timestamp(value: datetime) -> float:
+    """将 UTC naive datetime 转为时间戳"""
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
+
+
+def _from_timestamp(value: float) -> datetime:
+    return datetime.utcfromtimestamp(value)
+
+
+class SessionBackend(ABC):
+    """会话存储接口，每个令牌一个会话，过期时间统一使用 UTC naive datetime
+
+    会话是令牌是否仍然有效的依据：登出删除会话后，该令牌在所有共享同一存储的 worker 上都会被拒绝。
+    blocking 为 True 的后端会做文件 I/O 或等待锁，异步代码应在线程池中调用它的方法。
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def set(self, session_id: str, expires_at: datetime):
+        """创建或延长会话，只在登录时调用"""
+
+    @abstractmethod
+    def touch(self, session_id: str, expires_at: datetime) -> bool:
+        """滑动续期，只更新仍然有效的会话，不会重新创建已删除或已过期的会话；返回会话是否有效"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[datetime]:
+        """返回会话过期时间，会话不存在或已过期时返回 None"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """删除会话，返回会话是否存在"""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """清理过期会话，返回清理数量"""
+
+
+class TimingWheel:
+    """分层时间轮
+
+    每层有 slots 个槽，第 n 层每个槽覆盖 slots**n 个 tick。插入、删除均为 O(1)，
+    推进时只处理到期槽位，并把高层槽位中的条目逐级下放。
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._wheels: List[List[Set[str]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._positions: Dict[str, Tuple[int, int]] = {}
+        self._deadlines: Dict[str, int] = {}
+        self._current = self._tick_of(time.time())
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp // self.tick)
+
+    def _place(self, key: str, deadline: int) -> bool:
+        delta = deadline - self._current
+        if delta <= 0:
+            return False
+        for level in range(self.levels):
+            span = self.slots ** (level + 1)
+            if delta < span:
+                slot = (deadline // self.slots ** level) % self.slots
+                break
+        else:
+            # 超出时间轮范围，先放在最高层最远的槽位，下放时会重新计算
+            level = self.levels - 1
+            slot = ((self._current + self.slots ** self.levels - 1) // self.slots ** level) % self.slots
+        self._wheels[level][slot].add(key)
+        self._positions[key] = (level, slot)
+        return True
+
+    def schedule(self, key: str, timestamp: float):
+        self.cancel(key)
+        deadline = self._tick_of(timestamp)
+        self._deadlines[key] = deadline
+        if not self._place(key, deadline):
+            # 已经到期的条目放在下一个 tick 处理
+            self._wheels[0][(self._current + 1) % self.slots].add(key)
+            self._positions[key] = (0, (self._current + 1) % self.slots)
+
+    def cancel(self, key: str):
+        position = self._positions.pop(key, None)
+        if position is not None:
+            level, slot = position
+            self._wheels[level][slot].discard(key)
+        self._deadlines.pop(key, None)
+
+    def advance(self, timestamp: float) -> List[str]:
+        """推进到指定时间，返回到期的 key"""
+        target = self._tick_of(timestamp)
+        expired: List[str] = []
+        if not self._deadlines:
+            self._current = max(self._current, target)
+            return expired
+        while self._current < target:
+            self._current += 1
+            # 高层槽位到点时整体下放
+            for level in range(1, self.levels):
+                if self._current % self.slots ** level:
+                    break
+                slot = (self._current // self.slots ** level) % self.slots
+                bucket = self._wheels[level][slot]
+                self._wheels[level][slot] = set()
+                for key in bucket:
+                    self._positions.pop(key, None)
+                    if not self._place(key, self._deadlines[key]):
+                        expired.append(key)
+                        self._deadlines.pop(key, None)
+            slot = self._current % self.slots
+            bucket = self._wheels[0][slot]
+            self._wheels[0][slot] = set()
+            for key in bucket:
+                self._positions.pop(key, None)
+                self._deadlines.pop(key, None)
+                expired.append(key)
+            if not self._deadlines:
+                self._current = target
+                break
+        return expired
+
+
+class MemorySessionBackend(SessionBackend):
+    """进程内会话存储，使用分层时间轮做 O(1) 过期"""
+
+    def __init__(self):
+        self._sessions: Dict[str, datetime] = {}
+        self._wheel = TimingWheel()
+        self._lock = threading.Lock()
+
+    def _expire(self) -> int:
+        expired = self._wheel.advance(time.time())
+        for session_id in expired:
+            self._sessions.pop(session_id, None)
+        return len(expired)
+
+    def _live(self, session_id: str) -> Optional[datetime]:
+        # 时间轮按 tick 推进，同一 tick 内到期的会话在这里排除
+        expires_at = self._sessions.get(session_id)
+        return expires_at if expires_at is not None and expires_at > datetime.utcnow() else None
+
+    def set(self, session_id: str, expires_at: datetime):
+        with self._lock:
+            self._expire()
+            self._sessions[session_id] = expires_at
+            self._wheel.schedule(session_id, _to_timestamp(expires_at))
+
+    def touch(self, session_id: str, expires_at: datetime) -> bool:
+        with self._lock:
+            self._expire()
+            if self._live(session_id) is None:
+                return False
+            self._sessions[session_id] = expires_at
+            self._wheel.schedule(session_id, _to_timestamp(expires_at))
+            return True
+
+    def get(self, session_id: str) -> Optional[datetime]:
+        with self._lock:
+            self._expire()
+            return self._live(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._expire()
+            self._wheel.cancel(session_id)
+            return self._sessions.pop(session_id, None) is not None
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._expire()
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """基于 SQLite 文件的会话存储，同一节点上的多个 worker 共享
+
+    WAL 模式下读取不会等待写锁；写入只发生在登录、登出和节流后的续期，
+    但写入可能等待其他 worker 持有的写锁（最长为连接的 timeout）。
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = SESSION_DB_PATH, touch_interval: float = SESSION_TOUCH_INTERVAL):
+        self.path = path
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        # 本进程最近一次续期写入的时间
+        self._touched: Dict[str, float] = {}
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_sessions ("
+            "session_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_token_sessions_expires_at ON token_sessions (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def set(self, session_id: str, expires_at: datetime):
+        self._connection().execute(
+            "INSERT INTO token_sessions (session_id, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET expires_at = excluded.expires_at",
+            (session_id, _to_timestamp(expires_at)),
+        )
+        self._touched[session_id] = time.monotonic()
+
+    def touch(self, session_id: str, expires_at: datetime) -> bool:
+        last = self._touched.get(session_id)
+        if last is not None and time.monotonic() - last < self.touch_interval:
+            return True
+        # 只延长仍然有效的会话，其他 worker 上登出后不会被这里重新写回
+        cursor = self._connection().execute(
+            "UPDATE token_sessions SET expires_at = ? WHERE session_id = ? AND expires_at > ?",
+            (_to_timestamp(expires_at), session_id, time.time()),
+        )
+        if cursor.rowcount == 0:
+            self._touched.pop(session_id, None)
+            return False
+        self._touched[session_id] = time.monotonic()
+        return True
+
+    def get(self, session_id: str) -> Optional[datetime]:
+        row = self._connection().execute(
+            "SELECT expires_at FROM token_sessions WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time()),
+        ).fetchone()
+        return _from_timestamp(row[0]) if row else None
+
+    def delete(self, session_id: str) -> bool:
+        self._touched.pop(session_id, None)
+        cursor = self._connection().execute(
+            "DELETE FROM token_sessions WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def purge_expired(self) -> int:
+        cursor = self._connection().execute("DELETE FROM token_sessions WHERE expires_at <= ?", (time.time(),))
+        # 续期记录只用于节流，这里顺便清空防止无限增长
+        self._touched.clear()
+        return cursor.rowcount
+
+
+def create_session_backend(name: str = SESSION_BACKEND) -> SessionBackend:
+    """根据配置创建会话存储后端"""
+    if name == "sqlite":
+        logger.info(f"使用 SQLite 会话存储: {SESSION_DB_PATH}")
+        return SQLiteSessionBackend(SESSION_DB_PATH)
+    if name != "memory":
+        logger.warning(f"未知的会话存储后端 {name}，使用 memory")
+    return MemorySessionBackend()
+
+
+session_store = create_session_backend()
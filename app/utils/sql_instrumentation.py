@@ -0,0 +1,117 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# 是否开启 SQL 统计
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "true").lower() in ("1", "true", "yes")
+# 慢查询阈值（毫秒），0 表示不记录
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+# 同一请求中相同形状的语句执行次数达到该值时视为疑似 N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """语句指纹：去掉字面量和参数占位符差异，IN 列表折叠为一个占位符"""
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class RequestSQLStats:
+    """单个请求内的 SQL 统计"""
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+        # 同步路由在线程池中执行，与事件循环中的查询可能同时记录
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float):
+        shape = fingerprint(statement)
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.shapes[shape] += 1
+
+    def suspected_n_plus_one(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_time * 1000:.2f};desc="{self.count} queries"'
+
+
+_current_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("sql_request_stats", default=None)
+
+
+def start_request(path: str):
+    """开始统计当前请求，返回用于结束统计的 token"""
+    return _current_stats.set(RequestSQLStats(path))
+
+
+def finish_request(token) -> Optional[RequestSQLStats]:
+    stats = _current_stats.get()
+    _current_stats.reset(token)
+    if stats is not None:
+        for shape, count in stats.suspected_n_plus_one():
+            logger.warning(f"疑似 N+1 查询: {stats.path} 中相同语句执行了 {count} 次 | {shape}")
+    return stats
+
+
+def current_stats() -> Optional[RequestSQLStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if SQL_SLOW_QUERY_MS and elapsed * 1000 >= SQL_SLOW_QUERY_MS:
+        path = stats.path if stats is not None else "-"
+        logger.warning(f"慢查询 {elapsed * 1000:.1f}ms | 路径: {path} | {fingerprint(statement)}")
+
+
+def _handle_error(context):
+    # 出错的语句不会触发 after_cursor_execute，丢弃其开始时间
+    if context.connection is not None:
+        start_times = context.connection.info.get("query_start_time")
+        if start_times:
+            start_times.pop()
+
+
+def install():
+    """在所有引擎（包括异步引擎底层的同步引擎）上注册统计事件"""
+    if not SQL_INSTRUMENTATION or event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
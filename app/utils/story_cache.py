@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from fastapi import Response
+
+# 故事目录缓存的内存上限（字节）
+STORY_CACHE_MAX_BYTES = int(os.getenv("STORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# 条目有效期（秒）；多 worker 部署时其他进程的写入只能靠过期感知
+STORY_CACHE_TTL_SECONDS = float(os.getenv("STORY_CACHE_TTL_SECONDS", "300"))
+
+
+class StoryCatalogCache:
+    """故事、章节、选项视图的序列化结果缓存
+
+    条目记录写入时的版本号，管理员修改任何故事内容都会递增版本号，
+    旧版本的条目随即失效。内存按字节数限制，超出时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, max_bytes: int = STORY_CACHE_MAX_BYTES, ttl: float = STORY_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, expires_at, body = entry
+                if version == self.version and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, body: bytes, version: int):
+        """version 为读取数据前取得的版本号，期间发生写入则不缓存"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, time.monotonic() + self.ttl, body)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, _, body = self._entries.pop(key)
+        self._size -= len(body)
+
+    def bump(self):
+        """故事内容发生变化，使所有缓存失效"""
+        with self._lock:
+            self.version += 1
+            self.invalidations += 1
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+story_cache = StoryCatalogCache()
+
+
+def cached_json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
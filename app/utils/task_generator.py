@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.database import SessionLocal
-from app.models.task_plan import TaskPlan, TaskPlanStatus
+from app.utils.queries import active_task_plans
 from app.routers.task_plan import generate_tasks_from_plan
 import logging
 
@@ -14,7 +14,7 @@ def generate_tasks_for_all_active_plans():
     db = SessionLocal()
     try:
         # 获取所有活跃的任务计划
-        active_plans = db.query(TaskPlan).filter(TaskPlan.status == TaskPlanStatus.ACTIVE).all()
+        active_plans = db.execute(active_task_plans()).scalars().all()
         logger.info(f"找到 {len(active_plans)} 个活跃的任务计划")
         
         for plan in active_plans:
@@ -0,0 +1,120 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# 已验证 JWT 声明缓存容量
+JWT_CLAIM_CACHE_SIZE = int(os.getenv("JWT_CLAIM_CACHE_SIZE", "4096"))
+# 吊销列表布隆过滤器的预期容量与误判率
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+
+
+def token_digest(token: str) -> bytes:
+    """令牌摘要，用作缓存与吊销列表的键，避免在内存中长期保存原始令牌"""
+    return hashlib.sha256(token.encode()).digest()
+
+
+class ClaimCache:
+    """已验证令牌声明的 LRU 缓存，每个条目在令牌自身的 exp 时失效"""
+
+    def __init__(self, max_size: int = JWT_CLAIM_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return claims
+
+    def set(self, digest: bytes, claims: Dict[str, Any]):
+        exp = claims.get("exp")
+        # 没有 exp 的令牌不缓存，始终走完整校验
+        if exp is None or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (float(exp), claims)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest: bytes):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+
+class BloomFilter:
+    """简单的布隆过滤器，使用摘要做双重哈希"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, digest: bytes):
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+class RevocationList:
+    """令牌吊销列表
+
+    布隆过滤器在前，绝大多数未吊销的令牌只需几次位运算即可放行；
+    命中后再查精确集合，条目在令牌过期后清理。
+    """
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked: Dict[bytes, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, digest: bytes, expires_at: float):
+        with self._lock:
+            if len(self._revoked) >= self.capacity:
+                self._rebuild()
+            self._revoked[digest] = expires_at
+            self._bloom.add(digest)
+
+    def is_revoked(self, digest: bytes) -> bool:
+        if digest not in self._bloom:
+            return False
+        with self._lock:
+            expires_at = self._revoked.get(digest)
+            return expires_at is not None and expires_at > time.time()
+
+    def _rebuild(self):
+        # 移除已过期的条目并重建布隆过滤器
+        now = time.time()
+        self._revoked = {digest: exp for digest, exp in self._revoked.items() if exp > now}
+        if len(self._revoked) >= self.capacity:
+            self.capacity *= 2
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        for digest in self._revoked:
+            bloom.add(digest)
+        self._bloom = bloom
+
+
+claim_cache = ClaimCache()
+revocation_list = RevocationList()
@@ -0,0 +1,22 @@
+from typing import Callable, Sequence, Tuple
+
+
+def upsert(dialect_name: str, index_elements: Sequence) -> Tuple[Callable, Callable]:
+    """各数据库的 INSERT ... ON CONFLICT / ON DUPLICATE KEY，返回 (insert 构造函数, 生成冲突更新的函数)
+
+    index_elements 是冲突判断使用的主键或唯一索引列（MySQL 按表上的唯一键判断，不使用该参数）。
+    """
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        def on_conflict(stmt, values):
+            return stmt.on_duplicate_key_update(**values(stmt.inserted))
+    else:
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        def on_conflict(stmt, values):
+            return stmt.on_conflict_do_update(index_elements=list(index_elements), set_=values(stmt.excluded))
+    return insert, on_conflict
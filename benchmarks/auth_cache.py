@@ -0,0 +1,98 @@
+"""认证开销微基准：有无 JWT 声明缓存时每次认证的耗时
+
+在进程内直接调用 _authenticate（与认证依赖走同一段代码），用户快照缓存保持开启，
+只切换声明缓存：off 模式把 claim_cache 的容量设为 0，每次都要解码并校验签名。
+同时单独统计"校验令牌"这一步（jwt.decode 与 claim_cache.get）的耗时。
+
+用法:
+    python -m benchmarks.auth_cache [--iterations 20000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import configure_environment
+
+configure_environment(SESSION_BACKEND="memory")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from app.database import AsyncSessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils.security import ALGORITHM, SECRET_KEY, _authenticate  # noqa: E402
+from app.utils.token_cache import claim_cache, token_digest  # noqa: E402
+
+
+def _login(client: TestClient) -> str:
+    client.post("/users/register", json={
+        "username": "bench", "email": "bench@example.com", "password": "secret1",
+    })
+    response = client.post("/users/token", data={"username": "bench", "password": "secret1"})
+    return response.json()["data"]["access_token"]
+
+
+def _request() -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/tasks/", "headers": [],
+        "query_string": b"", "client": ("127.0.0.1", 50000),
+    })
+
+
+async def _time_authenticate(token: str, iterations: int) -> float:
+    """返回每次认证的平均耗时（微秒）"""
+    async with AsyncSessionLocal() as db:
+        # 预热：填充用户快照缓存（以及开启时的声明缓存）
+        await _authenticate(_request(), token, db)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await _authenticate(_request(), token, db)
+        return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _time_verify(token: str, iterations: int) -> dict:
+    """单独统计令牌校验这一步的耗时（微秒）"""
+    digest = token_digest(token)
+    claim_cache.set(digest, jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]))
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        claim_cache.get(token_digest(token))
+    cached_us = (time.perf_counter() - start) / iterations * 1e6
+    return {"jwt.decode_us": round(decode_us, 2), "claim_cache.get_us": round(cached_us, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5, help="每种模式重复次数，取最小值")
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        token = _login(client)
+
+    print(f"verify  {_time_verify(token, args.iterations)}")
+
+    cache_size = claim_cache.max_size
+    results = {}
+    for mode, size in (("on", cache_size), ("off", 0)):
+        claim_cache.max_size = size
+        claim_cache.discard(token_digest(token))
+        results[mode] = min(
+            asyncio.run(_time_authenticate(token, args.iterations)) for _ in range(args.repeat)
+        )
+    claim_cache.max_size = cache_size
+
+    for mode, per_call in results.items():
+        print(f"claim cache {mode:>3}  _authenticate {per_call:8.2f} us/call")
+    print(f"saved per request: {results['off'] - results['on']:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
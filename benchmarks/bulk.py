@@ -0,0 +1,98 @@
+"""批量增删改基准：/tasks/{create,update,delete}:batch 与 N 次单条接口对比
+
+启动一个 uvicorn 进程（SQLite），每个 N 用两个用户分别执行：
+逐个 POST /tasks/、PUT /tasks/{id}、DELETE /tasks/{id}，
+以及一次 create:batch、update:batch、delete:batch，
+比较各阶段总耗时和 Server-Timing 中的查询数。
+
+用法:
+    python -m benchmarks.bulk [--sizes 50,200]
+"""
+import argparse
+import re
+import time
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import run_server
+
+
+def _queries(response: httpx.Response) -> int:
+    match = re.search(r'desc="(\d+) queries"', response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+def _headers(client: httpx.Client) -> Dict[str, str]:
+    username = f"bench{uuid.uuid4().hex[:8]}"
+    client.post("/users/register", json={"username": username, "email": f"{username}@example.com", "password": "secret1"})
+    token = client.post("/users/token", data={"username": username, "password": "secret1"}).json()["data"]["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    # 预热认证缓存，两种方式都从已缓存用户快照的状态开始计时
+    client.get("/users/me", headers=headers)
+    return headers
+
+
+def _timed(calls: List[Callable[[], httpx.Response]]) -> Tuple[float, int, List[httpx.Response]]:
+    start = time.perf_counter()
+    responses = [call() for call in calls]
+    elapsed = time.perf_counter() - start
+    for response in responses:
+        assert response.status_code < 400, response.text
+    return round(elapsed * 1000, 1), sum(_queries(response) for response in responses), responses
+
+
+def _sequential(client: httpx.Client, count: int) -> Dict[str, Tuple[float, int]]:
+    headers = _headers(client)
+    create = _timed([
+        lambda i=i: client.post("/tasks/", json={"title": f"task {i}", "coins_reward": 1}, headers=headers)
+        for i in range(count)
+    ])
+    ids = [response.json()["data"]["id"] for response in create[2]]
+    update = _timed([
+        lambda task_id=task_id: client.put(f"/tasks/{task_id}", json={"title": "renamed"}, headers=headers)
+        for task_id in ids
+    ])
+    delete = _timed([lambda task_id=task_id: client.delete(f"/tasks/{task_id}", headers=headers) for task_id in ids])
+    return {"create": create[:2], "update": update[:2], "delete": delete[:2]}
+
+
+def _batch(client: httpx.Client, count: int) -> Dict[str, Tuple[float, int]]:
+    headers = _headers(client)
+    create = _timed([lambda: client.post("/tasks/create:batch", json={
+        "items": [{"title": f"task {i}", "coins_reward": 1} for i in range(count)],
+    }, headers=headers)])
+    ids = [result["id"] for result in create[2][0].json()["data"]["results"]]
+    update = _timed([lambda: client.post("/tasks/update:batch", json={
+        "items": [{"id": task_id, "title": "renamed"} for task_id in ids],
+    }, headers=headers)])
+    assert update[2][0].json()["data"]["succeeded"] == count
+    delete = _timed([lambda: client.post("/tasks/delete:batch", json={"ids": ids}, headers=headers)])
+    assert delete[2][0].json()["data"]["succeeded"] == count
+    return {"create": create[:2], "update": update[:2], "delete": delete[:2]}
+
+
+def run(base_url: str, count: int) -> Dict[str, str]:
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        sequential = _sequential(client, count)
+        batch = _batch(client, count)
+    return {
+        operation: f"{sequential[operation][0]} ms ({sequential[operation][1]}) vs "
+                   f"{batch[operation][0]} ms ({batch[operation][1]})"
+        for operation in ("create", "update", "delete")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,200", help="每批的任务数，不超过 BULK_MAX_ITEMS")
+    args = parser.parse_args()
+
+    with run_server({}) as base_url:
+        for count in (int(size) for size in args.sizes.split(",")):
+            print(f"N={count:<4} {run(base_url, count)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""基准测试的公共工具
+
+基准测试使用临时目录中的 SQLite 数据库，不会连接 .env 中配置的数据库。
+进程内的基准需要在导入 app 之前调用 configure_environment()。
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure_environment(**overrides: str) -> str:
+    """把数据库指向新的临时 SQLite 文件并设置基准所需的环境变量，返回临时目录"""
+    tmp_dir = tempfile.mkdtemp(prefix="app-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LEADERBOARD_RECONCILE_SECONDS", "0")
+    os.environ.update(overrides)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return tmp_dir
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """q 分位数（0~100），values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """延迟（秒）的统计摘要，单位毫秒"""
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0) * 1000, 1),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(env: Dict[str, str]) -> Iterator[str]:
+    """在独立进程中启动 uvicorn（使用新的临时数据库），返回服务地址"""
+    tmp_dir = tempfile.mkdtemp(prefix="app-bench-")
+    port = _free_port()
+    server_env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_dir}/bench.db",
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret-key"),
+        "ALGORITHM": os.getenv("ALGORITHM", "HS256"),
+        "LOG_LEVEL": "WARNING",
+        "LEADERBOARD_RECONCILE_SECONDS": "0",
+        **env,
+    }
+    log_path = os.path.join(tmp_dir, "server.log")
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+            cwd=ROOT, env=server_env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            deadline = time.monotonic() + 30
+            while True:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"服务进程启动失败，日志见 {log_path}")
+                try:
+                    httpx.get(base_url + "/", timeout=1)
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
@@ -0,0 +1,83 @@
+"""批量完成任务基准：POST /tasks/complete:batch 与 N 次 POST /tasks/{id}/complete 对比
+
+启动一个 uvicorn 进程（SQLite），每个 N 注册两个用户并各创建 N 个 10 金币的任务，
+一个用户逐个完成，另一个用户一次批量完成，比较总耗时和 Server-Timing 中的查询数，
+并确认两个用户的最终余额相同。
+
+用法:
+    python -m benchmarks.complete_batch [--sizes 10,50,200]
+"""
+import argparse
+import re
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import run_server
+
+REWARD = 10
+
+
+def _queries(response: httpx.Response) -> int:
+    match = re.search(r'desc="(\d+) queries"', response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+def _user(client: httpx.Client, count: int) -> Tuple[Dict[str, str], List[int]]:
+    username = f"bench{uuid.uuid4().hex[:8]}"
+    client.post("/users/register", json={"username": username, "email": f"{username}@example.com", "password": "secret1"})
+    token = client.post("/users/token", data={"username": username, "password": "secret1"}).json()["data"]["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post("/tasks/create:batch", json={
+        "items": [{"title": f"task {i}", "coins_reward": REWARD} for i in range(count)],
+    }, headers=headers)
+    ids = [result["id"] for result in response.json()["data"]["results"]]
+    # 预热认证缓存，两种方式都从已缓存用户快照的状态开始计时
+    client.get("/users/me", headers=headers)
+    return headers, ids
+
+
+def _coins(client: httpx.Client, headers: Dict[str, str]) -> int:
+    return client.get("/users/me", headers=headers).json()["data"]["coins"]
+
+
+def run(base_url: str, count: int) -> Dict[str, float]:
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        headers, ids = _user(client, count)
+        start = time.perf_counter()
+        sequential_queries = 0
+        for task_id in ids:
+            sequential_queries += _queries(client.post(f"/tasks/{task_id}/complete", headers=headers))
+        sequential = time.perf_counter() - start
+        sequential_coins = _coins(client, headers)
+
+        headers, ids = _user(client, count)
+        start = time.perf_counter()
+        response = client.post("/tasks/complete:batch", json={"ids": ids}, headers=headers)
+        batch = time.perf_counter() - start
+        assert response.json()["data"]["completed"] == count, response.text
+        assert _coins(client, headers) == sequential_coins == count * REWARD
+
+    return {
+        "sequential_ms": round(sequential * 1000, 1),
+        "sequential_queries": sequential_queries,
+        "batch_ms": round(batch * 1000, 1),
+        "batch_queries": _queries(response),
+        "speedup": round(sequential / batch, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,50,200", help="每次完成的任务数，不超过 BULK_MAX_ITEMS")
+    args = parser.parse_args()
+
+    with run_server({}) as base_url:
+        for count in (int(size) for size in args.sizes.split(",")):
+            print(f"N={count:<4} {run(base_url, count)}")
+
+
+if __name__ == "__main__":
+    main()
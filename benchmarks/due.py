@@ -0,0 +1,116 @@
+"""到期任务查询基准：按锚点列的单条查询与原先的逐类型查询 + Python 过滤对比
+
+进程内、SQLite。为一个用户写入数千个创建时间分散在过去一年内的任务（一次性、每日、每周、每月），
+其中一部分已完成：
+- due today：原实现的 4 条查询并对每周、每月任务逐个比较 created_at，新实现的 due_tasks 单条查询
+- calendar：原实现需要对区间内每天重复一次 due today，新实现一条查询后由 due_calendar 按天展开
+每个日期都会确认两种实现返回相同的任务 id。
+
+用法:
+    python -m benchmarks.due [--tasks 2000,5000] [--days 31] [--repeat 5]
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from benchmarks.common import configure_environment
+
+configure_environment()
+
+import app.main  # noqa: E402,F401  注册全部模型，ORM 关系才能解析
+from sqlalchemy import select  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.task import RepeatType, Task  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.utils.migrations import ensure_schema  # noqa: E402
+from app.utils.queries import due_tasks  # noqa: E402
+from app.utils.recurrence import due_calendar  # noqa: E402
+
+
+def _seed(db, count: int) -> int:
+    rng = random.Random(count)
+    user = User(username=f"bench{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    now = datetime.now().replace(microsecond=0)
+    types = [RepeatType.NONE, RepeatType.DAILY] + [RepeatType.WEEKLY, RepeatType.MONTHLY] * 4
+    db.add_all([
+        Task(
+            title=f"task {i}", user_id=user.id, repeat_type=repeat_type, is_completed=rng.random() < 0.2,
+            created_at=now - timedelta(days=rng.randrange(365), hours=rng.randrange(24)),
+            due_date=now + timedelta(days=rng.randrange(-30, 90)) if repeat_type == RepeatType.NONE else None,
+        )
+        for i, repeat_type in enumerate(rng.choice(types) for _ in range(count))
+    ])
+    db.commit()
+    return user.id
+
+
+def _old_due_today(db, user_id: int, day: date) -> List[int]:
+    """改为锚点列之前 /tasks/due/today 的实现"""
+    open_tasks = select(Task).where(Task.user_id == user_id, Task.is_completed == False)  # noqa: E712
+    tasks = list(db.execute(open_tasks.where(
+        Task.repeat_type == RepeatType.NONE, Task.due_date >= day, Task.due_date < day + timedelta(days=1),
+    )).scalars())
+    tasks += db.execute(open_tasks.where(Task.repeat_type == RepeatType.DAILY)).scalars()
+    tasks += [
+        task for task in db.execute(open_tasks.where(Task.repeat_type == RepeatType.WEEKLY)).scalars()
+        if task.created_at.weekday() == day.weekday()
+    ]
+    tasks += [
+        task for task in db.execute(open_tasks.where(Task.repeat_type == RepeatType.MONTHLY)).scalars()
+        if task.created_at.day == day.day
+    ]
+    return sorted(task.id for task in tasks)
+
+
+def _time(fn, repeat: int) -> float:
+    """重复 repeat 次，返回最小耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 1)
+
+
+def run(count: int, span: int, repeat: int) -> Dict[str, float]:
+    with SessionLocal() as db:
+        user_id = _seed(db, count)
+        today = datetime.now().date()
+        days = [today + timedelta(days=i) for i in range(span)]
+
+        def new_calendar():
+            return due_calendar(list(db.execute(due_tasks(user_id, days)).scalars()), days)
+
+        # 两种实现对每一天的结果一致
+        for entry in new_calendar():
+            assert entry["task_ids"] == _old_due_today(db, user_id, entry["date"]), entry["date"]
+        due_today = [task.id for task in db.execute(due_tasks(user_id, [today])).scalars()]
+
+        return {
+            "due_today": len(due_today),
+            "today_old_ms": _time(lambda: _old_due_today(db, user_id, today), repeat),
+            "today_new_ms": _time(lambda: list(db.execute(due_tasks(user_id, [today])).scalars()), repeat),
+            "calendar_old_ms": _time(lambda: [_old_due_today(db, user_id, day) for day in days], repeat),
+            "calendar_new_ms": _time(new_calendar, repeat),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", default="2000,5000", help="每个用户的任务数")
+    parser.add_argument("--days", type=int, default=31, help="calendar 的天数，不超过 MAX_DUE_RANGE_DAYS")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    ensure_schema()
+    for count in (int(value) for value in args.tasks.split(",")):
+        print(f"{count:>5} tasks  {run(count, args.days, args.repeat)}")
+
+
+if __name__ == "__main__":
+    main()
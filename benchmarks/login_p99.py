@@ -0,0 +1,96 @@
+"""登录延迟基准：混合流量下的登录 p99
+
+启动一个 uvicorn 进程，一组客户端循环登录，同时另一组客户端循环请求 GET /tasks/（异步路由）
+和 GET /tasks/completions（同步路由，占用线程池），分别统计两类请求的延迟分位数。
+pool 模式使用专用的哈希进程池；thread 模式设置 PASSWORD_HASH_WORKERS=0，在线程池中计算哈希，
+相当于改造前在同步路由里直接调用 bcrypt。
+
+用法:
+    python -m benchmarks.login_p99 [--duration 15] [--logins 8] [--readers 16] [--modes pool,thread]
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.common import run_server, summarize
+
+MODES = {
+    # 单核时 PASSWORD_HASH_WORKERS 默认为 0，pool 模式显式启用进程池
+    "pool": {"PASSWORD_HASH_WORKERS": str(max(1, min(4, os.cpu_count() or 1)))},
+    "thread": {"PASSWORD_HASH_WORKERS": "0"},
+}
+
+
+async def _register(client: httpx.AsyncClient, username: str) -> str:
+    await client.post("/users/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "secret1",
+    })
+    response = await client.post("/users/token", data={"username": username, "password": "secret1"})
+    return response.json()["data"]["access_token"]
+
+
+async def _run(base_url: str, duration: float, logins: int, readers: int) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=logins + readers + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        usernames = [f"login{i}" for i in range(logins)]
+        for username in usernames:
+            await _register(client, username)
+        token = await _register(client, "reader")
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(50):
+            await client.post("/tasks/", json={"title": f"task {i}", "coins_reward": 5}, headers=headers)
+
+        latencies: Dict[str, List[float]] = {"login": [], "read": []}
+        rejected = 0
+        deadline = time.monotonic() + duration
+
+        async def login_loop(username: str):
+            nonlocal rejected
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                response = await client.post("/users/token", data={"username": username, "password": "secret1"})
+                if response.status_code == 503:
+                    rejected += 1
+                    await asyncio.sleep(0.05)
+                    continue
+                latencies["login"].append(time.perf_counter() - start)
+
+        async def read_loop(index: int):
+            path = "/tasks/" if index % 2 else "/tasks/completions"
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                await client.get(path, headers=headers)
+                latencies["read"].append(time.perf_counter() - start)
+
+        await asyncio.gather(
+            *(login_loop(username) for username in usernames),
+            *(read_loop(i) for i in range(readers)),
+        )
+    result = {name: summarize(values) for name, values in latencies.items()}
+    result["login"]["rejected_503"] = rejected
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--logins", type=int, default=8, help="并发登录的客户端数")
+    parser.add_argument("--readers", type=int, default=16, help="并发读请求的客户端数")
+    parser.add_argument("--rounds", default="12", help="bcrypt 成本参数")
+    parser.add_argument("--modes", default="pool,thread")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        env = {**MODES[mode], "BCRYPT_ROUNDS": args.rounds}
+        with run_server(env) as base_url:
+            result = asyncio.run(_run(base_url, args.duration, args.logins, args.readers))
+        print(f"{mode:>6}  login {result['login']}")
+        print(f"{'':>6}  read  {result['read']}")
+
+
+if __name__ == "__main__":
+    main()
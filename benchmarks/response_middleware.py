@@ -0,0 +1,106 @@
+"""ResponseMiddleware 基准
+
+micro: 直接驱动 ASGI 调用，比较下游应用单独运行、经过中间件包装（路由未声明标准格式）
+和经过中间件透传（路由已声明 ResponseModel）三种情况的单次耗时。
+e2e: 用 TestClient 循环请求 GET /tasks/（50 个任务），关闭日志后统计 req/s。
+
+用法:
+    python -m benchmarks.response_middleware [--body-items 100] [--number 20000] [--requests 1000]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import orjson
+
+from benchmarks.common import configure_environment
+
+configure_environment()
+
+from fastapi.routing import APIRoute  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.middleware.response_middleware import ResponseMiddleware  # noqa: E402
+from app.schemas.response import ResponseModel  # noqa: E402
+
+
+def _endpoint():
+    return None
+
+
+def _downstream(body: bytes):
+    async def asgi(scope, receive, send):
+        await send({
+            "type": "http.response.start", "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+    return asgi
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message):
+    pass
+
+
+async def _time_asgi(asgi, route, number: int) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    scope = {"type": "http", "method": "GET", "path": "/bench", "headers": [], "route": route}
+    start = time.perf_counter()
+    for _ in range(number):
+        await asgi(dict(scope), _receive, _send)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def micro(body_items: int, number: int):
+    body = orjson.dumps([{"id": i, "title": f"task {i}", "coins_reward": 5} for i in range(body_items)])
+    downstream = _downstream(body)
+    middleware = ResponseMiddleware(downstream)
+    plain_route = APIRoute("/bench", _endpoint)
+    enveloped_route = APIRoute("/bench", _endpoint, response_model=ResponseModel)
+    cases = {
+        "no middleware": (downstream, plain_route),
+        "wrap": (middleware, plain_route),
+        "passthrough": (middleware, enveloped_route),
+    }
+    for name, (asgi, route) in cases.items():
+        per_call = asyncio.run(_time_asgi(asgi, route, number))
+        print(f"micro {name:>14}  {per_call:7.2f} us/response  ({len(body)} byte body)")
+
+
+def e2e(requests: int):
+    logging.disable(logging.CRITICAL)
+    with TestClient(app) as client:
+        client.post("/users/register", json={"username": "bench", "email": "bench@example.com", "password": "secret1"})
+        token = client.post("/users/token", data={"username": "bench", "password": "secret1"}).json()["data"]["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(50):
+            client.post("/tasks/", json={"title": f"task {i}", "coins_reward": 5}, headers=headers)
+        for _ in range(50):
+            client.get("/tasks/", headers=headers)
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get("/tasks/", headers=headers)
+        elapsed = time.perf_counter() - start
+    print(f"e2e   GET /tasks/ (50 tasks)  {requests / elapsed:.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--body-items", type=int, default=100, help="micro 中响应体的元素个数")
+    parser.add_argument("--number", type=int, default=20000, help="micro 每种情况的调用次数")
+    parser.add_argument("--requests", type=int, default=1000, help="e2e 的请求数，0 表示跳过")
+    args = parser.parse_args()
+
+    micro(args.body_items, args.number)
+    if args.requests:
+        e2e(args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""响应序列化基准：FastAPI 默认路径与 envelope_response/page_response 对比
+
+baseline 模拟路由返回 {"code", "msg", "data": ORM 列表} 时 FastAPI 的处理：按 response_model
+校验（serialize_response，含 jsonable_encoder），再由 ORJSONResponse 输出。
+envelope 使用 app.utils.response.page_response：ORM 对象只校验一次，由 pydantic-core 直接输出 JSON。
+
+用法:
+    python -m benchmarks.serialization [--sizes 10,100,1000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+
+from benchmarks.common import configure_environment
+
+configure_environment()
+
+from fastapi.responses import ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+import app.main  # noqa: E402,F401  注册全部模型，ORM 关系才能解析
+from app.models.task import RepeatType, Task as TaskModel  # noqa: E402
+from app.schemas.response import PageResponse  # noqa: E402
+from app.schemas.task import Task as TaskSchema  # noqa: E402
+from app.utils.response import page_response  # noqa: E402
+
+
+def _tasks(count: int) -> List[TaskModel]:
+    now = datetime(2026, 1, 1, 8, 0, 0)
+    return [
+        TaskModel(
+            id=i + 1, title=f"task {i}", description="x" * 200, user_id=1, is_completed=bool(i % 2),
+            repeat_type=RepeatType.DAILY, coins_reward=5, due_date=now + timedelta(days=i),
+            created_at=now, updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def _time(fn, repeat: int, number: int) -> float:
+    """重复 repeat 轮、每轮调用 number 次，返回单次调用的最小耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000", help="每个响应的任务数")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    field = create_response_field(name="response", type_=PageResponse[List[TaskSchema]])
+    loop = asyncio.new_event_loop()
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        tasks = _tasks(size)
+        content = {"code": 200, "msg": "", "data": tasks, "next_cursor": None}
+
+        def baseline():
+            data = loop.run_until_complete(serialize_response(field=field, response_content=content))
+            return ORJSONResponse(data).body
+
+        def envelope():
+            return page_response(tasks, List[TaskSchema], None).body
+
+        assert orjson.loads(envelope()) == orjson.loads(baseline())
+        number = max(1, 2000 // size)
+        before = _time(baseline, args.repeat, number)
+        after = _time(envelope, args.repeat, number)
+        print(f"{size:>5} rows  baseline {before:8.3f} ms  envelope {after:8.3f} ms  speedup {before / after:4.2f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
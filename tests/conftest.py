@@ -0,0 +1,146 @@
+"""测试公共配置
+
+app 的配置在导入时从环境变量读取，这里在导入 app 之前把数据库指向临时目录中的 SQLite 文件。
+需要多个 worker 的测试用 live_server 启动独立的 uvicorn 进程，它们共享同一个数据库文件。
+"""
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="app-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/test.db"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+# 测试中使用最低的 bcrypt 成本，注册和登录不会拖慢测试
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["LEADERBOARD_RECONCILE_SECONDS"] = "0"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption("--runslow", action="store_true", default=False, help="运行标记为 slow 的测试")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--runslow") or os.getenv("RUN_SLOW_TESTS") == "1":
+        return
+    skip_slow = pytest.mark.skip(reason="需要 --runslow 或 RUN_SLOW_TESTS=1")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def register(client, coins: int = 0, password: str = "secret1"):
+    """注册一个新用户并登录，返回 (用户数据, 认证请求头)"""
+    username = f"u{uuid.uuid4().hex[:12]}"
+    response = client.post("/users/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": password,
+        "coins": coins,
+    })
+    assert response.status_code == 200, response.text
+    user = response.json()["data"]
+    response = client.post("/users/token", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return user, {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+
+def sql_queries(response) -> int:
+    """响应 Server-Timing 头中记录的 SQL 语句数"""
+    match = re.fullmatch(r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers["server-timing"])
+    assert match, response.headers["server-timing"]
+    return int(match.group(1))
+
+
+@contextmanager
+def as_admin(client):
+    """在 with 块内以管理员（id 为 1 的用户）身份调用路由，请求不需要认证头"""
+    from app.utils.security import get_current_active_user, get_current_active_user_async
+
+    admin = SimpleNamespace(id=1, username="admin", is_active=True)
+    overrides = client.app.dependency_overrides
+    overrides[get_current_active_user] = overrides[get_current_active_user_async] = lambda: admin
+    try:
+        yield
+    finally:
+        overrides.pop(get_current_active_user, None)
+        overrides.pop(get_current_active_user_async, None)
+
+
+@pytest.fixture
+def user(client):
+    return register(client)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def live_server():
+    """启动独立的 uvicorn 进程，模拟多 worker 部署
+
+    返回 start(**env)，每次调用启动一个进程并返回其地址；环境变量在当前测试环境的基础上覆盖。
+    start.pids 记录每个地址对应的进程号。
+    """
+    processes = []
+
+    def start(**env) -> str:
+        port = _free_port()
+        log = open(os.path.join(TMP_DIR, f"server-{port}.log"), "wb")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+            cwd=ROOT,
+            env={**os.environ, **env},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        processes.append((process, log))
+        base_url = f"http://127.0.0.1:{port}"
+        start.pids[base_url] = process.pid
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"服务进程退出，日志见 {log.name}")
+            try:
+                httpx.get(base_url + "/", timeout=1)
+                return base_url
+            except httpx.TransportError:
+                time.sleep(0.1)
+        raise RuntimeError(f"服务进程启动超时，日志见 {log.name}")
+
+    start.pids = {}
+    yield start
+
+    for process, log in processes:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
@@ -0,0 +1,58 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import access_log
+from app.middleware.access_log import AccessLogBodyMiddleware, AccessLogMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.utils.compression import compressible
+from app.utils.logging_config import ACCESS_LOGGER_NAME, RateLimitFilter
+
+
+def _record(name: str) -> logging.LogRecord:
+    return logging.LogRecord(name, logging.INFO, __file__, 0, "msg", None, None)
+
+
+def test_rate_limit_does_not_drop_access_log():
+    rate_limit = RateLimitFilter(rate=1, burst=2)
+    assert all(rate_limit.filter(_record(ACCESS_LOGGER_NAME)) for _ in range(50))
+    assert sum(rate_limit.filter(_record("app.other")) for _ in range(50)) == 2
+
+
+def _app() -> FastAPI:
+    api = FastAPI()
+
+    @api.get("/big")
+    @compressible
+    def big():
+        return {"items": ["x" * 50] * 100}
+
+    # 与 app.main 相同的顺序：访问日志在最外层，响应体记录在压缩层内侧
+    api.add_middleware(AccessLogBodyMiddleware)
+    api.add_middleware(CompressionMiddleware)
+    api.add_middleware(AccessLogMiddleware)
+    return api
+
+
+def test_sampled_response_body_is_logged_before_compression(monkeypatch, caplog):
+    monkeypatch.setattr(access_log, "LOG_BODY_SAMPLE_RATE", 1.0)
+    caplog.set_level(logging.INFO, logger=ACCESS_LOGGER_NAME)
+
+    with TestClient(_app()) as client:
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+    [record] = [record for record in caplog.records if record.name == ACCESS_LOGGER_NAME]
+    assert record.fields["status"] == 200
+    assert record.fields["response_body"].startswith('{"items":["xxx')
+
+
+def test_access_log_sample_rate_keeps_errors(monkeypatch, caplog):
+    monkeypatch.setattr(access_log, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    caplog.set_level(logging.INFO, logger=ACCESS_LOGGER_NAME)
+
+    with TestClient(_app()) as client:
+        client.get("/big")
+        client.get("/missing")
+    assert [record.fields["status"] for record in caplog.records if record.name == ACCESS_LOGGER_NAME] == [404]
@@ -0,0 +1,136 @@
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from conftest import TMP_DIR, register
+from app.database import Base, SessionLocal
+from app.models.task import Task
+from app.models.user import User
+from app.utils.bulk import BULK_MAX_ITEMS, insert_rows
+
+
+def _batch(client, headers, path, **body):
+    response = client.post(path, json=body, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def _statuses(data):
+    return [(result["index"], result["status"]) for result in data["results"]]
+
+
+def test_create_batch_reports_invalid_items_and_keeps_valid_ones(client):
+    _, headers = register(client)
+    data = _batch(client, headers, "/tasks/create:batch", items=[
+        {"title": "a", "coins_reward": 1},
+        {"title": "bad", "coins_reward": -1},
+        "not an object",
+        {"title": "b"},
+    ])
+    assert _statuses(data) == [(0, "created"), (1, "invalid"), (2, "invalid"), (3, "created")]
+    assert (data["succeeded"], data["failed"]) == (2, 2)
+    assert data["results"][1]["errors"][0]["loc"] == "coins_reward"
+
+    ids = [data["results"][0]["id"], data["results"][3]["id"]]
+    titles = [client.get(f"/tasks/{task_id}", headers=headers).json()["data"]["title"] for task_id in ids]
+    assert titles == ["a", "b"]
+
+
+def test_update_batch_statuses(client):
+    _, headers = register(client)
+    _, other_headers = register(client)
+    created = _batch(client, headers, "/tasks/create:batch", items=[{"title": "a"}, {"title": "b"}])
+    first, second = (result["id"] for result in created["results"])
+    foreign = client.post("/tasks/", json={"title": "theirs"}, headers=other_headers).json()["data"]["id"]
+    before = client.get(f"/tasks/{first}", headers=headers).json()["data"]
+
+    data = _batch(client, headers, "/tasks/update:batch", items=[
+        {"id": first, "title": "renamed", "coins_reward": 3},
+        {"id": first, "title": "again"},
+        {"id": second},
+        {"id": foreign, "title": "stolen"},
+        {"id": first, "coins_reward": -5},
+        {"title": "no id"},
+    ])
+    assert _statuses(data) == [
+        (0, "updated"), (1, "invalid"), (2, "unchanged"), (3, "not_found"), (4, "invalid"), (5, "invalid"),
+    ]
+    assert data["results"][1]["errors"] == [{"loc": "id", "msg": "Duplicate id"}]
+    assert (data["succeeded"], data["failed"]) == (2, 4)
+
+    after = client.get(f"/tasks/{first}", headers=headers).json()["data"]
+    assert (after["title"], after["coins_reward"]) == ("renamed", 3)
+    assert after["updated_at"] != before["updated_at"]
+    assert client.get(f"/tasks/{foreign}", headers=other_headers).json()["data"]["title"] == "theirs"
+
+
+def test_delete_batch_removes_completions(client):
+    _, headers = register(client)
+    created = _batch(client, headers, "/tasks/create:batch", items=[{"title": "a", "coins_reward": 1}, {"title": "b"}])
+    first, second = (result["id"] for result in created["results"])
+    client.post(f"/tasks/{first}/complete", headers=headers)
+
+    data = _batch(client, headers, "/tasks/delete:batch", ids=[first, first, 10 ** 9])
+    assert [(result["id"], result["status"]) for result in data["results"]] == [(first, "deleted"), (10 ** 9, "not_found")]
+    assert client.get(f"/tasks/{first}", headers=headers).status_code == 404
+    assert client.get("/tasks/completions", headers=headers).json()["data"] == []
+    assert client.get(f"/tasks/{second}", headers=headers).status_code == 200
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/tasks/create:batch", {"items": [{"title": "t"}] * (BULK_MAX_ITEMS + 1)}),
+    ("/tasks/update:batch", {"items": [{"id": 1}] * (BULK_MAX_ITEMS + 1)}),
+    ("/tasks/delete:batch", {"ids": list(range(1, BULK_MAX_ITEMS + 2))}),
+    ("/task-plans/create:batch", {"items": [{"title": "p"}] * (BULK_MAX_ITEMS + 1)}),
+    ("/task-plans/delete:batch", {"ids": list(range(1, BULK_MAX_ITEMS + 2))}),
+])
+def test_batch_size_is_capped(client, path, body):
+    _, headers = register(client)
+    response = client.post(path, json=body, headers=headers)
+    assert response.status_code == 400
+    assert str(BULK_MAX_ITEMS) in response.json()["msg"]
+
+
+def test_plan_batch_create_update_and_delete_keeps_tasks(client):
+    _, headers = register(client)
+    created = _batch(client, headers, "/task-plans/create:batch", items=[
+        {"title": "daily", "repeat_type": "daily", "coins_reward": 2},
+        {"title": "bad", "coins_reward": -1},
+    ])
+    assert _statuses(created) == [(0, "created"), (1, "invalid")]
+    plan_id, task_id = created["results"][0]["id"], created["results"][0]["initial_task_id"]
+    task = client.get(f"/tasks/{task_id}", headers=headers).json()["data"]
+    assert (task["title"], task["repeat_type"], task["coins_reward"]) == ("daily", "daily", 2)
+
+    updated = _batch(client, headers, "/task-plans/update:batch", items=[{"id": plan_id, "status": "paused"}])
+    assert _statuses(updated) == [(0, "updated")]
+    assert client.get(f"/task-plans/{plan_id}", headers=headers).json()["data"]["status"] == "paused"
+
+    deleted = _batch(client, headers, "/task-plans/delete:batch", ids=[plan_id])
+    assert _statuses(deleted) == [(0, "deleted")]
+    assert client.get(f"/task-plans/{plan_id}", headers=headers).status_code == 404
+    # 计划生成的任务保留，只解除与计划的关联
+    assert client.get(f"/tasks/{task_id}", headers=headers).status_code == 200
+    with SessionLocal() as db:
+        assert db.execute(select(Task.task_plan_id).where(Task.id == task_id)).scalar_one() is None
+
+
+def test_insert_rows_falls_back_to_orm_flush_without_returning():
+    engine = create_engine(f"sqlite:///{os.path.join(TMP_DIR, f'bulk-{uuid.uuid4().hex}.db')}")
+    Base.metadata.create_all(engine)
+    # 模拟 MySQL：不支持 INSERT ... RETURNING，ORM 逐行使用 lastrowid
+    engine.dialect.insert_returning = False
+    engine.dialect.insert_executemany_returning = False
+    engine.dialect.insert_executemany_returning_sort_by_parameter_order = False
+
+    with Session(engine) as db:
+        user = User(username="bulk", email="bulk@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        ids = insert_rows(db, Task, [{"title": title, "user_id": user.id} for title in ("a", "b", "c")])
+        db.commit()
+        rows = db.execute(select(Task.id, Task.title).order_by(Task.id)).all()
+    assert [tuple(row) for row in rows] == list(zip(ids, ("a", "b", "c")))
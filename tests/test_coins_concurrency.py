@@ -0,0 +1,64 @@
+import os
+import threading
+import uuid
+from collections import Counter
+
+import httpx
+
+# 并发线程数和每个线程的轮数，每轮依次执行加币、扣币、完成任务、取消完成
+STRESS_THREADS = int(os.getenv("STRESS_THREADS", "8"))
+STRESS_ROUNDS = int(os.getenv("STRESS_ROUNDS", "10"))
+REWARD = 10
+
+
+def test_concurrent_coin_writes_lose_no_updates(live_server):
+    base_url = live_server()
+    username = f"u{uuid.uuid4().hex[:12]}"
+    # 初始余额足够大，扣币和取消完成都不会触发"最多扣到 0"
+    httpx.post(f"{base_url}/users/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "secret1", "coins": 10000,
+    })
+    response = httpx.post(f"{base_url}/users/token", data={"username": username, "password": "secret1"})
+    headers = {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+    user = httpx.get(f"{base_url}/users/me", headers=headers).json()["data"]
+    task = httpx.post(f"{base_url}/tasks/", json={"title": "stress", "coins_reward": REWARD}, headers=headers).json()["data"]
+
+    operations = (
+        ("add", f"/users/{user['id']}/coins/add", {"amount": 1}),
+        ("deduct", f"/users/{user['id']}/coins/deduct", {"amount": 1}),
+        ("complete", f"/tasks/{task['id']}/complete", None),
+        ("uncomplete", f"/tasks/{task['id']}/uncomplete", None),
+    )
+    applied = Counter()
+    server_errors = []
+    lock = threading.Lock()
+
+    def worker():
+        with httpx.Client(base_url=base_url, headers=headers, timeout=60) as client:
+            for _ in range(STRESS_ROUNDS):
+                for name, path, body in operations:
+                    response = client.post(path, json=body)
+                    with lock:
+                        if response.status_code == 200:
+                            applied[name] += 1
+                        elif response.status_code >= 500:
+                            server_errors.append((name, response.text))
+
+    threads = [threading.Thread(target=worker) for _ in range(STRESS_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server_errors == []
+    # 完成和取消完成中有一部分因任务状态不符被拒绝，只统计实际生效的操作
+    assert applied["add"] == applied["deduct"] == STRESS_THREADS * STRESS_ROUNDS
+    assert applied["complete"] > 0
+    expected = (
+        10000 + applied["add"] - applied["deduct"] + REWARD * (applied["complete"] - applied["uncomplete"])
+    )
+    coins = httpx.get(f"{base_url}/users/me", headers=headers).json()["data"]["coins"]
+    assert coins == expected, dict(applied)
+
+    completions = httpx.get(f"{base_url}/tasks/{task['id']}/completions", params={"limit": 1000}, headers=headers)
+    assert len(completions.json()["data"]) == applied["complete"] - applied["uncomplete"]
@@ -0,0 +1,66 @@
+from conftest import as_admin, register
+from app.routers.task import STORY_UNLOCK_COINS
+from app.utils.bulk import BULK_MAX_ITEMS
+
+
+def _task(client, headers, reward) -> int:
+    return client.post("/tasks/", json={"title": f"reward {reward}", "coins_reward": reward}, headers=headers).json()["data"]["id"]
+
+
+def _complete(client, headers, ids):
+    response = client.post("/tasks/complete:batch", json={"ids": ids}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def test_batch_reports_each_task_and_sums_coins(client):
+    with as_admin(client):
+        client.post("/stories/", json={"title": "unlocked by batch", "unlock_cost": 0})
+    _, headers = register(client, coins=STORY_UNLOCK_COINS - 20)
+    _, other_headers = register(client)
+
+    done = _task(client, headers, 5)
+    client.post(f"/tasks/{done}/complete", headers=headers)
+    first, second = _task(client, headers, 10), _task(client, headers, 20)
+    foreign = _task(client, other_headers, 50)
+
+    data = _complete(client, headers, [first, first, done, 10 ** 9, foreign, second])
+
+    # 重复的 id 只处理一次；不存在和属于其他用户的任务都是 not_found
+    assert [(result["index"], result["id"], result["status"], result["coins_earned"]) for result in data["results"]] == [
+        (0, first, "completed", 10),
+        (1, done, "already_completed", 0),
+        (2, 10 ** 9, "not_found", 0),
+        (3, foreign, "not_found", 0),
+        (4, second, "completed", 20),
+    ]
+    assert (data["completed"], data["coins_earned"], data["total_coins"]) == (2, 30, STORY_UNLOCK_COINS + 15)
+    # 余额只按最终结果判断一次是否越过解锁门槛
+    assert data["unlocked_story"] is not None
+    assert len(client.get("/stories/my", headers=headers).json()["data"]) == 1
+
+    completions = client.get(f"/tasks/{first}/completions", headers=headers).json()["data"]
+    assert [completion["coins_earned"] for completion in completions] == [10]
+    stats = client.get("/tasks/stats", params={"days": 1}, headers=headers).json()["data"]
+    assert (stats["total_completions"], stats["total_coins"]) == (3, 35)
+
+    # 再次提交同一批任务：没有新的完成记录、金币和解锁
+    again = _complete(client, headers, [first, second])
+    assert [result["status"] for result in again["results"]] == ["already_completed", "already_completed"]
+    assert (again["completed"], again["coins_earned"], again["unlocked_story"]) == (0, 0, None)
+    assert client.get("/users/me", headers=headers).json()["data"]["coins"] == STORY_UNLOCK_COINS + 15
+    assert len(client.get("/stories/my", headers=headers).json()["data"]) == 1
+
+
+def test_batch_above_threshold_does_not_unlock(client):
+    _, headers = register(client, coins=STORY_UNLOCK_COINS)
+    data = _complete(client, headers, [_task(client, headers, 10)])
+    assert (data["completed"], data["total_coins"], data["unlocked_story"]) == (1, STORY_UNLOCK_COINS + 10, None)
+
+
+def test_batch_size_is_capped(client):
+    _, headers = register(client)
+    response = client.post("/tasks/complete:batch", json={"ids": list(range(1, BULK_MAX_ITEMS + 2))}, headers=headers)
+    assert response.status_code == 400
+    # 请求体字段与其他批量接口一致
+    assert client.post("/tasks/complete:batch", json={"task_ids": [1]}, headers=headers).status_code == 422
@@ -0,0 +1,52 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware
+from app.utils import compression
+from app.utils.compression import compressible
+
+
+def _client(monkeypatch, threads: list) -> TestClient:
+    compress = compression.compression_cache.compress
+
+    def recording_compress(body, encoding):
+        threads.append(threading.current_thread())
+        return compress(body, encoding)
+
+    monkeypatch.setattr(compression.compression_cache, "compress", recording_compress)
+
+    api = FastAPI()
+
+    @api.get("/items/{count}")
+    @compressible
+    def items(count: int):
+        return {"items": ["x" * 100] * count}
+
+    api.add_middleware(CompressionMiddleware, minimum_size=1024, thread_min_size=32 * 1024)
+    return TestClient(api)
+
+
+def test_large_bodies_are_compressed_off_the_event_loop(monkeypatch):
+    threads = []
+    with _client(monkeypatch, threads) as client:
+        loop_thread = client.portal.call(threading.current_thread)
+        small = client.get("/items/20", headers={"Accept-Encoding": "gzip"})
+        large = client.get("/items/1000", headers={"Accept-Encoding": "gzip"})
+
+    for response in (small, large):
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["items"][0] == "x" * 100
+    assert len(large.json()["items"]) == 1000
+    # 小响应在事件循环线程上压缩，大响应交给线程池
+    assert threads[0] is loop_thread
+    assert threads[1] is not loop_thread
+
+
+def test_small_bodies_are_not_compressed(monkeypatch):
+    threads = []
+    with _client(monkeypatch, threads) as client:
+        response = client.get("/items/1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert threads == []
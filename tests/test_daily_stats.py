@@ -0,0 +1,43 @@
+from conftest import register
+from app.utils.daily_stats import backfill
+
+
+def _totals(client, headers):
+    data = client.get("/tasks/stats", params={"days": 1}, headers=headers).json()["data"]
+    return data["total_completions"], data["total_coins"]
+
+
+def _coins(client, headers) -> int:
+    return client.get("/users/me", headers=headers).json()["data"]["coins"]
+
+
+def test_uncomplete_floored_at_zero_keeps_unreclaimed_coins(client):
+    profile, headers = register(client)
+    task = client.post("/tasks/", json={"title": "t", "coins_reward": 10}, headers=headers).json()["data"]
+    client.post(f"/tasks/{task['id']}/complete", headers=headers)
+    client.post(f"/users/{profile['id']}/coins/deduct", json={"amount": 7}, headers=headers)
+    assert _coins(client, headers) == 3
+
+    client.post(f"/tasks/{task['id']}/uncomplete", headers=headers)
+    # 只扣回了 3 个金币，统计中保留没能扣回的 7 个
+    assert _coins(client, headers) == 0
+    assert _totals(client, headers) == (0, 7)
+
+    backfill()
+    assert _totals(client, headers) == (0, 7)
+
+
+def test_completion_keeps_the_reward_it_paid(client):
+    _, headers = register(client)
+    task = client.post("/tasks/", json={"title": "t", "coins_reward": 10}, headers=headers).json()["data"]
+    client.post(f"/tasks/{task['id']}/complete", headers=headers)
+    completions = client.get(f"/tasks/{task['id']}/completions", headers=headers).json()["data"]
+    assert [completion["coins_earned"] for completion in completions] == [10]
+
+    client.put(f"/tasks/{task['id']}", json={"coins_reward": 50}, headers=headers)
+    backfill()
+    assert _totals(client, headers) == (1, 10)
+
+    client.post(f"/tasks/{task['id']}/uncomplete", headers=headers)
+    assert _coins(client, headers) == 0
+    assert _totals(client, headers) == (0, 0)
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import uuid
+from types import SimpleNamespace
+
+import httpx
+from sqlalchemy import column, create_engine, insert, select, table
+
+from conftest import TMP_DIR
+from app.utils.db_routing import ReplicaSet, RoutingSession, wrote_recently
+
+SOURCE = table("source", column("name"))
+
+
+def _database(name: str) -> str:
+    """创建一个只有一行 source(name) 的 SQLite 文件，name 用来区分查询落在哪个库"""
+    path = os.path.join(TMP_DIR, f"{name}-{uuid.uuid4().hex}.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE source (name TEXT)")
+        conn.execute("INSERT INTO source VALUES (?)", (name,))
+    return path
+
+
+def _session(replica_url: str, read_only: bool = True, **info) -> RoutingSession:
+    primary = create_engine(f"sqlite:///{_database('primary')}")
+    replica_set = ReplicaSet([create_engine(replica_url)], retry_seconds=60)
+    session = RoutingSession(bind=primary, replica_set=replica_set)
+    session.info.update(read_only=read_only, **info)
+    return session
+
+
+def _read(session: RoutingSession) -> str:
+    # ORM 层的 SELECT 才会经过 get_bind 的路由判断
+    return session.execute(select(SOURCE.c.name).limit(1)).scalar_one()
+
+
+def test_reads_go_to_replica_until_the_session_writes():
+    replica_url = f"sqlite:///{_database('replica')}"
+    with _session(replica_url) as session:
+        assert _read(session) == "replica"
+        session.execute(insert(SOURCE).values(name="written"))
+        assert _read(session) == "primary"
+
+    with _session(replica_url, read_only=False) as session:
+        assert _read(session) == "primary"
+
+
+def test_commit_records_write_time_on_request_state():
+    state = SimpleNamespace()
+    with _session(f"sqlite:///{_database('replica')}", request_state=state) as session:
+        session.execute(insert(SOURCE).values(name="written"))
+        session.commit()
+    assert wrote_recently(f"{state.last_write:.3f}")
+    assert not wrote_recently(f"{state.last_write - 3600:.3f}")
+    assert not wrote_recently("not-a-timestamp")
+
+
+def test_probe_marks_replica_down_and_up():
+    missing_dir = os.path.join(TMP_DIR, f"replica-{uuid.uuid4().hex}")
+    replica_url = f"sqlite:///{missing_dir}/replica.db"
+    with _session(replica_url) as session:
+        replica_set = session.replica_set
+        assert replica_set.probe() == [False]
+        assert replica_set.choose() is None
+        # 从库不可用时读请求回退到主库
+        assert _read(session) == "primary"
+
+        os.makedirs(missing_dir)
+        with sqlite3.connect(os.path.join(missing_dir, "replica.db")) as conn:
+            conn.execute("CREATE TABLE source (name TEXT)")
+            conn.execute("INSERT INTO source VALUES ('replica')")
+        # 探测成功后无需等待冷却期即可重新使用
+        assert replica_set.probe() == [True]
+        session.rollback()
+        assert _read(session) == "replica"
+
+
+def _snapshot(primary: str, replica: str):
+    """把主库当前内容复制到从库，模拟之后不再同步的延迟从库"""
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+
+
+def test_write_on_one_worker_reads_from_primary_on_another(live_server):
+    primary = os.path.join(TMP_DIR, f"routing-primary-{uuid.uuid4().hex}.db")
+    replica = os.path.join(TMP_DIR, f"routing-replica-{uuid.uuid4().hex}.db")
+    env = {
+        "DATABASE_URL": f"sqlite:///{primary}",
+        "DATABASE_REPLICA_URLS": f"sqlite:///{replica}",
+        "SESSION_BACKEND": "sqlite",
+        "SESSION_DB_PATH": os.path.join(TMP_DIR, f"routing-sessions-{uuid.uuid4().hex}.db"),
+    }
+    worker_a = live_server(**env)
+
+    username = f"u{uuid.uuid4().hex[:12]}"
+    response = httpx.post(f"{worker_a}/users/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "secret1",
+    })
+    assert response.status_code == 200, response.text
+    response = httpx.post(f"{worker_a}/users/token", data={"username": username, "password": "secret1"})
+    headers = {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+    _snapshot(primary, replica)
+    worker_b = live_server(**env)
+
+    response = httpx.post(f"{worker_a}/tasks/", json={"title": "fresh"}, headers=headers)
+    assert response.status_code == 200, response.text
+    last_write = response.cookies.get("last_write")
+    assert last_write is not None
+
+    def titles(cookies=None):
+        response = httpx.get(f"{worker_b}/tasks/", headers=headers, cookies=cookies)
+        assert response.status_code == 200, response.text
+        return [task["title"] for task in response.json()["data"]]
+
+    # 没有写入标记时 B 从延迟的从库读取，看不到刚创建的任务
+    assert titles() == []
+    # 带上 A 写入的 Cookie 后，B 在窗口期内读主库
+    assert titles({"last_write": last_write}) == ["fresh"]
@@ -0,0 +1,91 @@
+import random
+from datetime import date, datetime, timedelta
+
+from conftest import register, sql_queries
+from app.database import SessionLocal
+from app.models.task import RepeatType, Task
+from app.utils.recurrence import MAX_DUE_RANGE_DAYS
+
+
+def _old_due_ids(tasks, day):
+    """改为锚点列之前 /tasks/due/today 的判断：每周、每月任务按 created_at 逐个在 Python 中过滤"""
+    due = []
+    for task in tasks:
+        if task.is_completed:
+            continue
+        if task.repeat_type == RepeatType.NONE:
+            matched = task.due_date is not None and task.due_date.date() == day
+        elif task.repeat_type == RepeatType.DAILY:
+            matched = True
+        elif task.repeat_type == RepeatType.WEEKLY:
+            matched = task.created_at.weekday() == day.weekday()
+        else:
+            matched = task.created_at.day == day.day
+        if matched:
+            due.append(task.id)
+    return sorted(due)
+
+
+def _seed(user_id, count=300, seed=23):
+    """创建时间分散在过去 70 天内的各类任务，锚点由列默认值按 created_at 填写"""
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    with SessionLocal() as db:
+        tasks = []
+        for i in range(count):
+            created_at = now - timedelta(days=rng.randrange(70), hours=rng.randrange(24))
+            repeat_type = rng.choice(list(RepeatType))
+            due_date = None
+            if repeat_type == RepeatType.NONE and rng.random() < 0.8:
+                due_date = now + timedelta(days=rng.randrange(-5, 45), hours=rng.randrange(24))
+            tasks.append(Task(
+                title=f"task {i}", user_id=user_id, repeat_type=repeat_type, due_date=due_date,
+                created_at=created_at, is_completed=rng.random() < 0.2,
+            ))
+        db.add_all(tasks)
+        db.commit()
+        return db.query(Task).filter(Task.user_id == user_id).all()
+
+
+def test_due_matches_old_python_filter(client):
+    user, headers = register(client)
+    tasks = _seed(user["id"])
+    weekly = [task for task in tasks if task.repeat_type == RepeatType.WEEKLY]
+    monthly = [task for task in tasks if task.repeat_type == RepeatType.MONTHLY]
+    assert {task.created_at.weekday() for task in weekly} == set(range(7))
+    assert len({task.created_at.day for task in monthly}) > 20
+    assert all(task.repeat_weekday == task.created_at.weekday() for task in weekly)
+    assert all(task.repeat_monthday == task.created_at.day for task in monthly)
+
+    today = datetime.now().date()
+    response = client.get("/tasks/due/today", headers=headers)
+    assert response.status_code == 200, response.text
+    assert [task["id"] for task in response.json()["data"]] == _old_due_ids(tasks, today)
+
+    start, end = today, today + timedelta(days=MAX_DUE_RANGE_DAYS - 1)
+    response = client.get("/tasks/due", params={"from": str(start), "to": str(end)}, headers=headers)
+    assert response.status_code == 200, response.text
+    # 整个区间只用一条查询
+    assert sql_queries(response) == 1
+    data = response.json()["data"]
+    assert [day["date"] for day in data["days"]] == [str(start + timedelta(days=i)) for i in range(MAX_DUE_RANGE_DAYS)]
+    expected = {day["date"]: _old_due_ids(tasks, date.fromisoformat(day["date"])) for day in data["days"]}
+    assert {day["date"]: day["task_ids"] for day in data["days"]} == expected
+    # 每个任务只返回一次
+    returned = [task["id"] for task in data["tasks"]]
+    assert returned == sorted(set().union(*expected.values()))
+
+
+def test_due_range_is_validated(client):
+    _, headers = register(client)
+    today = date.today()
+
+    def due(start, end):
+        return client.get("/tasks/due", params={"from": str(start), "to": str(end)}, headers=headers)
+
+    assert due(today, today).status_code == 200
+    assert due(today, today + timedelta(days=MAX_DUE_RANGE_DAYS - 1)).status_code == 200
+    too_large = due(today, today + timedelta(days=MAX_DUE_RANGE_DAYS))
+    assert too_large.status_code == 400
+    assert str(MAX_DUE_RANGE_DAYS) in too_large.json()["msg"]
+    assert due(today, today - timedelta(days=1)).status_code == 400
@@ -0,0 +1,34 @@
+from conftest import register
+
+
+def test_tasks_etag_changes_when_deleted_id_is_reused(client):
+    _, headers = register(client)
+    client.post("/tasks/", json={"title": "keep"}, headers=headers)
+    last = client.post("/tasks/", json={"title": "old"}, headers=headers).json()["data"]
+
+    etag = client.get("/tasks/", headers=headers).headers["ETag"]
+    assert client.delete(f"/tasks/{last['id']}", headers=headers).status_code == 204
+    reused = client.post("/tasks/", json={"title": "new"}, headers=headers).json()["data"]
+    # SQLite 会复用被删除的最大 rowid，行数、最大 id 和 row_version 之和都与之前相同
+    assert reused["id"] == last["id"]
+
+    response = client.get("/tasks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()["data"]] == ["keep", "new"]
+    assert response.headers["ETag"] != etag
+
+
+def test_tasks_etag_changes_after_batch_create_and_delete(client):
+    _, headers = register(client)
+    etag = client.get("/tasks/", headers=headers).headers["ETag"]
+
+    response = client.post("/tasks/create:batch", json={"items": [{"title": "a"}, {"title": "b"}]}, headers=headers)
+    ids = [item["id"] for item in response.json()["data"]["results"]]
+    created = client.get("/tasks/", headers={**headers, "If-None-Match": etag})
+    assert created.status_code == 200
+
+    client.post("/tasks/delete:batch", json={"ids": ids}, headers=headers)
+    deleted = client.get("/tasks/", headers={**headers, "If-None-Match": created.headers["ETag"]})
+    assert deleted.status_code == 200
+    assert deleted.json()["data"] == []
+    assert client.get("/tasks/", headers={**headers, "If-None-Match": deleted.headers["ETag"]}).status_code == 304
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from conftest import TMP_DIR
+
+# 导出测试写入的完成记录条数，以及流式导出允许的峰值内存增长
+EXPORT_TEST_ROWS = int(os.getenv("EXPORT_TEST_ROWS", "300000"))
+EXPORT_RSS_BUDGET_MB = float(os.getenv("EXPORT_RSS_BUDGET_MB", "40"))
+
+
+def _peak_rss_mb(pid: int) -> float:
+    """进程的峰值常驻内存（/proc/<pid>/status 中的 VmHWM）"""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not found")
+
+
+def _count_lines(base_url: str, headers: dict, params: dict) -> int:
+    lines = 0
+    with httpx.stream("GET", f"{base_url}/users/me/export", headers=headers, params=params, timeout=300) as response:
+        assert response.status_code == 200
+        for _ in response.iter_lines():
+            lines += 1
+    return lines
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="需要 /proc 读取进程峰值内存")
+def test_export_streams_with_flat_memory(live_server):
+    db_path = os.path.join(TMP_DIR, f"export-{uuid.uuid4().hex}.db")
+    base_url = live_server(DATABASE_URL=f"sqlite:///{db_path}")
+    pid = live_server.pids[base_url]
+
+    username = f"u{uuid.uuid4().hex[:12]}"
+    response = httpx.post(f"{base_url}/users/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "secret1",
+    })
+    user_id = response.json()["data"]["id"]
+    response = httpx.post(f"{base_url}/users/token", data={"username": username, "password": "secret1"})
+    headers = {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+    task_id = httpx.post(f"{base_url}/tasks/", json={"title": "export"}, headers=headers).json()["data"]["id"]
+
+    # 预热：加载导出路径上的模块，之后再记录基线
+    params = {"resources": "completions"}
+    assert _count_lines(base_url, headers, params) == 0
+
+    start = datetime(2024, 1, 1)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO task_completions (task_id, user_id, completed_at) VALUES (?, ?, ?)",
+            ((task_id, user_id, (start + timedelta(seconds=i)).isoformat(" ")) for i in range(EXPORT_TEST_ROWS)),
+        )
+
+    baseline = _peak_rss_mb(pid)
+    assert _count_lines(base_url, headers, params) == EXPORT_TEST_ROWS
+    assert _count_lines(base_url, headers, {**params, "format": "csv"}) == EXPORT_TEST_ROWS + 1
+    growth = _peak_rss_mb(pid) - baseline
+    assert growth < EXPORT_RSS_BUDGET_MB, f"导出 {EXPORT_TEST_ROWS} 行时峰值内存增长 {growth:.1f} MB"
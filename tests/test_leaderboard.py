@@ -0,0 +1,130 @@
+import random
+from bisect import bisect_left, insort
+
+import pytest
+from sqlalchemy import select
+
+from conftest import register
+from app.database import SessionLocal
+from app.models.user import User
+from app.utils import leaderboard as leaderboard_module
+from app.utils.leaderboard import CoinsLeaderboard, _RankedList, leaderboard
+
+
+@pytest.mark.parametrize("block_size", [2, 3, 8, 512])
+def test_ranked_list_matches_sorted_list(monkeypatch, block_size):
+    monkeypatch.setattr(leaderboard_module, "_BLOCK_SIZE", block_size)
+    rng = random.Random(block_size)
+    # 金币取值范围小，大量并列；初始规模足以让 512 的块也发生分裂和合并
+    initial = {(-rng.randrange(50), user_id) for user_id in range(1, 1500)}
+    expected = sorted(initial)
+    ranked = _RankedList(initial)
+    next_id = 1500
+
+    for step in range(3000):
+        op = rng.random()
+        if op < 0.35 or not expected:
+            key = (-rng.randrange(50), next_id)
+            next_id += 1
+            ranked.add(key)
+            insort(expected, key)
+        elif op < 0.7:
+            key = expected[rng.randrange(len(expected))]
+            ranked.remove(key)
+            del expected[bisect_left(expected, key)]
+        elif op < 0.85:
+            # 名次查询使用 (-coins, 0)，可能不在列表中
+            key = (-rng.randrange(-2, 52), rng.choice([0, rng.randrange(next_id)]))
+            assert ranked.index(key) == bisect_left(expected, key), step
+        else:
+            start, count = rng.randrange(len(expected) + 5), rng.randrange(1, 3 * block_size + 5)
+            assert ranked.slice(start, count) == expected[start:start + count], step
+        assert len(ranked) == len(expected)
+
+    assert ranked.slice(0, len(expected) + 1) == expected
+    # 全部删除后可以继续使用
+    for key in list(expected):
+        ranked.remove(key)
+    assert (len(ranked), ranked.slice(0, 10), ranked.index((0, 0))) == (0, [], 0)
+    ranked.add((-1, 1))
+    assert ranked.slice(0, 10) == [(-1, 1)]
+
+
+def test_rebuild_replays_updates_made_while_loading():
+    board = CoinsLeaderboard()
+    board.apply({1: 10, 2: 20})
+
+    def load():
+        # 读取数据库快照之后、替换索引之前提交的更新
+        board.apply({1: 30, 3: 5})
+        return [(1, 10), (2, 20), (4, None)]
+
+    board.rebuild(load)
+    assert board.top(0, 10) == [
+        {"rank": 1, "user_id": 1, "coins": 30},
+        {"rank": 2, "user_id": 2, "coins": 20},
+        {"rank": 3, "user_id": 3, "coins": 5},
+        {"rank": 4, "user_id": 4, "coins": 0},
+    ]
+    assert board.rank(4) == {"rank": 4, "coins": 0, "total": 4}
+    assert board.rank_of_coins(20) == 2
+
+
+def _expected_board():
+    """排行榜按 ORDER BY coins DESC, id 计算，名次为金币更多的用户数 + 1"""
+    with SessionLocal() as db:
+        rows = db.execute(select(User.id, User.username, User.coins).order_by(User.coins.desc(), User.id)).all()
+    ranks = {}
+    for position, row in enumerate(rows, 1):
+        ranks.setdefault(row.coins, position)
+    return [{"rank": ranks[row.coins], "user_id": row.id, "username": row.username, "coins": row.coins} for row in rows]
+
+
+def _board(client, headers):
+    entries, offset = [], 0
+    while True:
+        page = client.get("/leaderboard", params={"offset": offset, "limit": 100}, headers=headers).json()["data"]
+        entries += page
+        if len(page) < 100:
+            return entries
+        offset += 100
+
+
+def test_api_operations_match_order_by(client):
+    # 其他测试会在独立引擎的会话中写入用户，先与测试数据库对账
+    leaderboard.reconcile()
+    rng = random.Random(25)
+    users = [register(client, coins=rng.randrange(20)) for _ in range(6)]
+    _, observer = register(client)
+
+    for step in range(150):
+        user, headers = users[rng.randrange(len(users))]
+        op = rng.random()
+        if op < 0.15 or len(users) < 3:
+            users.append(register(client, coins=rng.randrange(20)))
+        elif op < 0.3:
+            client.put(f"/users/{user['id']}/coins", json={"amount": rng.randrange(20)}, headers=headers)
+        elif op < 0.45:
+            client.post(f"/users/{user['id']}/coins/add", json={"amount": rng.randrange(1, 10)}, headers=headers)
+        elif op < 0.6:
+            # 余额不足时返回 400，余额和名次都不变
+            client.post(f"/users/{user['id']}/coins/deduct", json={"amount": rng.randrange(1, 15)}, headers=headers)
+        elif op < 0.8:
+            task = client.post("/tasks/", json={"title": "t", "coins_reward": rng.randrange(1, 5)}, headers=headers)
+            task_id = task.json()["data"]["id"]
+            client.post(f"/tasks/{task_id}/complete", headers=headers)
+            if rng.random() < 0.5:
+                client.post(f"/tasks/{task_id}/uncomplete", headers=headers)
+        elif op < 0.9:
+            assert client.delete(f"/users/{user['id']}", headers=headers).status_code == 204
+            users.remove((user, headers))
+            continue
+
+        expected = _expected_board()
+        mine = client.get("/users/me/rank", headers=headers).json()["data"]
+        [entry] = [entry for entry in expected if entry["user_id"] == user["id"]]
+        assert mine == {"user_id": user["id"], "rank": entry["rank"], "coins": entry["coins"], "total_users": len(expected)}, step
+        if step % 10 == 0:
+            assert _board(client, observer) == expected, step
+
+    assert _board(client, observer) == _expected_board()
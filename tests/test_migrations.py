@@ -0,0 +1,62 @@
+import os
+import time
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from conftest import TMP_DIR
+from app.utils import migrations
+
+
+@pytest.fixture
+def tokyo_time(monkeypatch):
+    """本地时区设为 UTC+9，UTC 20:00 在本地已经是第二天"""
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(f"sqlite:///{os.path.join(TMP_DIR, f'migrations-{uuid.uuid4().hex}.db')}")
+    migrations.run_migrations(engine)
+    return engine
+
+
+def _insert_task(conn, weekday, monthday) -> int:
+    # SQLite 的 CURRENT_TIMESTAMP 是 UTC，这里模拟数据库生成的 created_at
+    return conn.execute(text(
+        "INSERT INTO tasks (title, user_id, created_at, repeat_weekday, repeat_monthday, row_version) "
+        "VALUES ('t', 1, '2024-01-01 20:00:00', :weekday, :monthday, 0) RETURNING id"
+    ), {"weekday": weekday, "monthday": monthday}).scalar_one()
+
+
+def _anchor(conn, task_id: int):
+    return tuple(conn.execute(
+        text("SELECT repeat_weekday, repeat_monthday FROM tasks WHERE id = :id"), {"id": task_id}
+    ).one())
+
+
+def test_backfill_uses_local_time_like_new_tasks(engine, tokyo_time):
+    with engine.begin() as conn:
+        missing = _insert_task(conn, None, None)
+        migrations._backfill_recurrence_anchors(conn, only_missing=True)
+        # 本地时间 2024-01-02 05:00，星期二
+        assert _anchor(conn, missing) == (1, 2)
+
+
+def test_local_time_migration_fixes_utc_anchors(engine, tokyo_time):
+    with engine.begin() as conn:
+        # 早期按 UTC 回填的锚点：2024-01-01，星期一
+        stale = _insert_task(conn, 0, 1)
+        migrations._recurrence_anchors_local_time(conn)
+        assert _anchor(conn, stale) == (1, 2)
+
+
+def test_hot_queries_use_expected_indexes(engine):
+    results = migrations.explain_hot_queries(engine)
+    assert [result["query"] for result in results if not result["ok"]] == []
+    assert len(results) == len(migrations.HOT_QUERIES)
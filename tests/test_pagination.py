@@ -0,0 +1,57 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, create_engine, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.utils.pagination import encode_cursor, keyset_paginate, split_page
+
+metadata = MetaData()
+items = Table(
+    "items", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("rank", Integer, nullable=True),
+    Column("seen_at", DateTime, nullable=True),
+)
+ORDER_BY = (items.c.rank, items.c.id)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(items.insert(), [
+            {"id": 1, "rank": 2}, {"id": 2, "rank": None}, {"id": 3, "rank": 1},
+            {"id": 4, "rank": None}, {"id": 5, "rank": 2}, {"id": 6, "rank": None},
+        ])
+    return engine
+
+
+def _all_pages(engine, limit: int):
+    ids, cursor = [], None
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(keyset_paginate(select(items), ORDER_BY, cursor, 0, limit)).all()
+            page, cursor = split_page(rows, ORDER_BY, limit)
+            ids.extend(row.id for row in page)
+            if cursor is None:
+                return ids
+
+
+@pytest.mark.parametrize("limit", [1, 2, 4, 10])
+def test_cursor_pages_through_null_sort_keys(engine, limit):
+    # NULL 在前，之后按 (rank, id) 升序
+    assert _all_pages(engine, limit) == [2, 4, 6, 3, 1, 5]
+
+
+def test_null_cursor_on_non_nullable_column_is_rejected(engine):
+    with pytest.raises(HTTPException) as exc_info:
+        keyset_paginate(select(items), (items.c.id,), encode_cursor([None]), 0, 10)
+    assert exc_info.value.status_code == 400
+
+
+def test_nulls_first_rendering_per_dialect():
+    stmt = keyset_paginate(select(items), (items.c.seen_at, items.c.id), None, 0, 10)
+    assert "items.seen_at NULLS FIRST, items.id" in str(stmt.compile(dialect=postgresql.dialect()))
+    assert "items.seen_at NULLS FIRST" in str(stmt.compile(dialect=sqlite.dialect()))
+    assert "NULLS FIRST" not in str(stmt.compile(dialect=mysql.dialect()))
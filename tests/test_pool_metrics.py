@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from conftest import ROOT, TMP_DIR, register
+from app.utils.pool_metrics import InstrumentedQueuePool, instrument_pool, pool_status
+from app.utils.security import get_current_active_user
+
+
+def _pool_options(**env) -> dict:
+    """在新进程中导入 app.database，返回按给定环境变量解析出的连接池参数"""
+    script = (
+        "import json; from app.database import DATABASE_URL, _pool_options; "
+        "options = _pool_options(DATABASE_URL); "
+        "options['poolclass'] = options['poolclass'].__name__ if options else None; "
+        "print(json.dumps({**options, 'memory': _pool_options('sqlite:///:memory:')}))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_pool_settings_are_read_from_environment():
+    options = _pool_options(
+        DB_POOL_SIZE="3", DB_MAX_OVERFLOW="2", DB_POOL_TIMEOUT="1.5", DB_POOL_RECYCLE="60", DB_POOL_PRE_PING="no",
+    )
+    assert options == {
+        "poolclass": "InstrumentedQueuePool",
+        "pool_size": 3,
+        "max_overflow": 2,
+        "pool_timeout": 1.5,
+        "pool_recycle": 60,
+        "pool_pre_ping": False,
+        # 内存 SQLite 使用默认的单连接池
+        "memory": {},
+    }
+
+
+def test_pool_status_counts_waits_and_timeouts():
+    engine = create_engine(
+        f"sqlite:///{os.path.join(TMP_DIR, f'pool-{uuid.uuid4().hex}.db')}",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1,
+    )
+    instrument_pool(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        busy = pool_status(engine)
+    idle = pool_status(engine)
+
+    assert busy["pool_class"] == "InstrumentedQueuePool"
+    assert (busy["size"], busy["checked_out"], busy["max_overflow"], busy["timeout"]) == (1, 1, 0, 0.1)
+    assert busy["acquire_count"] == 2
+    assert busy["acquire_timeouts"] == 1
+    assert busy["wait_max_ms"] >= 100
+    assert busy["connections_created"] == 1
+    assert (idle["checked_out"], idle["checkouts"], idle["checkins"]) == (0, 1, 1)
+
+
+def test_admin_db_pool_response(client):
+    register(client)
+    _, headers = register(client)
+    assert client.get("/admin/db-pool", headers=headers).status_code == 403
+
+    client.app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=1)
+    try:
+        data = client.get("/admin/db-pool").json()["data"]
+    finally:
+        client.app.dependency_overrides.clear()
+
+    for status in (data, data["async_pool"]):
+        assert {"pool_class", "size", "checked_out", "overflow", "timeout",
+                "acquire_count", "wait_p99_ms", "connections_created"} <= status.keys()
+    assert data["pool_class"] == "InstrumentedQueuePool"
+    assert data["async_pool"]["pool_class"] == "InstrumentedAsyncQueuePool"
+    assert data["replicas"] == data["async_replicas"] == []
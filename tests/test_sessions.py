@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from conftest import TMP_DIR, register
+from app.utils import security
+from app.utils.session_store import MemorySessionBackend, SQLiteSessionBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request):
+    if request.param == "memory":
+        return MemorySessionBackend()
+    return SQLiteSessionBackend(os.path.join(TMP_DIR, f"sessions-{uuid.uuid4().hex}.db"), touch_interval=0)
+
+
+def test_touch_never_creates_a_session(store):
+    later = datetime.utcnow() + timedelta(minutes=5)
+    assert store.touch("missing", later) is False
+    assert store.get("missing") is None
+
+    store.set("s1", later)
+    assert store.touch("s1", later + timedelta(minutes=5)) is True
+    assert store.delete("s1") is True
+    assert store.touch("s1", later) is False
+    assert store.get("s1") is None
+
+
+def test_expired_session_is_not_extended(store):
+    store.set("s1", datetime.utcnow() - timedelta(seconds=1))
+    assert store.touch("s1", datetime.utcnow() + timedelta(minutes=5)) is False
+    assert store.get("s1") is None
+
+
+def _login(base_url: str, username: str) -> dict:
+    response = httpx.post(f"{base_url}/users/token", data={"username": username, "password": "secret1"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+
+def test_logout_on_one_worker_rejects_token_on_another(live_server):
+    env = {"SESSION_BACKEND": "sqlite", "SESSION_DB_PATH": os.path.join(TMP_DIR, "shared-sessions.db")}
+    worker_a = live_server(**env)
+    worker_b = live_server(**env)
+
+    username = f"u{uuid.uuid4().hex[:12]}"
+    response = httpx.post(f"{worker_a}/users/register", json={
+        "username": username, "email": f"{username}@example.com", "password": "secret1",
+    })
+    assert response.status_code == 200, response.text
+    phone = _login(worker_a, username)
+    tablet = _login(worker_b, username)
+
+    # 两个 worker 都认可对方签发的令牌，并各自缓存了声明和用户快照
+    for base_url in (worker_a, worker_b):
+        assert httpx.get(f"{base_url}/users/me", headers=phone).status_code == 200
+        assert httpx.get(f"{base_url}/users/me", headers=tablet).status_code == 200
+
+    assert httpx.post(f"{worker_a}/users/logout", headers=phone).status_code == 200
+
+    assert httpx.get(f"{worker_b}/users/me", headers=phone).status_code == 401
+    assert httpx.get(f"{worker_a}/users/me", headers=phone).status_code == 401
+    # 同一用户的其他令牌不受影响
+    assert httpx.get(f"{worker_b}/users/me", headers=tablet).status_code == 200
+
+
+def test_locked_session_db_does_not_block_other_requests(client, monkeypatch):
+    path = os.path.join(TMP_DIR, f"sessions-{uuid.uuid4().hex}.db")
+    monkeypatch.setattr(security, "session_store", SQLiteSessionBackend(path, touch_interval=0))
+    _, headers = register(client)
+
+    # 模拟另一个 worker 持有会话库的写锁，1.5 秒后释放；认证时的续期写入要等到那时
+    locker = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    locker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(1.5, locker.execute, args=("COMMIT",))
+    release.start()
+
+    responses = {}
+    waiting = threading.Thread(target=lambda: responses.setdefault("me", client.get("/users/me", headers=headers)))
+    waiting.start()
+    time.sleep(0.3)
+
+    start = time.monotonic()
+    assert client.get("/").status_code == 200
+    elapsed = time.monotonic() - start
+    still_waiting = waiting.is_alive()
+
+    waiting.join()
+    release.join()
+    locker.close()
+    assert still_waiting
+    assert elapsed < 0.5
+    assert responses["me"].status_code == 200
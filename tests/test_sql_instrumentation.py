@@ -0,0 +1,88 @@
+import logging
+import os
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from conftest import TMP_DIR, sql_queries
+from app.middleware.sql_middleware import SQLInstrumentationMiddleware
+from app.utils import sql_instrumentation
+from app.utils.sql_instrumentation import fingerprint
+
+INSTRUMENTATION_LOGGER = sql_instrumentation.logger.name
+
+
+@pytest.fixture
+def sql_client():
+    engine = create_engine(f"sqlite:///{os.path.join(TMP_DIR, f'sql-{uuid.uuid4().hex}.db')}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO items (name) VALUES ('a'), ('b'), ('c')"))
+
+    api = FastAPI()
+
+    @api.get("/items/{count}")
+    def items(count: int):
+        # 逐行查询，模拟 N+1
+        with engine.connect() as conn:
+            return [conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": i}).scalar() for i in range(count)]
+
+    @api.get("/mixed")
+    def mixed():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT count(*) FROM items"))
+            conn.execute(text("SELECT name FROM items WHERE id = 1"))
+        return {}
+
+    api.add_middleware(SQLInstrumentationMiddleware)
+    with TestClient(api) as test_client:
+        yield test_client
+
+
+def test_fingerprint_ignores_literals_and_in_list_length():
+    assert fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'x'") == fingerprint(
+        "SELECT *\n  FROM t WHERE id = 42 AND name = 'it''s'"
+    )
+    assert fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?)"
+    assert fingerprint("SELECT * FROM t WHERE id = %(id_1)s") == fingerprint("SELECT * FROM t WHERE id = :id")
+    assert fingerprint("SELECT a FROM t") != fingerprint("SELECT b FROM t")
+
+
+def test_server_timing_counts_queries_of_each_request(sql_client):
+    assert sql_queries(sql_client.get("/items/3")) == 3
+    assert sql_queries(sql_client.get("/mixed")) == 2
+    # 每个请求单独统计
+    assert sql_queries(sql_client.get("/items/0")) == 0
+
+
+def test_repeated_statement_shape_is_reported_as_n_plus_one(sql_client, caplog):
+    caplog.set_level(logging.WARNING, logger=INSTRUMENTATION_LOGGER)
+    threshold = sql_instrumentation.SQL_N_PLUS_ONE_THRESHOLD
+
+    sql_client.get(f"/items/{threshold - 1}")
+    assert not [record for record in caplog.records if "N+1" in record.getMessage()]
+
+    sql_client.get(f"/items/{threshold}")
+    [record] = [record for record in caplog.records if "N+1" in record.getMessage()]
+    message = record.getMessage()
+    assert f"/items/{threshold}" in message and f"执行了 {threshold} 次" in message
+    assert "SELECT name FROM items WHERE id = ?" in message
+
+
+def test_slow_queries_are_logged_with_path(sql_client, caplog, monkeypatch):
+    caplog.set_level(logging.WARNING, logger=INSTRUMENTATION_LOGGER)
+
+    monkeypatch.setattr(sql_instrumentation, "SQL_SLOW_QUERY_MS", 60_000)
+    sql_client.get("/mixed")
+    assert not [record for record in caplog.records if "慢查询" in record.getMessage()]
+
+    # 阈值极小时每条语句都算慢查询
+    monkeypatch.setattr(sql_instrumentation, "SQL_SLOW_QUERY_MS", 1e-6)
+    sql_client.get("/mixed")
+    slow = [record.getMessage() for record in caplog.records if "慢查询" in record.getMessage()]
+    assert len(slow) == 2
+    assert all("路径: /mixed" in message for message in slow)
+    assert any("SELECT name FROM items WHERE id = ?" in message for message in slow)
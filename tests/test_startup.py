@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from conftest import ROOT, TMP_DIR
+
+# 启动耗时预算（秒），慢机器上可以通过环境变量放宽
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "5"))
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "10"))
+
+
+def test_import_is_fast_and_does_not_touch_the_database():
+    db_path = os.path.join(TMP_DIR, f"import-{uuid.uuid4().hex}.db")
+    script = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT, env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"},
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    elapsed = float(result.stdout.strip().splitlines()[-1])
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"导入 app.main 用时 {elapsed:.2f}s"
+    # 引擎延迟创建，导入时不应连接数据库
+    assert not os.path.exists(db_path)
+
+
+def test_startup_until_first_response_within_budget(live_server):
+    env = {"DATABASE_URL": f"sqlite:///{os.path.join(TMP_DIR, f'startup-{uuid.uuid4().hex}.db')}"}
+    # 第一次启动需要建表，第二次启动 schema 已是最新，只检查版本号
+    for _ in range(2):
+        start = time.monotonic()
+        base_url = live_server(**env)
+        elapsed = time.monotonic() - start
+        assert elapsed < STARTUP_BUDGET_SECONDS, f"启动到首个响应用时 {elapsed:.2f}s"
+        assert httpx.get(f"{base_url}/").status_code == 200
@@ -0,0 +1,111 @@
+import pytest
+
+from conftest import as_admin, register, sql_queries
+from app.utils.story_cache import story_cache
+
+STORY_KEYS = {"id", "title", "description", "story_type", "unlock_cost", "is_active", "created_at", "updated_at"}
+
+
+@pytest.fixture(scope="module")
+def story(client):
+    """两章的故事：第一章有一个通往第二章的选项，第二章没有选项"""
+    with as_admin(client):
+        story = client.post("/stories/", json={"title": "forest", "unlock_cost": 10}).json()["data"]
+        chapters = [
+            client.post("/stories/chapters", json={
+                "story_id": story["id"], "title": f"chapter {order}", "content": "...", "order_num": order,
+            }).json()["data"]
+            for order in (1, 2)
+        ]
+        choice = client.post("/stories/choices", json={
+            "chapter_id": chapters[0]["id"], "text": "go on", "next_chapter_id": chapters[1]["id"],
+        }).json()["data"]
+    return {"id": story["id"], "chapters": [chapter["id"] for chapter in chapters], "choice": choice["id"]}
+
+
+def _list(client, headers, params):
+    # 绕过目录缓存，Server-Timing 统计的是实际执行的查询
+    story_cache.bump()
+    response = client.get("/stories/", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def _find(response, story_id):
+    [item] = [item for item in response.json()["data"] if item["id"] == story_id]
+    return item
+
+
+def test_fields_alone_skips_chapters(client, story):
+    _, headers = register(client)
+    # 第一次认证会查询用户表，之后使用缓存的用户快照
+    _list(client, headers, {})
+
+    full = _list(client, headers, {})
+    sparse = _list(client, headers, {"fields": "id,title,unlock_cost"})
+    with_chapters = _list(client, headers, {"fields": "id,title", "include": "chapters"})
+    with_choices = _list(client, headers, {"fields": "id", "include": "chapters.choices"})
+
+    # 故事、章节、选项各一条查询；只要字段时只查故事表
+    assert (sql_queries(sparse), sql_queries(with_chapters), sql_queries(with_choices), sql_queries(full)) == (1, 2, 3, 3)
+    assert len(sparse.content) < len(full.content)
+
+    assert _find(sparse, story["id"]) == {"id": story["id"], "title": "forest", "unlock_cost": 10}
+    item = _find(with_chapters, story["id"])
+    assert set(item) == {"id", "title", "chapters"}
+    assert [chapter["title"] for chapter in item["chapters"]] == ["chapter 1", "chapter 2"]
+    assert "choices" not in item["chapters"][0]
+    item = _find(with_choices, story["id"])
+    assert set(item) == {"id", "chapters"}
+    assert [choice["text"] for choice in item["chapters"][0]["choices"]] == ["go on"]
+    item = _find(full, story["id"])
+    assert set(item) == STORY_KEYS | {"chapters"}
+    assert [len(chapter["choices"]) for chapter in item["chapters"]] == [1, 0]
+
+
+@pytest.mark.parametrize("params", [{"fields": "id,secret"}, {"include": "choices"}, {"fields": "id", "include": "owner"}])
+def test_unknown_fields_or_include_are_rejected(client, params):
+    _, headers = register(client)
+    response = client.get("/stories/", params=params, headers=headers)
+    assert response.status_code == 400
+    assert "Unsupported" in response.json()["msg"]
+
+
+def _user_story_shape(data, story):
+    assert set(data["story"]) == STORY_KEYS
+    assert data["story"]["id"] == story["id"]
+
+
+def test_unlock_read_and_respond_serialize_nested_story(client, story):
+    _, headers = register(client, coins=100)
+
+    unlocked = client.post(f"/stories/unlock/{story['id']}", headers=headers)
+    assert unlocked.status_code == 200, unlocked.text
+    data = unlocked.json()["data"]
+    _user_story_shape(data, story)
+    assert data["current_chapter"]["id"] == story["chapters"][0]
+    assert [choice["id"] for choice in data["current_chapter"]["choices"]] == [story["choice"]]
+    assert data["responses"] == []
+
+    # 重复解锁返回已有记录，不再扣费
+    again = client.post(f"/stories/unlock/{story['id']}", headers=headers)
+    assert again.status_code == 200, again.text
+    assert again.json()["data"]["id"] == data["id"]
+    assert client.get("/users/me", headers=headers).json()["data"]["coins"] == 90
+
+    mine = client.get(f"/stories/my/{story['id']}", headers=headers)
+    assert mine.status_code == 200, mine.text
+    _user_story_shape(mine.json()["data"], story)
+    # 用户故事联表读取故事和当前章节，再各用一条查询加载章节选项和回应记录
+    assert sql_queries(mine) == 3
+
+    responded = client.post(f"/stories/my/{story['id']}/respond", json={
+        "chapter_id": story["chapters"][0], "choice_id": story["choice"],
+    }, headers=headers)
+    assert responded.status_code == 200, responded.text
+    data = responded.json()["data"]
+    _user_story_shape(data, story)
+    assert data["current_chapter"]["id"] == story["chapters"][1]
+    assert data["current_chapter"]["choices"] == []
+    assert data["is_completed"] is True
+    assert [response["choice_id"] for response in data["responses"]] == [story["choice"]]
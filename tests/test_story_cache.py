@@ -0,0 +1,102 @@
+from conftest import as_admin, register
+from app.utils.story_cache import StoryCatalogCache, story_cache
+
+
+def test_cache_counts_hits_misses_and_ignores_stale_writes():
+    cache = StoryCatalogCache(max_bytes=1024, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", b"body", cache.version)
+    assert cache.get("a") == b"body"
+
+    # 读取期间发生了写入：按读取前的版本号写回的结果不缓存
+    version = cache.version
+    cache.bump()
+    cache.set("a", b"stale", version)
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"], stats["version"]) == (1, 2, 1, 1)
+    assert (stats["entries"], stats["bytes"]) == (0, 0)
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    cache = StoryCatalogCache(max_bytes=10, ttl=60)
+    cache.set("a", b"aaaa", 0)
+    cache.set("b", b"bbbb", 0)
+    assert cache.get("a") == b"aaaa"
+    cache.set("c", b"cccc", 0)
+    # b 最久未被访问，超出 10 字节时先淘汰
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (b"aaaa", b"cccc")
+    # 单个条目超过上限时直接不缓存，也不会挤掉其他条目
+    cache.set("big", b"x" * 11, 0)
+    assert cache.get("big") is None
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 8, 1)
+
+
+def test_cache_entries_expire():
+    cache = StoryCatalogCache(max_bytes=1024, ttl=0)
+    cache.set("a", b"body", 0)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def _story(client, story_id):
+    response = client.get(f"/stories/{story_id}")
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def _write(client, story_id, method, url, **kwargs):
+    """先读一次让故事进入缓存，再执行写入，检查缓存被失效，返回写入后重新读取的故事"""
+    _story(client, story_id)
+    invalidations = story_cache.stats()["invalidations"]
+    response = client.request(method, url, **kwargs)
+    assert response.status_code in (200, 204), response.text
+    assert story_cache.stats()["invalidations"] == invalidations + 1
+    return _story(client, story_id)
+
+
+def test_story_reads_hit_cache_until_an_admin_write(client):
+    _, headers = register(client)
+    with as_admin(client):
+        story_id = client.post("/stories/", json={"title": "cached", "unlock_cost": 0}).json()["data"]["id"]
+
+    before = story_cache.stats()
+    for _ in range(2):
+        response = client.get(f"/stories/{story_id}", headers=headers)
+        assert response.json()["data"]["title"] == "cached"
+    after = story_cache.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+
+    with as_admin(client):
+        story = _write(client, story_id, "PUT", f"/stories/{story_id}", json={"title": "renamed"})
+        assert story["title"] == "renamed"
+
+        story = _write(client, story_id, "POST", "/stories/chapters", json={
+            "story_id": story_id, "title": "one", "content": "...", "order_num": 1,
+        })
+        chapter_id = story["chapters"][0]["id"]
+        assert [chapter["title"] for chapter in story["chapters"]] == ["one"]
+
+        story = _write(client, story_id, "PUT", f"/stories/chapters/{chapter_id}", json={"title": "first"})
+        assert [chapter["title"] for chapter in story["chapters"]] == ["first"]
+
+        story = _write(client, story_id, "POST", "/stories/choices", json={"chapter_id": chapter_id, "text": "go"})
+        assert [choice["text"] for choice in story["chapters"][0]["choices"]] == ["go"]
+
+        story = _write(client, story_id, "DELETE", f"/stories/chapters/{chapter_id}")
+        assert story["chapters"] == []
+
+        _story(client, story_id)
+        assert client.delete(f"/stories/{story_id}").status_code == 204
+    assert client.get(f"/stories/{story_id}", headers=headers).status_code == 404
+
+
+def test_admin_story_cache_stats(client):
+    with as_admin(client):
+        data = client.get("/admin/story-cache").json()["data"]
+    assert set(data) == {"version", "entries", "bytes", "max_bytes", "hits", "misses", "evictions", "invalidations"}
+    assert data["version"] == story_cache.version
@@ -0,0 +1,40 @@
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models.user import User
+from app.utils.coins import change_coins
+
+
+def _write_elsewhere(user_id: int, **values):
+    """模拟其他 worker 的写入：直接提交到数据库，不经过本进程的缓存失效"""
+    with SessionLocal() as db:
+        if "coins" in values:
+            change_coins(db, user_id, values.pop("coins"))
+        if values:
+            db.execute(update(User).where(User.id == user_id).values(**values))
+        db.commit()
+
+
+def test_me_etag_follows_database_row(client, user):
+    profile, headers = user
+    first = client.get("/users/me", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert client.get("/users/me", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    _write_elsewhere(profile["id"], coins=50)
+
+    response = client.get("/users/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["data"]["coins"] == 50
+    assert response.headers["ETag"] != etag
+    assert client.get("/users/me", headers={**headers, "If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_me_sees_deactivation_from_other_worker(client, user):
+    profile, headers = user
+    assert client.get("/users/me", headers=headers).status_code == 200
+
+    _write_elsewhere(profile["id"], is_active=False)
+
+    assert client.get("/users/me", headers=headers).status_code == 400